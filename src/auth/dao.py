@@ -1,62 +1,34 @@
 import loguru
 
-from fastapi import Query
-from sqlalchemy import asc, desc, select
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import String, any_, bindparam, or_, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 
-from src.auth.filters import UserFilter
 from src.auth.exceptions import UserAlreadyExistsException
 from src.auth.models import Role, User
+from src.auth.token_versions import notify_token_versions
 from src.dao.base_dao import BaseDAO
+from src.settings import settings
 
 logger = loguru.logger
 
 
 class UsersDAO(BaseDAO):
     model = User
+    sorting_fields = ('id', 'first_name', 'last_name', 'email', 'phone_number', 'created_at', 'updated_at')
+    # Поля, изменение которых отзывает выданные токены: роль зашита в токен, email и пароль - учетные данные
+    token_fields = {'role_id', 'email', 'password'}
 
-    async def find_all(self, filters: UserFilter, sorting: Query = None):
-        """Находит всех юзеров, по фильтрам и с сортировкой."""
-        query = select(self.model)
+    def _update_values(self, columns: set[str]) -> dict:
+        values = super()._update_values(columns)
+        if columns & self.token_fields:
+            # Версия токенов поднимается тем же UPDATE, что меняет поля
+            values['token_version'] = User.token_version + 1
+        return values
 
-        # Фильтрация
-        if filters.id:
-            query = query.where(User.id == filters.id)
-        if filters.first_name:
-            query = query.where(User.first_name.ilike(f"%{filters.first_name}%"))
-        if filters.last_name:
-            query = query.where(User.last_name.ilike(f"%{filters.last_name}%"))
-        if filters.email:
-            query = query.where(User.email == filters.email)
-        if filters.phone:
-            query = query.where(User.phone == filters.phone)
-
-        # Сортировка
-        if sorting:
-            sort_field_name, sort_direction = sorting.split(':') if ':' in sorting else (sorting, 'asc')
-            sort_direction = sort_direction.lower()
-
-            # Получаем атрибут модели SQLAlchemy по имени поля
-            sort_column = getattr(User, sort_field_name, None)
-            if sort_column is not None:
-                # Применяем сортировку
-                if sort_direction == 'desc':
-                    query = query.order_by(desc(sort_column))
-                else:
-                    query = query.order_by(asc(sort_column))
-            else:
-                # Если поле сортировки не найдено, можно вернуть ошибку или использовать значение по умолчанию
-                # Здесь просто игнорируем и используем сортировку по id (или какую-то другую)
-                # raise HTTPException(status_code=422, detail=f"Поле сортировки '{sort_field_name}' не найдено.")
-                pass # Продолжаем с сортировкой по умолчанию, если поле не найдено
-
-        try:
-            result = await self._session.execute(query)
-        except SQLAlchemyError as e:
-            raise e
-
-        records = result.scalars().all()
-        return records
+    async def _after_write(self, action: str, ids: list[int]) -> None:
+        await super()._after_write(action, ids)
+        if action != 'create' and ids:
+            await notify_token_versions(self._session, action, ids)
 
     async def check_unique_user(self, phone: str, email: str):
         """Проверяет уникальность полей для регистрации юзера."""
@@ -66,6 +38,48 @@ class UsersDAO(BaseDAO):
         if query_result.scalar_one_or_none():
             raise UserAlreadyExistsException
 
+    async def find_taken(self, emails: list[str], phones: list[str]) -> tuple[set[str], set[str]]:
+        """Одним запросом находит уже занятые email и телефоны из переданных."""
+        result = await self._session.execute(
+            select(User.email, User.phone_number).where(
+                or_(
+                    User.email == any_(bindparam('emails', emails, type_=ARRAY(String))),
+                    User.phone_number == any_(bindparam('phones', phones, type_=ARRAY(String))),
+                )
+            )
+        )
+        rows = result.all()
+        return {row.email for row in rows}, {row.phone_number for row in rows}
+
+    async def bulk_create(self, users: list[dict], chunk_size: int = settings.BULK_CHUNK_SIZE) -> dict[str, int]:
+        """Вставляет пользователей многострочными INSERT пачками по chunk_size.
+
+        Строки, конфликтующие по уникальным полям (например, из параллельной
+        регистрации), пропускаются. Возвращает id созданных пользователей по email.
+        """
+        created = {}
+        for i in range(0, len(users), chunk_size):
+            result = await self._session.execute(
+                pg_insert(User)
+                .values(users[i:i + chunk_size])
+                .on_conflict_do_nothing()
+                .returning(User.id, User.email)
+            )
+            created.update({row.email: row.id for row in result.all()})
+        await self._after_write('create', list(created.values()))
+        return created
+
 
 class RolesDAO(BaseDAO):
     model = Role
+
+    async def _after_write(self, action: str, ids: list[int]) -> None:
+        await super()._after_write(action, ids)
+        if action != 'create' and ids:
+            # Название роли зашито в токены ее пользователей
+            result = await self._session.execute(
+                update(User).where(User.role_id.in_(ids)).values(token_version=User.token_version + 1).returning(User.id)
+            )
+            user_ids = list(result.scalars().all())
+            if user_ids:
+                await notify_token_versions(self._session, 'update', user_ids)
@@ -1,14 +1,19 @@
 from datetime import datetime, timezone
 from fastapi import Request, Depends
 from jose import jwt, JWTError, ExpiredSignatureError
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.auth.dao import UsersDAO
 from src.auth.models import User
+from src.auth.schemas import TokenClaimsSchema
+from src.auth.token_versions import token_versions
+from src.core.log_pipeline import request_context
 from src.settings import settings
-from src.dao.database import get_session_without_commit
+from src.dao.database import get_session_readonly, readonly_session_factory
 from src.auth.exceptions import (
-    TokenNoFound, NoJwtException, TokenExpiredException, NoUserIdException, ForbiddenException, UserNotFoundException
+    TokenNoFound, NoJwtException, TokenExpiredException, NoUserIdException, ForbiddenException, UserNotFoundException,
+    TokenRevokedException,
 )
 
 
@@ -28,9 +33,20 @@ def get_refresh_token(request: Request) -> str:
     return token
 
 
+async def is_token_version_current(user_id: int, version: int) -> bool:
+    """Не отозвана ли версия токена: по token_versions, пока они не загружены - запросом в БД."""
+    if token_versions.loaded:
+        return token_versions.is_current(user_id, version)
+    async with readonly_session_factory() as session:
+        current_version = (
+            await session.execute(select(User.token_version).where(User.id == user_id))
+        ).scalar_one_or_none()
+    return current_version is not None and version >= current_version
+
+
 async def check_refresh_token(
     token: str = Depends(get_refresh_token),
-    session: AsyncSession = Depends(get_session_without_commit)
+    session: AsyncSession = Depends(get_session_readonly)
 ) -> User:
     """ Проверяем refresh_token и возвращаем пользователя."""
     try:
@@ -38,22 +54,26 @@ async def check_refresh_token(
     except JWTError:
         raise NoJwtException
 
+    # access_token не должен приниматься вместо refresh_token
+    if payload.get('type') != 'refresh':
+        raise NoJwtException
     user_id = payload.get("sub")
-    if not user_id:
+    if not user_id or payload.get('ver') is None:
         raise NoJwtException
+    if not await is_token_version_current(int(user_id), int(payload['ver'])):
+        raise TokenRevokedException
 
     user = await UsersDAO(session).get_one_by_id(id=int(user_id))
     if not user:
         raise NoJwtException
+    if int(payload['ver']) < user.token_version:
+        raise TokenRevokedException
 
     return user
 
 
-async def get_current_user(
-    token: str = Depends(get_access_token),
-    session: AsyncSession = Depends(get_session_without_commit)
-) -> User:
-    """Проверяем access_token и возвращаем пользователя."""
+def decode_access_token(token: str) -> dict:
+    """Проверяем подпись и срок действия access_token и возвращаем его claims."""
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
     except ExpiredSignatureError:
@@ -61,23 +81,62 @@ async def get_current_user(
     except JWTError:
         raise NoJwtException
 
+    if payload.get('type') != 'access':
+        raise NoJwtException
+
     expire: str = payload.get('exp')
     expire_time = datetime.fromtimestamp(int(expire), tz=timezone.utc)
     if (not expire) or (expire_time < datetime.now(timezone.utc)):
         raise TokenExpiredException
 
-    user_id: str = payload.get('sub')
-    if not user_id:
+    if not payload.get('sub'):
         raise NoUserIdException
+    context = request_context.get()
+    if context is not None:
+        context['user_id'] = int(payload['sub'])
+    return payload
 
-    user = await UsersDAO(session).get_one_by_id(id=int(user_id))
+
+async def get_current_user(
+    token: str = Depends(get_access_token),
+    session: AsyncSession = Depends(get_session_readonly)
+) -> User:
+    """Проверяем access_token и возвращаем пользователя."""
+    payload = decode_access_token(token)
+
+    user = await UsersDAO(session).get_one_by_id(id=int(payload['sub']))
     if not user:
         raise UserNotFoundException
+    if int(payload.get('ver', 1)) < user.token_version:
+        raise TokenRevokedException
     return user
 
 
+async def get_token_claims(token: str = Depends(get_access_token)) -> TokenClaimsSchema:
+    """Проверяем access_token и возвращаем claims без загрузки пользователя из БД.
+
+    Устаревшие токены отсекаются по версиям из token_versions; пока они не
+    загружены (сразу после старта воркера), версия проверяется запросом в БД.
+    """
+    payload = decode_access_token(token)
+    if payload.get('role') is None or payload.get('ver') is None:
+        raise NoJwtException
+    claims = TokenClaimsSchema(user_id=int(payload['sub']), role=payload['role'], token_version=int(payload['ver']))
+
+    if not await is_token_version_current(claims.user_id, claims.token_version):
+        raise TokenRevokedException
+    return claims
+
+
 async def get_current_admin_user(current_user: User = Depends(get_current_user)) -> User:
     """Проверяем права пользователя как администратора."""
     if current_user.role.name == 'admin':
         return current_user
     raise ForbiddenException
+
+
+async def get_current_admin_claims(claims: TokenClaimsSchema = Depends(get_token_claims)) -> TokenClaimsSchema:
+    """Проверяем права администратора по claims токена, без обращения к БД."""
+    if claims.role == 'admin':
+        return claims
+    raise ForbiddenException
@@ -30,6 +30,12 @@ TokenExpiredException = HTTPException(
     detail='Токен истек'
 )
 
+# Токен выдан до изменения пользователя или его роли
+TokenRevokedException = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail='Токен устарел, войдите заново'
+)
+
 # Некорректный формат токена
 InvalidTokenFormatException = HTTPException(
     status_code=status.HTTP_400_BAD_REQUEST,
@@ -60,3 +66,9 @@ ForbiddenException = HTTPException(
     status_code=status.HTTP_403_FORBIDDEN,
     detail='Недостаточно прав'
 )
+
+# Слишком много пользователей в запросе массовой регистрации
+BulkRegisterTooLargeException = HTTPException(
+    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    detail='Слишком много пользователей в одном запросе'
+)
@@ -1,14 +1,24 @@
 from typing import Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+
+from src.auth.models import User
+from src.dao.base_dao import check_filter_schema
 
 
 class UserFilter(BaseModel):
     id: Optional[int] = Field(None, description="Фильтр по id (точное совпадение)")
-    first_name: Optional[str] = Field(None, description="Фильтр по имени (частичное совпадение)")
-    last_name: Optional[str] = Field(None, description="Фильтр по имени (частичное совпадение)")
+    first_name__icontains: Optional[str] = Field(
+        None, alias="first_name", description="Фильтр по имени (частичное совпадение)"
+    )
+    last_name__icontains: Optional[str] = Field(
+        None, alias="last_name", description="Фильтр по имени (частичное совпадение)"
+    )
     email: Optional[str] = Field(None, description="Фильтр по email (точное совпадение)")
-    phone: Optional[str] = Field(None, description="Фильтр по phone (точное совпадение)")
+    phone_number: Optional[str] = Field(None, alias="phone", description="Фильтр по phone (точное совпадение)")
+
+    # запрещает передачу дополнительных полей
+    model_config = ConfigDict(extra="forbid", populate_by_name=True)
+
 
-    class Config:
-        extra = "forbid"  # запрещает передачу дополнительных полей
+check_filter_schema(User, UserFilter)
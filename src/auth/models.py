@@ -1,10 +1,10 @@
 from sqlalchemy import text, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from src.dao.base_model import Base, str_uniq
+from src.dao.base_model import Base, Versioned, str_uniq
 
 
-class Role(Base):
+class Role(Versioned, Base):
     name: Mapped[str_uniq]
     users: Mapped[list["User"]] = relationship(back_populates="role")
 
@@ -12,7 +12,7 @@ class Role(Base):
         return f"{self.__class__.__name__}(id={self.id}, name={self.name})"
 
 
-class User(Base):
+class User(Versioned, Base):
     phone_number: Mapped[str_uniq]
     first_name: Mapped[str]
     last_name: Mapped[str]
@@ -20,6 +20,9 @@ class User(Base):
     password: Mapped[str]
     role_id: Mapped[int] = mapped_column(ForeignKey('roles.id'), default=1, server_default=text("1"))
     role: Mapped["Role"] = relationship("Role", back_populates="users", lazy="joined")
+    # Поднимается при изменении роли, email или пароля пользователя и при изменении самой роли,
+    # делая выданные токены устаревшими
+    token_version: Mapped[int] = mapped_column(default=1, server_default=text("1"))
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}(id={self.id})"
@@ -24,7 +24,7 @@ async def login_user(
     if not (user and await authenticate_user(user=user, password=user_data.password)):
         raise IncorrectEmailOrPasswordException
 
-    atoken, rtoken = set_tokens(response, user.id)
+    atoken, rtoken = set_tokens(response, user.id, role=user.role.name, token_version=user.token_version)
     return {
         'access_token': atoken,
         'refresh_token': rtoken,
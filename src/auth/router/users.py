@@ -1,22 +1,31 @@
 import loguru
 
-from typing import List, Optional
-from fastapi import APIRouter, Depends, Query, status
-from fastapi.responses import JSONResponse
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Body, Depends, Query, status
+from fastapi.responses import JSONResponse, Response
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.auth.dao import RolesDAO, UsersDAO
-from src.auth.dependencies import get_current_user
+from src.auth.dependencies import get_current_admin_claims, get_current_user
 from src.auth.models import User
 from src.auth.filters import UserFilter
 from src.auth.schemas import (
     RoleModelSchema,
+    UserBulkRegisterItemResultSchema,
+    UserBulkRegisterResultSchema,
     UserModelInfoSchema,
+    UserModelRegisterRawSchema,
     UserModelRegisterSchema,
     UserModelUpdateSchema,
 )
-from src.dao.database import get_session_with_commit, get_session_without_commit
-from src.auth.exceptions import UserNotFoundException
+from src.auth.security import hash_passwords
+from src.core.deadlines import request_deadline
+from src.core.etag import format_etag, get_if_match_version
+from src.dao.base_dao import sorting_pattern
+from src.dao.database import get_session_readonly, get_session_with_commit, readonly_session_factory
+from src.auth.exceptions import BulkRegisterTooLargeException, UserNotFoundException
+from src.settings import settings
 
 router = APIRouter()
 logger = loguru.logger
@@ -28,18 +37,19 @@ async def get_me(user_data: User = Depends(get_current_user)) -> UserModelInfoSc
 
 
 @router.get("/roles")
-async def get_all_roles(session: AsyncSession = Depends(get_session_without_commit)) -> List[RoleModelSchema]:
+async def get_all_roles(session: AsyncSession = Depends(get_session_readonly)) -> List[RoleModelSchema]:
     return await RolesDAO(session).find_all()
 
 
-@router.get('')
+@router.get('', dependencies=[Depends(request_deadline(settings.LIST_REQUEST_TIMEOUT_SECONDS))])
 async def get_all_users(
     filters: UserFilter = Depends(),
     sorting: Optional[str] = Query(
         "id:asc", # Значение по умолчанию
-        description="Поле и направление сортировки, например: 'name:asc', 'email:desc'"
+        pattern=sorting_pattern(UsersDAO.sorting_fields),
+        description="Поле и направление сортировки, например: 'first_name:asc', 'email:desc'"
     ),
-    session: AsyncSession = Depends(get_session_without_commit),
+    session: AsyncSession = Depends(get_session_readonly),
 ) -> List[UserModelInfoSchema]:
     return await UsersDAO(session).find_all(filters=filters, sorting=sorting)
 
@@ -47,11 +57,13 @@ async def get_all_users(
 @router.get("/{id}")
 async def get_user_by_id(
     id: int,
-    session: AsyncSession = Depends(get_session_without_commit),
+    response: Response,
+    session: AsyncSession = Depends(get_session_readonly),
 ) -> UserModelInfoSchema:
     instance = await UsersDAO(session).get_one_by_id(id=id)
     if not instance:
         raise UserNotFoundException
+    response.headers['ETag'] = format_etag(instance.version)
     return instance
 
 
@@ -69,27 +81,91 @@ async def register_user(
     return JSONResponse(new_user.to_dict(), status_code=status.HTTP_201_CREATED)
 
 
+@router.post(
+    "/bulk-register",
+    dependencies=[
+        Depends(get_current_admin_claims),
+        Depends(request_deadline(settings.BULK_REQUEST_TIMEOUT_SECONDS)),
+    ],
+)
+async def bulk_register_users(
+    users: List[Dict[str, Any]] = Body(description="Список пользователей в формате /users/register"),
+    session: AsyncSession = Depends(get_session_with_commit),
+) -> UserBulkRegisterResultSchema:
+    """Массовая регистрация: каждый пользователь принимается или отклоняется отдельно."""
+    if len(users) > settings.BULK_REGISTER_MAX_ITEMS:
+        raise BulkRegisterTooLargeException
+    dao = UsersDAO(session)
+    results = [UserBulkRegisterItemResultSchema(index=index, status='rejected') for index in range(len(users))]
+
+    valid: dict[int, UserModelRegisterRawSchema] = {}
+    for index, raw_user in enumerate(users):
+        try:
+            valid[index] = UserModelRegisterRawSchema.model_validate(raw_user)
+        except ValidationError as e:
+            results[index].errors = [
+                f"{'.'.join(map(str, error['loc']))}: {error['msg']}" if error['loc'] else error['msg']
+                for error in e.errors()
+            ]
+            continue
+        results[index].email = valid[index].email
+
+    # Уникальность проверяется до хеширования, чтобы не тратить CPU на отклоняемых пользователей.
+    # Проверка - в отдельной короткой сессии без транзакции: соединение сессии запроса
+    # берется только для вставки и не простаивает в транзакции, пока идет хеширование
+    async with readonly_session_factory() as check_session:
+        taken_emails, taken_phones = await UsersDAO(check_session).find_taken(
+            emails=[user.email for user in valid.values()],
+            phones=[user.phone_number for user in valid.values()],
+        )
+    for index, user in list(valid.items()):
+        if user.email in taken_emails or user.phone_number in taken_phones:
+            results[index].errors = ['Пользователь уже существует']
+            del valid[index]
+        else:
+            taken_emails.add(user.email)
+            taken_phones.add(user.phone_number)
+
+    password_hashes = await hash_passwords([user.password for user in valid.values()])
+    created = await dao.bulk_create([
+        {**user.model_dump(exclude={'password', 'confirm_password'}), 'password': password_hash}
+        for user, password_hash in zip(valid.values(), password_hashes)
+    ])
+    for index, user in valid.items():
+        if user.email in created:
+            results[index].status = 'accepted'
+            results[index].id = created[user.email]
+        else:
+            results[index].errors = ['Пользователь уже существует']
+
+    accepted = sum(result.status == 'accepted' for result in results)
+    return UserBulkRegisterResultSchema(accepted=accepted, rejected=len(results) - accepted, items=results)
+
+
 @router.put('/{id}')
 @router.patch('/{id}')
 async def update_user(
     id: int,
     new_user_data: UserModelUpdateSchema,
+    response: Response,
+    version: Optional[int] = Depends(get_if_match_version),
     session: AsyncSession = Depends(get_session_with_commit),
 ) -> UserModelInfoSchema:
-    dao = UsersDAO(session)
-    upd_user = await dao.get_one_by_id(id=id)
-    if not upd_user:
+    """С If-Match пользователь обновляется только при совпадении версии, иначе 412."""
+    user = await UsersDAO(session).update(id=id, values=new_user_data, version=version)
+    if not user:
         raise UserNotFoundException
-    return await dao.update(id=id, values=new_user_data)
+    response.headers['ETag'] = format_etag(user.version)
+    return user
 
 
 @router.delete('/{id}')
 async def delete_user(
     id: int,
+    version: Optional[int] = Depends(get_if_match_version),
     session: AsyncSession = Depends(get_session_with_commit),
 ) -> int:
-    dao = UsersDAO(session)
-    del_user = await dao.get_one_by_id(id=id)
-    if not del_user:
+    deleted = await UsersDAO(session).delete(id=id, version=version)
+    if not deleted:
         raise UserNotFoundException
-    return await dao.delete(id=id)
+    return deleted
@@ -1,5 +1,5 @@
 import re
-from typing import Optional, Self
+from typing import List, Literal, Optional, Self
 
 from pydantic import BaseModel, ConfigDict, EmailStr, Field, computed_field, field_validator, model_validator
 
@@ -37,6 +37,7 @@ class UserModelBaseSchema(BaseModel):
 class UserModelInfoSchema(UserModelBaseSchema):
     id: int = Field()
     role: RoleModelSchema = Field()
+    version: int = Field(description="Версия записи (ETag), для If-Match при изменении")
 
     # @computed_field
     # def role_name(self) -> str:
@@ -47,7 +48,8 @@ class UserModelInfoSchema(UserModelBaseSchema):
     #     return self.role.id
 
 
-class UserModelRegisterSchema(UserModelBaseSchema):
+class UserModelRegisterRawSchema(UserModelBaseSchema):
+    """Данные регистрации без хеширования пароля (для массовой регистрации, где хеширование параллельное)."""
     password: str = Field(min_length=5, max_length=50, description="Пароль, от 5 до 50 знаков")
     confirm_password: str = Field(min_length=5, max_length=50, description="Повторите пароль")
 
@@ -55,10 +57,22 @@ class UserModelRegisterSchema(UserModelBaseSchema):
     def check_password(self) -> Self:
         if self.password != self.confirm_password:
             raise ValueError("Пароли не совпадают")
+        return self
+
+
+class UserModelRegisterSchema(UserModelRegisterRawSchema):
+    @model_validator(mode="after")
+    def hash_password(self) -> Self:
         self.password = get_password_hash(self.password)  # хешируем пароль до сохранения в базе данных
         return self
 
 
+class TokenClaimsSchema(BaseModel):
+    user_id: int = Field(description="Идентификатор пользователя")
+    role: str = Field(description="Название роли на момент выдачи токена")
+    token_version: int = Field(description="Версия токенов пользователя на момент выдачи")
+
+
 class UserModelAuthSchema(EmailModel):
     password: str = Field(min_length=5, max_length=50, description="Пароль, от 5 до 50 знаков")
 
@@ -71,3 +85,17 @@ class UserModelUpdateSchema(BaseModel):
     role_id: Optional[int] = None
 
     model_config = ConfigDict(from_attributes=False)
+
+
+class UserBulkRegisterItemResultSchema(BaseModel):
+    index: int = Field(description="Позиция пользователя в запросе")
+    status: Literal['accepted', 'rejected'] = Field(description="Результат регистрации")
+    id: Optional[int] = Field(None, description="Идентификатор созданного пользователя")
+    email: Optional[str] = Field(None, description="Электронная почта")
+    errors: List[str] = Field(default_factory=list, description="Причины отказа")
+
+
+class UserBulkRegisterResultSchema(BaseModel):
+    accepted: int = Field(description="Количество созданных пользователей")
+    rejected: int = Field(description="Количество отклоненных пользователей")
+    items: List[UserBulkRegisterItemResultSchema] = Field(description="Результат по каждому пользователю")
@@ -1,3 +1,7 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
 
 from passlib.context import CryptContext
@@ -9,11 +13,54 @@ from src.settings import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Пул процессов для массового хеширования паролей, создается при первом обращении
+_hashing_pool: ProcessPoolExecutor | None = None
+
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def get_password_hashes(passwords: list[str]) -> list[str]:
+    return [pwd_context.hash(password) for password in passwords]
+
+
+def get_hashing_workers() -> int:
+    return settings.HASHING_WORKERS or os.cpu_count() or 1
+
+
+def get_hashing_pool() -> ProcessPoolExecutor:
+    global _hashing_pool
+    if _hashing_pool is None:
+        # spawn: дочерние процессы не наследуют event loop и соединения с БД родителя
+        _hashing_pool = ProcessPoolExecutor(
+            max_workers=get_hashing_workers(),
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+    return _hashing_pool
+
+
+def shutdown_hashing_pool() -> None:
+    global _hashing_pool
+    if _hashing_pool is not None:
+        _hashing_pool.shutdown(cancel_futures=True)
+        _hashing_pool = None
+
+
+async def hash_passwords(passwords: list[str]) -> list[str]:
+    """Хеширует пароли параллельно во всех процессах пула, не блокируя event loop."""
+    if not passwords:
+        return []
+    # По несколько пачек на процесс: меньше накладных расходов на передачу и равномерная загрузка
+    chunk_size = max(1, -(-len(passwords) // (get_hashing_workers() * 4)))
+    loop = asyncio.get_running_loop()
+    chunks = await asyncio.gather(*[
+        loop.run_in_executor(get_hashing_pool(), get_password_hashes, passwords[i:i + chunk_size])
+        for i in range(0, len(passwords), chunk_size)
+    ])
+    return [password_hash for chunk in chunks for password_hash in chunk]
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -42,8 +89,9 @@ async def authenticate_user(user, password):
     return user
 
 
-def set_tokens(response: Response, user_id: int):
-    new_tokens = create_tokens(data={"sub": str(user_id)})
+def set_tokens(response: Response, user_id: int, role: str, token_version: int):
+    # role и ver позволяют авторизовать запрос по claims токена, не загружая пользователя
+    new_tokens = create_tokens(data={"sub": str(user_id), "role": role, "ver": token_version})
     access_token = new_tokens.get('access_token')
     refresh_token = new_tokens.get("refresh_token")
 
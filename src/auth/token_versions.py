@@ -0,0 +1,68 @@
+import math
+
+import orjson
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.auth.models import User
+from src.dao.database import session_factory
+from src.dao.notify import listener
+
+USER_TOKEN_VERSIONS_CHANNEL = 'user_token_versions'
+
+# Новые версии токенов измененных пользователей; для удаленных ver = null
+NOTIFY_VERSIONS_QUERY = text(
+    "SELECT pg_notify(:channel, json_build_object('id', id, 'ver', token_version)::text) "
+    "FROM users WHERE id = ANY(CAST(:ids AS integer[]))"
+)
+NOTIFY_DELETED_QUERY = text(
+    "SELECT pg_notify(:channel, json_build_object('id', id, 'ver', null)::text) "
+    "FROM unnest(CAST(:ids AS integer[])) AS id"
+)
+
+
+class TokenVersions:
+    """Минимальные допустимые версии токенов пользователей в памяти воркера.
+
+    Хранятся только пользователи, у которых версия поднималась. При подключении
+    LISTEN загружаются из БД, дальше поддерживаются уведомлениями из UsersDAO,
+    поэтому проверка токена по claims не обращается к БД. Пока LISTEN отключен,
+    уведомления теряются: loaded сбрасывается, и проверка идет через БД до
+    следующей успешной загрузки.
+    """
+
+    def __init__(self):
+        self._versions: dict[int, float] = {}
+        self.loaded = False
+
+    def is_current(self, user_id: int, version: int) -> bool:
+        return version >= self._versions.get(user_id, 0)
+
+    async def load(self) -> None:
+        # Уведомления могут прийти, пока идет запрос: версии только растут, поэтому берем максимум
+        async with session_factory() as session:
+            result = await session.execute(select(User.id, User.token_version).where(User.token_version > 1))
+            for row in result.all():
+                self._versions[row.id] = max(self._versions.get(row.id, 0), row.token_version)
+        self.loaded = True
+
+    def invalidate(self) -> None:
+        self.loaded = False
+
+    def handle_notification(self, payload: str) -> None:
+        data = orjson.loads(payload)
+        version = math.inf if data['ver'] is None else data['ver']
+        self._versions[data['id']] = max(self._versions.get(data['id'], 0), version)
+
+
+async def notify_token_versions(session: AsyncSession, action: str, ids: list[int]) -> None:
+    """Рассылает воркерам новые версии токенов (доставляется после коммита)."""
+    query = NOTIFY_DELETED_QUERY if action == 'delete' else NOTIFY_VERSIONS_QUERY
+    await session.execute(query, {'channel': USER_TOKEN_VERSIONS_CHANNEL, 'ids': ids})
+
+
+token_versions = TokenVersions()
+
+listener.add_handler(USER_TOKEN_VERSIONS_CHANNEL, token_versions.handle_notification)
+listener.on_connect(token_versions.load)
+listener.on_disconnect(token_versions.invalidate)
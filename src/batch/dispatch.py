@@ -0,0 +1,163 @@
+import asyncio
+from urllib.parse import urlsplit
+
+import loguru
+import orjson
+from fastapi import Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.exceptions import HTTPException
+from starlette.types import Message
+
+from src.batch.schemas import BatchOperationResultSchema, BatchOperationSchema
+from src.core.deadlines import request_timeout
+from src.core.log_pipeline import audit_position, discard_audit_records
+from src.dao.database import batch_session
+from src.settings import settings
+
+logger = loguru.logger
+
+# Заголовки пакетного запроса, которые наследуют операции (авторизация и трассировка)
+INHERITED_HEADERS = {b'access_token', b'refresh_token', b'x-request-id', b'user-agent'}
+# Ключи scope, которые маршрутизатор заполняет заново для каждой операции
+ROUTE_SCOPE_KEYS = ('route', 'endpoint', 'path_params', 'fastapi_inner_astack', 'fastapi_function_astack')
+
+NOT_EXECUTED_BODY = {'detail': 'Операция не выполнялась: пакет откатан'}
+INTERNAL_ERROR_BODY = {'detail': 'Внутренняя ошибка сервера'}
+
+
+async def dispatch(request: Request, index: int, operation: BatchOperationSchema) -> BatchOperationResultSchema:
+    """Выполняет операцию через маршрутизатор приложения, минуя middleware пакетного запроса.
+
+    Исключения маршрутов обрабатывает сам маршрутизатор, а 404/405 для несуществующего
+    маршрута или метода он бросает наружу: они становятся ответом операции. Бюджет
+    времени, заданный маршрутом операции (request_deadline), действует только на нее.
+    """
+    url = urlsplit(operation.path)
+    body = b'' if operation.body is None else orjson.dumps(operation.body)
+    headers = [(name, value) for name, value in request.scope['headers'] if name in INHERITED_HEADERS] + [
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(body)).encode()),
+    ]
+    if operation.if_match is not None:
+        headers.append((b'if-match', operation.if_match.encode()))
+    scope = {key: value for key, value in request.scope.items() if key not in ROUTE_SCOPE_KEYS}
+    scope.update(
+        method=operation.method,
+        path=url.path,
+        raw_path=url.path.encode(),
+        query_string=url.query.encode(),
+        headers=headers,
+    )
+    request_sent = False
+    response_start: Message = {}
+    response_body = []
+
+    async def receive() -> Message:
+        nonlocal request_sent
+        if request_sent:
+            return {'type': 'http.disconnect'}
+        request_sent = True
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message: Message) -> None:
+        if message['type'] == 'http.response.start':
+            response_start.update(message)
+        elif message['type'] == 'http.response.body':
+            response_body.append(message.get('body', b''))
+
+    timeout = request_timeout.set(request_timeout.get())
+    try:
+        await request.app.router(scope, receive, send)
+    except HTTPException as e:
+        return BatchOperationResultSchema(index=index, status=e.status_code, body={'detail': e.detail})
+    finally:
+        request_timeout.reset(timeout)
+    content = b''.join(response_body)
+    content_type = dict(response_start.get('headers', [])).get(b'content-type', b'')
+    if not content:
+        result_body = None
+    elif content_type.startswith(b'application/json'):
+        result_body = orjson.loads(content)
+    else:
+        result_body = content.decode(errors='replace')
+    return BatchOperationResultSchema(index=index, status=response_start['status'], body=result_body)
+
+
+async def run_operations(
+    request: Request,
+    session: AsyncSession,
+    operations: list[BatchOperationSchema],
+    atomic: bool,
+) -> tuple[list[BatchOperationResultSchema], bool]:
+    """Выполняет операции пакета по порядку; возвращает ответы и признак, что пакет можно зафиксировать.
+
+    Пока пакет ничего не изменил, подряд идущие GET не зависят друг от друга
+    и выполняются параллельно в отдельных сессиях. Остальные операции идут
+    последовательно в сессии пакета; в режиме best_effort каждая - в своем SAVEPOINT.
+    """
+    results: list[BatchOperationResultSchema] = []
+    wrote = False
+    position = 0
+    while position < len(operations):
+        end = position
+        while not wrote and end < len(operations) and operations[end].method == 'GET':
+            end += 1
+        if end - position > 1:
+            results += await run_reads_concurrently(request, position, operations[position:end])
+            position = end
+        else:
+            wrote = wrote or operations[position].method != 'GET'
+            results.append(await run_in_session(request, session, position, operations[position], atomic))
+            position += 1
+        if atomic and results[-1].status >= status.HTTP_400_BAD_REQUEST:
+            failed = next(result for result in results if result.status >= status.HTTP_400_BAD_REQUEST)
+            logger.info(f"Пакет откатан из-за операции {failed.index} со статусом {failed.status}")
+            results += [
+                BatchOperationResultSchema(index=index, status=status.HTTP_424_FAILED_DEPENDENCY, body=NOT_EXECUTED_BODY)
+                for index in range(position, len(operations))
+            ]
+            return results, False
+    return results, True
+
+
+async def run_reads_concurrently(
+    request: Request, start: int, operations: list[BatchOperationSchema]
+) -> list[BatchOperationResultSchema]:
+    semaphore = asyncio.Semaphore(settings.BATCH_READ_CONCURRENCY)
+
+    async def run_isolated(index: int, operation: BatchOperationSchema) -> BatchOperationResultSchema:
+        # Задача работает в копии контекста: сброс сессии пакета не виден остальным операциям
+        batch_session.set(None)
+        async with semaphore:
+            try:
+                return await dispatch(request, index, operation)
+            except Exception:
+                logger.exception(f"Ошибка операции {index} пакетного запроса")
+                return BatchOperationResultSchema(
+                    index=index, status=status.HTTP_500_INTERNAL_SERVER_ERROR, body=INTERNAL_ERROR_BODY
+                )
+
+    return list(await asyncio.gather(*[
+        run_isolated(start + offset, operation) for offset, operation in enumerate(operations)
+    ]))
+
+
+async def run_in_session(
+    request: Request, session: AsyncSession, index: int, operation: BatchOperationSchema, atomic: bool
+) -> BatchOperationResultSchema:
+    savepoint = None if atomic else await session.begin_nested()
+    audit_start = audit_position(session)
+    try:
+        result = await dispatch(request, index, operation)
+    except Exception:
+        logger.exception(f"Ошибка операции {index} пакетного запроса")
+        result = BatchOperationResultSchema(
+            index=index, status=status.HTTP_500_INTERNAL_SERVER_ERROR, body=INTERNAL_ERROR_BODY
+        )
+    if savepoint is not None:
+        if result.status >= status.HTTP_400_BAD_REQUEST:
+            await savepoint.rollback()
+            discard_audit_records(session, audit_start)
+        else:
+            await savepoint.commit()
+    return result
@@ -0,0 +1,7 @@
+from fastapi import status, HTTPException
+
+
+BatchTooLargeException = HTTPException(
+    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    detail='Слишком много операций в пакете',
+)
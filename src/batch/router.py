@@ -0,0 +1,35 @@
+import loguru
+
+from fastapi import APIRouter, Request
+
+from src.batch.dispatch import run_operations
+from src.batch.exceptions import BatchTooLargeException
+from src.batch.schemas import BatchRequestSchema, BatchResponseSchema
+from src.dao.database import batch_session, session_factory
+from src.settings import settings
+
+router = APIRouter()
+logger = loguru.logger
+
+
+@router.post('')
+async def run_batch(request: Request, batch: BatchRequestSchema) -> BatchResponseSchema:
+    """Выполняет операции над /products и /users в одной сессии и транзакции."""
+    if len(batch.operations) > settings.BATCH_MAX_OPERATIONS:
+        raise BatchTooLargeException
+    async with session_factory() as session:
+        token = batch_session.set(session)
+        try:
+            results, committed = await run_operations(
+                request, session, batch.operations, atomic=batch.mode == 'atomic'
+            )
+            if committed:
+                await session.commit()
+            else:
+                await session.rollback()
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            batch_session.reset(token)
+    return BatchResponseSchema(committed=committed, results=results)
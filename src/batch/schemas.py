@@ -0,0 +1,45 @@
+from typing import Any, List, Literal, Optional
+from urllib.parse import urlsplit
+
+from pydantic import BaseModel, Field, field_validator
+
+# Маршруты, доступные в пакете, и исключения из них (потоковые и массовые)
+BATCH_PATH_PREFIXES = ('/products', '/users')
+BATCH_EXCLUDED_PATHS = ('/products/events', '/users/bulk-register')
+
+
+class BatchOperationSchema(BaseModel):
+    method: Literal['GET', 'POST', 'PUT', 'PATCH', 'DELETE'] = Field(description="HTTP-метод операции")
+    path: str = Field(description="Путь маршрута с параметрами запроса, например /products/1 или /products?article=A1")
+    body: Optional[Any] = Field(None, description="Тело запроса в JSON")
+    if_match: Optional[str] = Field(None, description="Значение If-Match операции (ETag записи)")
+
+    @field_validator('path')
+    @classmethod
+    def validate_path(cls, value: str) -> str:
+        path = urlsplit(value).path.rstrip('/')
+        if not any(path == prefix or path.startswith(prefix + '/') for prefix in BATCH_PATH_PREFIXES):
+            raise ValueError('Допустимы только маршруты /products и /users')
+        if path in BATCH_EXCLUDED_PATHS:
+            raise ValueError('Маршрут недоступен в пакетном запросе')
+        return value
+
+
+class BatchRequestSchema(BaseModel):
+    mode: Literal['atomic', 'best_effort'] = Field(
+        'atomic',
+        description="atomic - при первой ошибке откатывается весь пакет; "
+                    "best_effort - откатывается только ошибочная операция",
+    )
+    operations: List[BatchOperationSchema] = Field(min_length=1, description="Операции в порядке выполнения")
+
+
+class BatchOperationResultSchema(BaseModel):
+    index: int = Field(description="Позиция операции в пакете")
+    status: int = Field(description="HTTP-код ответа операции; 424 - операция не выполнялась")
+    body: Optional[Any] = Field(None, description="Тело ответа операции")
+
+
+class BatchResponseSchema(BaseModel):
+    committed: bool = Field(description="Зафиксированы ли изменения пакета")
+    results: List[BatchOperationResultSchema] = Field(description="Ответы операций в порядке пакета")
@@ -0,0 +1,79 @@
+"""Сравнение сессий для чтения: get_session_without_commit и get_session_readonly.
+
+Запросы к приложению идут в процессе (httpx ASGITransport) на реальную БД из .env.
+Кэш чтений выключается, чтобы каждый запрос доходил до Postgres. Обращения
+к серверу считаются на уровне asyncpg: BEGIN/ROLLBACK/SET, подготовка и выполнение.
+
+    python -m src.benchmarks.read_sessions --requests 500
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import asyncpg
+import httpx
+from asyncpg.prepared_stmt import PreparedStatement
+
+from src.auth.security import create_tokens
+from src.dao.cache import cache
+from src.dao.database import get_session_readonly, get_session_without_commit
+from src.main import app
+
+round_trips = 0
+
+
+def count_round_trips(method):
+    async def wrapper(*args, **kwargs):
+        global round_trips
+        round_trips += 1
+        return await method(*args, **kwargs)
+    return wrapper
+
+
+asyncpg.Connection.execute = count_round_trips(asyncpg.Connection.execute)
+asyncpg.Connection.prepare = count_round_trips(asyncpg.Connection.prepare)
+PreparedStatement.fetch = count_round_trips(PreparedStatement.fetch)
+
+
+async def measure(client: httpx.AsyncClient, url: str, requests: int, headers: dict) -> tuple[float, float, float]:
+    global round_trips
+    for _ in range(10):
+        await client.get(url, headers=headers)
+    round_trips = 0
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = await client.get(url, headers=headers)
+        latencies.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+    latencies.sort()
+    return round_trips / requests, statistics.median(latencies), latencies[int(0.95 * (len(latencies) - 1))]
+
+
+async def main(requests: int, user_id: int, token_version: int) -> None:
+    cache.backend = None
+    token = create_tokens({'sub': str(user_id), 'role': 'user', 'ver': token_version})['access_token']
+    urls = [
+        ('/products?sorting=id:asc', {}),
+        ('/products/stats', {}),
+        (f'/users/{user_id}', {}),
+        ('/users/me', {'access_token': token}),
+    ]
+    print(f"{'маршрут':<28}{'сессия':<22}{'обращений/запрос':>18}{'p50, мс':>10}{'p95, мс':>10}")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url='http://bench') as client:
+        for url, headers in urls:
+            for label, override in (('without_commit', get_session_without_commit), ('readonly', None)):
+                app.dependency_overrides = {get_session_readonly: override} if override else {}
+                trips, p50, p95 = await measure(client, url, requests, headers)
+                print(f"{url:<28}{label:<22}{trips:>18.2f}{p50:>10.2f}{p95:>10.2f}")
+    app.dependency_overrides = {}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=300, help="Запросов на маршрут и вариант сессии")
+    parser.add_argument('--user-id', type=int, default=1, help="Существующий пользователь для /users/{id} и /users/me")
+    parser.add_argument('--token-version', type=int, default=1, help="Текущая token_version пользователя")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.user_id, args.token_version))
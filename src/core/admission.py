@@ -0,0 +1,116 @@
+import asyncio
+
+from fastapi import Request, status
+from fastapi.responses import ORJSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.core.metrics import metrics
+from src.settings import settings
+
+READ_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+
+class AdmissionRejected(Exception):
+    pass
+
+
+class AdmissionLimiter:
+    """Ограничение одновременных запросов одного класса с ограниченной очередью ожидания.
+
+    Запрос ждет свободного места не дольше timeout; если очередь уже заполнена,
+    он отклоняется сразу, не дожидаясь таймаутов пула соединений и клиента.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(limit)
+        metrics.register_gauge(f'admission.{name}.active', lambda: self.active)
+        metrics.register_gauge(f'admission.{name}.waiting', lambda: self.waiting)
+
+    async def acquire(self) -> None:
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue:
+                metrics.inc(f'admission.{self.name}.rejected_queue_full')
+                raise AdmissionRejected
+            self.waiting += 1
+            # Ожидание в той же задаче, без wait_for: место, переданное ожидающему одновременно
+            # с таймаутом или отменой запроса, Semaphore.acquire сам возвращает при CancelledError
+            try:
+                async with asyncio.timeout(self.timeout):
+                    await self._semaphore.acquire()
+            except TimeoutError:
+                metrics.inc(f'admission.{self.name}.rejected_timeout')
+                raise AdmissionRejected
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.active += 1
+        metrics.inc(f'admission.{self.name}.admitted')
+
+    def release(self) -> None:
+        self.active -= 1
+        self._semaphore.release()
+
+
+def overloaded_response(retry_after: int) -> ORJSONResponse:
+    return ORJSONResponse(
+        {'detail': 'Сервис перегружен, повторите запрос позже'},
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={'Retry-After': str(retry_after)},
+    )
+
+
+class AdmissionControlMiddleware:
+    """Контроль допуска запросов по классам: чтение, запись и auth (bcrypt).
+
+    При перегрузке лишние запросы быстро получают 503 с Retry-After, а не ждут
+    соединения из пула, замедляя всех. Пути из exempt_prefixes (долгие потоки SSE,
+    админка) не ограничиваются.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiters: dict[str, AdmissionLimiter],
+        auth_paths: set[str],
+        exempt_prefixes: tuple[str, ...] = (),
+        retry_after: int = 1,
+    ):
+        self.app = app
+        self.limiters = limiters
+        self.auth_paths = auth_paths
+        self.exempt_prefixes = exempt_prefixes
+        self.retry_after = retry_after
+
+    def classify(self, method: str, path: str) -> str:
+        if path in self.auth_paths:
+            return 'auth'
+        return 'read' if method in READ_METHODS else 'write'
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        path = scope.get('path', '').rstrip('/')
+        if scope['type'] != 'http' or path.startswith(self.exempt_prefixes):
+            await self.app(scope, receive, send)
+            return
+        limiter = self.limiters[self.classify(scope['method'], path)]
+        try:
+            await limiter.acquire()
+        except AdmissionRejected:
+            await overloaded_response(self.retry_after)(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+
+async def pool_timeout_handler(request: Request, exc: Exception) -> ORJSONResponse:
+    """Пул соединений исчерпан дольше pool_timeout: отвечаем 503, а не 500."""
+    metrics.inc('admission.pool_timeouts')
+    return overloaded_response(settings.ADMISSION_RETRY_AFTER)
@@ -0,0 +1,195 @@
+import time
+import zlib
+from typing import Callable
+
+from anyio import to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.metrics import metrics
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - опциональная зависимость
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - опциональная зависимость
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml')
+# text/event-stream не сжимаем: события должны уходить клиенту сразу
+EXCLUDED_TYPES = ('text/event-stream',)
+
+
+class GzipCompressor:
+    def __init__(self):
+        self._compressor = zlib.compressobj(5, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliCompressor:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=4)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdCompressor:
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=3).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+# В порядке предпочтения сервера при равных q-значениях клиента
+COMPRESSORS: dict[str, Callable[[], GzipCompressor | BrotliCompressor | ZstdCompressor]] = {}
+if zstandard is not None:
+    COMPRESSORS['zstd'] = ZstdCompressor
+if brotli is not None:
+    COMPRESSORS['br'] = BrotliCompressor
+COMPRESSORS['gzip'] = GzipCompressor
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """Выбирает кодировку по заголовку Accept-Encoding с учетом q-значений."""
+    weights = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        try:
+            weight = float(params.strip()[2:]) if params.strip().startswith('q=') else 1.0
+        except ValueError:
+            weight = 0.0
+        weights[name.strip().lower()] = weight
+    candidates = [
+        (weights.get(encoding, weights.get('*', 0.0)), -position, encoding)
+        for position, encoding in enumerate(COMPRESSORS)
+    ]
+    weight, _, encoding = max(candidates)
+    return encoding if weight > 0 else None
+
+
+def is_compressible(headers: Headers) -> bool:
+    content_type = headers.get('content-type', '')
+    if 'content-encoding' in headers or content_type.startswith(EXCLUDED_TYPES):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES) or '+json' in content_type
+
+
+for _encoding in COMPRESSORS:
+    metrics.register_gauge(
+        f'compression.{_encoding}.ratio',
+        lambda encoding=_encoding: (
+            metrics.get(f'compression.{encoding}.bytes_out') / metrics.get(f'compression.{encoding}.bytes_in')
+            if metrics.get(f'compression.{encoding}.bytes_in') else None
+        ),
+    )
+
+
+class CompressionMiddleware:
+    """Сжатие ответов по Accept-Encoding: zstd/br (если установлены) и gzip.
+
+    Ответы меньше minimum_size не сжимаются. Куски от offload_size и больше
+    сжимаются в пуле потоков, чтобы не блокировать event loop. Потоковые ответы
+    сжимаются по кускам. Объем до/после сжатия и затраченное CPU-время пишутся в метрики.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, offload_size: int = 64 * 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get('accept-encoding', ''))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.downstream_send = send
+        self.start_message: Message | None = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if message['type'] == 'http.response.start':
+            self.start_message = message
+            return
+        if message['type'] != 'http.response.body' or self.passthrough:
+            if self.compressor is None and not self.passthrough:
+                # Например, http.response.pathsend: тело отдается не через нас
+                self.passthrough = True
+                await self.downstream_send(self.start_message)
+            await self.downstream_send(message)
+            return
+
+        body = message.get('body', b'')
+        more_body = message.get('more_body', False)
+
+        if self.compressor is None:
+            headers = MutableHeaders(raw=self.start_message['headers'])
+            if not is_compressible(headers):
+                self.passthrough = True
+            else:
+                headers.add_vary_header('Accept-Encoding')
+                if not more_body and len(body) < self.middleware.minimum_size:
+                    self.passthrough = True
+            if self.passthrough:
+                await self.downstream_send(self.start_message)
+                await self.downstream_send(message)
+                return
+
+            self.compressor = COMPRESSORS[self.encoding]()
+            headers['Content-Encoding'] = self.encoding
+            if more_body:
+                del headers['Content-Length']
+            else:
+                body = await self.compress(body, finish=True)
+                headers['Content-Length'] = str(len(body))
+                await self.downstream_send(self.start_message)
+                await self.downstream_send({'type': 'http.response.body', 'body': body})
+                return
+            await self.downstream_send(self.start_message)
+
+        body = await self.compress(body, finish=not more_body)
+        await self.downstream_send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
+
+    async def compress(self, data: bytes, finish: bool) -> bytes:
+        if len(data) >= self.middleware.offload_size:
+            metrics.inc(f'compression.{self.encoding}.offloaded')
+            return await to_thread.run_sync(self._compress, data, finish)
+        return self._compress(data, finish)
+
+    def _compress(self, data: bytes, finish: bool) -> bytes:
+        started = time.thread_time()
+        result = self.compressor.compress(data) if data else b''
+        if finish:
+            result += self.compressor.finish()
+            metrics.inc(f'compression.{self.encoding}.responses')
+        metrics.inc(f'compression.{self.encoding}.cpu_seconds', time.thread_time() - started)
+        metrics.inc(f'compression.{self.encoding}.bytes_in', len(data))
+        metrics.inc(f'compression.{self.encoding}.bytes_out', len(result))
+        return result
@@ -0,0 +1,86 @@
+import time
+from contextvars import ContextVar
+from typing import Callable
+
+from fastapi import Request, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.exc import DBAPIError
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.core.exceptions import RequestDeadlineExceededException
+from src.core.metrics import metrics
+from src.settings import settings
+
+# Момент поступления запроса (time.monotonic) и его бюджет времени (сек)
+request_started: ContextVar[float | None] = ContextVar('request_started', default=None)
+request_timeout: ContextVar[float] = ContextVar('request_timeout', default=settings.REQUEST_TIMEOUT_SECONDS)
+
+QUERY_CANCELED = '57014'
+LOCK_NOT_AVAILABLE = '55P03'
+
+
+class DeadlineMiddleware:
+    """Запоминает момент поступления запроса: от него отсчитывается бюджет времени,
+    включая ожидание в очереди контроля допуска."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        started = request_started.set(time.monotonic())
+        timeout = request_timeout.set(settings.REQUEST_TIMEOUT_SECONDS)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_started.reset(started)
+            request_timeout.reset(timeout)
+
+
+def request_deadline(seconds: float) -> Callable:
+    """Зависимость маршрута, заменяющая глобальный бюджет времени запроса."""
+
+    async def set_request_timeout() -> None:
+        request_timeout.set(seconds)
+
+    return set_request_timeout
+
+
+def remaining_time() -> float:
+    """Сколько секунд осталось у текущего запроса."""
+    started = request_started.get()
+    if started is None:
+        return request_timeout.get()
+    remaining = started + request_timeout.get() - time.monotonic()
+    if remaining <= 0:
+        metrics.inc('deadlines.expired_before_query')
+        raise RequestDeadlineExceededException
+    return remaining
+
+
+def timeout_response(retry_after: bool = False) -> ORJSONResponse:
+    if retry_after:
+        return ORJSONResponse(
+            {'detail': 'Ресурс заблокирован другим запросом, повторите позже'},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={'Retry-After': str(settings.ADMISSION_RETRY_AFTER)},
+        )
+    return ORJSONResponse(
+        {'detail': RequestDeadlineExceededException.detail},
+        status_code=RequestDeadlineExceededException.status_code,
+    )
+
+
+async def query_timeout_handler(request: Request, exc: Exception) -> ORJSONResponse:
+    """Отмененный по statement_timeout/lock_timeout или command_timeout запрос - 504/503 вместо 500."""
+    if isinstance(exc, DBAPIError):
+        sqlstate = getattr(exc.orig, 'sqlstate', None)
+        if sqlstate == LOCK_NOT_AVAILABLE:
+            metrics.inc('deadlines.lock_timeouts')
+            return timeout_response(retry_after=True)
+        if sqlstate != QUERY_CANCELED:
+            raise exc
+    metrics.inc('deadlines.statement_timeouts')
+    return timeout_response()
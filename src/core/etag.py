@@ -0,0 +1,20 @@
+from typing import Optional
+
+from fastapi import Header
+
+from src.dao.exceptions import VersionConflictException
+
+
+def format_etag(version: int) -> str:
+    """ETag записи - ее версия."""
+    return f'"{version}"'
+
+
+async def get_if_match_version(if_match: Optional[str] = Header(None)) -> int | None:
+    """Ожидаемая версия записи из If-Match; None - без проверки (заголовка нет или If-Match: *)."""
+    if if_match is None or if_match.strip() == '*':
+        return None
+    value = if_match.strip().removeprefix('W/').strip('"')
+    if not value.isdigit():
+        raise VersionConflictException
+    return int(value)
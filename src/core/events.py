@@ -0,0 +1,98 @@
+import asyncio
+from collections import deque
+from typing import AsyncGenerator
+
+import orjson
+
+# Сигнал подписчику, что часть событий потеряна и нужно досинхронизироваться
+RESET = object()
+
+
+class Subscription:
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def reset(self) -> None:
+        """Очищает очередь и оставляет в ней только сигнал RESET."""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(RESET)
+
+
+class EventBroker:
+    """Раздает события из одного источника множеству подписчиков.
+
+    У каждого подписчика своя ограниченная очередь: медленный подписчик при
+    переполнении получает RESET и отключается, не задерживая остальных.
+    Последние history_size событий хранятся для возобновления по Last-Event-ID.
+    """
+
+    def __init__(self, queue_size: int, history_size: int):
+        self._queue_size = queue_size
+        self._history: deque[tuple[str, dict]] = deque(maxlen=history_size)
+        self._subscribers: set[Subscription] = set()
+
+    @property
+    def subscribers_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event_id: str, data: dict) -> None:
+        self._history.append((event_id, data))
+        for subscription in list(self._subscribers):
+            try:
+                subscription.queue.put_nowait((event_id, data))
+            except asyncio.QueueFull:
+                self._subscribers.discard(subscription)
+                subscription.reset()
+
+    def reset_all(self) -> None:
+        """Сбрасывает всех подписчиков (например, после потери соединения с источником)."""
+        for subscription in self._subscribers:
+            subscription.reset()
+        self._subscribers.clear()
+        self._history.clear()
+
+    def subscribe(self, last_event_id: str | None = None) -> Subscription:
+        subscription = Subscription(self._queue_size)
+        if last_event_id is not None:
+            ids = [event_id for event_id, _ in self._history]
+            if last_event_id not in ids:
+                subscription.queue.put_nowait(RESET)
+                return subscription
+            missed = list(self._history)[ids.index(last_event_id) + 1:]
+            if len(missed) >= self._queue_size:
+                subscription.queue.put_nowait(RESET)
+                return subscription
+            for event in missed:
+                subscription.queue.put_nowait(event)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    async def stream(
+        self, event: str, last_event_id: str | None, heartbeat: float
+    ) -> AsyncGenerator[bytes, None]:
+        """Поток в формате Server-Sent Events.
+
+        После RESET клиент должен досинхронизироваться по последнему полученному id
+        (например, через ленту изменений) и переподключиться; поток завершается.
+        """
+        subscription = self.subscribe(last_event_id)
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                if item is RESET:
+                    data = orjson.dumps({'last_event_id': last_event_id})
+                    yield b"event: reset\ndata: " + data + b"\n\n"
+                    return
+                event_id, data = item
+                last_event_id = event_id
+                yield f"id: {event_id}\nevent: {event}\ndata: ".encode() + orjson.dumps(data) + b"\n\n"
+        finally:
+            self.unsubscribe(subscription)
@@ -0,0 +1,25 @@
+from fastapi import status, HTTPException
+
+# Ключ идемпотентности уже использован с другим телом запроса
+IdempotencyKeyMismatchException = HTTPException(
+    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+    detail='Idempotency-Key уже использован с другим запросом'
+)
+
+# Запрос с этим ключом идемпотентности еще выполняется
+IdempotencyKeyInProgressException = HTTPException(
+    status_code=status.HTTP_409_CONFLICT,
+    detail='Запрос с этим Idempotency-Key еще выполняется'
+)
+
+# Профиль не найден (вытеснен из буфера или снят другим воркером)
+ProfileNotFoundException = HTTPException(
+    status_code=status.HTTP_404_NOT_FOUND,
+    detail='Профиль не найден'
+)
+
+# Бюджет времени запроса исчерпан
+RequestDeadlineExceededException = HTTPException(
+    status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+    detail='Превышено время выполнения запроса'
+)
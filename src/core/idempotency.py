@@ -0,0 +1,302 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.auth.dependencies import decode_access_token
+from src.core.exceptions import IdempotencyKeyInProgressException, IdempotencyKeyMismatchException
+from src.core.metrics import metrics
+from src.dao.database import session_factory
+from src.dao.models import IdempotencyKey
+
+# Заголовки, которые не сохраняются: сервер выставит их заново
+SKIPPED_HEADERS = {b'date', b'server'}
+# Ошибки клиента, которые повтор того же запроса гарантированно получит снова. Остальные
+# (401, 403, 409, 422, 429, перегрузка) зависят от момента запроса и не сохраняются
+STORED_CLIENT_ERRORS = {400, 413}
+
+
+def is_stored_status(status_code: int) -> bool:
+    return 200 <= status_code < 300 or status_code in STORED_CLIENT_ERRORS
+
+
+def caller_identity(scope: Scope, body: bytes) -> str:
+    """Владелец ключа идемпотентности, чтобы разные клиенты с одинаковым ключом не получали чужие ответы.
+
+    Субъект проверенного access_token; без него - email из тела (регистрация);
+    иначе адрес клиента. От остального тела владелец не зависит: повтор ключа
+    с другим телом попадает на тот же ключ и отклоняется как несовпадение.
+    """
+    token = Headers(scope=scope).get('access_token')
+    if token:
+        try:
+            return f"sub:{decode_access_token(token)['sub']}"
+        except HTTPException:
+            pass
+    try:
+        data = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        data = None
+    if isinstance(data, dict) and isinstance(data.get('email'), str):
+        return f"email:{data['email'].strip().lower()}"
+    client = scope.get('client')
+    return f"client:{client[0]}" if client else 'anonymous'
+
+
+@dataclass
+class StoredResponse:
+    fingerprint: str
+    status_code: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+
+
+class DatabaseIdempotencyBackend:
+    """Уровень хранения в Postgres: видит ключи всех воркеров.
+
+    Ключ занимается вставкой строки без ответа; занятый ключ освобождается
+    по истечении lock_seconds, если воркер упал, не дописав ответ.
+    """
+
+    def __init__(self, ttl: float, lock_seconds: float):
+        self.ttl = ttl
+        self.lock_seconds = lock_seconds
+
+    async def claim(self, key: str, fingerprint: str) -> StoredResponse | None | bool:
+        """Возвращает сохраненный ответ, True если ключ занят нами, False если он занят другим запросом."""
+        now = datetime.now()
+        async with session_factory() as session:
+            await session.execute(
+                delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.expires_at < now)
+            )
+            claimed = await session.execute(
+                pg_insert(IdempotencyKey)
+                .values(key=key, fingerprint=fingerprint, expires_at=now + timedelta(seconds=self.lock_seconds))
+                .on_conflict_do_nothing(index_elements=['key'])
+                .returning(IdempotencyKey.id)
+            )
+            if claimed.scalar_one_or_none() is not None:
+                await session.commit()
+                return True
+            await session.commit()
+            record = (await session.execute(select(IdempotencyKey).where(IdempotencyKey.key == key))).scalar_one_or_none()
+        if record is None or record.status_code is None:
+            return False
+        return StoredResponse(
+            fingerprint=record.fingerprint,
+            status_code=record.status_code,
+            headers=[(name.encode('latin-1'), value.encode('latin-1')) for name, value in record.headers],
+            body=record.body,
+        )
+
+    async def complete(self, key: str, response: StoredResponse) -> None:
+        async with session_factory() as session:
+            await session.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key == key)
+                .values(
+                    status_code=response.status_code,
+                    headers=[[name.decode('latin-1'), value.decode('latin-1')] for name, value in response.headers],
+                    body=response.body,
+                    expires_at=datetime.now() + timedelta(seconds=self.ttl),
+                )
+            )
+            await session.commit()
+
+    async def release(self, key: str) -> None:
+        async with session_factory() as session:
+            await session.execute(
+                delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None))
+            )
+            await session.commit()
+
+
+class IdempotencyStore:
+    """Ограниченный LRU-кэш ответов с TTL в памяти воркера и опциональный уровень в БД.
+
+    Одновременные запросы с одним ключом ждут завершения первого и получают его ответ.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl: float,
+        wait_timeout: float,
+        backend: DatabaseIdempotencyBackend | None = None,
+        poll_interval: float = 0.1,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self._responses: OrderedDict[str, tuple[float, StoredResponse]] = OrderedDict()
+        self._in_flight: dict[str, asyncio.Future] = {}
+
+    def _get(self, key: str) -> StoredResponse | None:
+        item = self._responses.get(key)
+        if item is None:
+            return None
+        expires_at, response = item
+        if expires_at < time.monotonic():
+            del self._responses[key]
+            return None
+        self._responses.move_to_end(key)
+        return response
+
+    def _put(self, key: str, response: StoredResponse) -> None:
+        self._responses[key] = (time.monotonic() + self.ttl, response)
+        self._responses.move_to_end(key)
+        while len(self._responses) > self.max_entries:
+            self._responses.popitem(last=False)
+
+    async def acquire(self, key: str, fingerprint: str) -> StoredResponse | None:
+        """Возвращает сохраненный ответ либо None, если запрос нужно выполнить (ключ занят нами)."""
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            response = self._get(key)
+            if response is not None:
+                return response
+            in_flight = self._in_flight.get(key)
+            if in_flight is not None:
+                try:
+                    await asyncio.wait_for(asyncio.shield(in_flight), timeout=deadline - time.monotonic())
+                except asyncio.TimeoutError:
+                    raise IdempotencyKeyInProgressException
+                continue
+            self._in_flight[key] = asyncio.get_running_loop().create_future()
+            if self.backend is None:
+                return None
+            try:
+                claimed = await self.backend.claim(key, fingerprint)
+            except Exception:
+                self._finish(key)
+                raise
+            if claimed is True:
+                return None
+            self._finish(key)
+            if isinstance(claimed, StoredResponse):
+                self._put(key, claimed)
+                return claimed
+            # Ключ занят запросом в другом воркере
+            if time.monotonic() >= deadline:
+                raise IdempotencyKeyInProgressException
+            await asyncio.sleep(self.poll_interval)
+
+    async def complete(self, key: str, response: StoredResponse) -> None:
+        self._put(key, response)
+        try:
+            if self.backend is not None:
+                await self.backend.complete(key, response)
+        finally:
+            self._finish(key)
+
+    async def release(self, key: str) -> None:
+        """Освобождает ключ без сохранения ответа, чтобы повтор выполнился заново."""
+        try:
+            if self.backend is not None:
+                await self.backend.release(key)
+        finally:
+            self._finish(key)
+
+    def _finish(self, key: str) -> None:
+        future = self._in_flight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(None)
+
+
+def error_response(exc: HTTPException) -> ORJSONResponse:
+    return ORJSONResponse({'detail': exc.detail}, status_code=exc.status_code)
+
+
+class IdempotencyMiddleware:
+    """Поддержка заголовка Idempotency-Key для перечисленных маршрутов (метод, путь).
+
+    Ключ действует в пределах вызывающего (см. caller_identity). Успешный ответ
+    (и детерминированные ошибки STORED_CLIENT_ERRORS) сохраняется, повторы с тем же
+    ключом получают его без повторного выполнения запроса и с заголовком
+    Idempotent-Replayed: true; после остальных ответов ключ освобождается для повтора.
+    Тот же ключ того же вызывающего с другим телом запроса отклоняется с 422.
+    """
+
+    def __init__(self, app: ASGIApp, store: IdempotencyStore, routes: set[tuple[str, str]]):
+        self.app = app
+        self.store = store
+        self.routes = routes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or (scope['method'], scope['path'].rstrip('/')) not in self.routes:
+            await self.app(scope, receive, send)
+            return
+        idempotency_key = Headers(scope=scope).get('idempotency-key')
+        if not idempotency_key:
+            await self.app(scope, receive, send)
+            return
+
+        body_messages = []
+        while True:
+            message = await receive()
+            body_messages.append(message)
+            if message['type'] != 'http.request' or not message.get('more_body', False):
+                break
+        body = b''.join(message.get('body', b'') for message in body_messages if message['type'] == 'http.request')
+        fingerprint = hashlib.sha256(body).hexdigest()
+        caller = hashlib.sha256(caller_identity(scope, body).encode()).hexdigest()[:32]
+        key = f"{scope['method']}:{scope['path']}:{caller}:{idempotency_key}"
+
+        try:
+            stored = await self.store.acquire(key, fingerprint)
+        except HTTPException as exc:
+            await error_response(exc)(scope, receive, send)
+            return
+        if stored is not None:
+            if stored.fingerprint != fingerprint:
+                await error_response(IdempotencyKeyMismatchException)(scope, receive, send)
+                return
+            metrics.inc('idempotency.replayed')
+            await send({
+                'type': 'http.response.start',
+                'status': stored.status_code,
+                'headers': stored.headers + [(b'idempotent-replayed', b'true')],
+            })
+            await send({'type': 'http.response.body', 'body': stored.body})
+            return
+
+        async def replay_receive() -> Message:
+            return body_messages.pop(0) if body_messages else await receive()
+
+        response_start: Message = {}
+        response_body = []
+
+        async def capture_send(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                response_start.update(message)
+            elif message['type'] == 'http.response.body':
+                response_body.append(message.get('body', b''))
+            await send(message)
+
+        metrics.inc('idempotency.executed')
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            await self.store.release(key)
+            raise
+        if not response_start or not is_stored_status(response_start['status']):
+            await self.store.release(key)
+            return
+        await self.store.complete(key, StoredResponse(
+            fingerprint=fingerprint,
+            status_code=response_start['status'],
+            headers=[(name, value) for name, value in response_start.get('headers', []) if name not in SKIPPED_HEADERS],
+            body=b''.join(response_body),
+        ))
@@ -0,0 +1,246 @@
+import asyncio
+import sys
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+
+import loguru
+import orjson
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.metrics import metrics
+from src.dao.database import session_factory
+from src.dao.models import AuditLog
+from src.settings import settings
+
+logger = loguru.logger
+
+# Контекст текущего запроса (request_id, user_id) для записей журнала.
+# Словарь изменяемый: его дополняют зависимости, а читает middleware после ответа.
+request_context: ContextVar[dict | None] = ContextVar('request_context', default=None)
+
+OVERFLOW_DROP_NEW = 'drop_new'
+OVERFLOW_DROP_OLDEST = 'drop_oldest'
+STDOUT_PATH = '-'
+
+
+class LogPipeline:
+    """Неблокирующий журнал: записи копятся в ограниченной очереди в памяти,
+    а фоновая задача пачками пишет их строками JSON в файл и/или в таблицу аудита.
+
+    При переполнении очереди запись отбрасывается (drop_new) либо вытесняет
+    самую старую (drop_oldest); отброшенные записи считаются в метриках.
+    file_path '-' пишет строки в stdout. Записи, которым некуда писаться
+    (без файла и, кроме аудита, без БД), в очередь не попадают.
+    """
+
+    def __init__(
+        self,
+        max_queue: int,
+        batch_size: int,
+        flush_interval: float,
+        overflow: str = OVERFLOW_DROP_NEW,
+        file_path: str | None = None,
+        audit_db: bool = True,
+    ):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.file_path = file_path
+        self.audit_db = audit_db
+        self._queue: deque[dict] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._file = None
+        self._owns_file = False
+        metrics.register_gauge('logging.queue_depth', lambda: len(self._queue))
+
+    def emit(self, kind: str, **fields) -> None:
+        """Ставит запись в очередь; никогда не ждет ввода-вывода."""
+        if not self.file_path and not (kind == 'audit' and self.audit_db):
+            return
+        if len(self._queue) >= self.max_queue:
+            metrics.inc(f'logging.{kind}.dropped')
+            if self.overflow != OVERFLOW_DROP_OLDEST:
+                return
+            self._queue.popleft()
+        self._queue.append({'kind': kind, 'ts': datetime.now(), **fields})
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        if self.file_path == STDOUT_PATH:
+            self._file = sys.stdout.buffer
+        elif self.file_path:
+            self._file = await asyncio.to_thread(open, self.file_path, 'ab')
+            self._owns_file = True
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Останавливает фоновую задачу, дописав накопленные записи."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._queue:
+            await self._flush()
+        if self._owns_file:
+            await asyncio.to_thread(self._file.close)
+            self._owns_file = False
+        self._file = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._queue:
+                await self._flush()
+
+    async def _flush(self) -> None:
+        batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+        # Запись считается записанной, если попала хотя бы в один приемник
+        written = 0
+        if self._file is not None:
+            lines = b''.join(
+                orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE) for record in batch
+            )
+            try:
+                await asyncio.to_thread(self._write_file, lines)
+                written = len(batch)
+            except OSError as e:
+                metrics.inc('logging.write_errors')
+                logger.warning(f"Не удалось записать журнал в файл: {e}")
+        audit_rows = [
+            {
+                'table_name': record['table_name'],
+                'action': record['action'],
+                'record_ids': record['ids'],
+                'user_id': record.get('user_id'),
+                'request_id': record.get('request_id'),
+                'created_at': record['ts'],
+            }
+            for record in batch if record['kind'] == 'audit'
+        ]
+        if self.audit_db and audit_rows:
+            try:
+                async with session_factory() as session:
+                    await session.execute(insert(AuditLog), audit_rows)
+                    await session.commit()
+                written = max(written, len(audit_rows))
+            except Exception as e:
+                metrics.inc('logging.audit.dropped', len(audit_rows))
+                metrics.inc('logging.write_errors')
+                logger.warning(f"Не удалось записать аудит в БД: {e}")
+        metrics.inc('logging.written', written)
+
+    def _write_file(self, data: bytes) -> None:
+        self._file.write(data)
+        self._file.flush()
+
+
+def audit_write(session, table_name: str, action: str, ids: list[int]) -> None:
+    """Копит запись аудита в сессии; в журнал она попадет только после коммита."""
+    if not ids:
+        return
+    context = request_context.get() or {}
+    session.info.setdefault('audit_records', []).append({
+        'table_name': table_name,
+        'action': action,
+        'ids': list(ids),
+        'user_id': context.get('user_id'),
+        'request_id': context.get('request_id'),
+    })
+
+
+def audit_position(session) -> int:
+    """Позиция в накопленных записях аудита сессии, например перед SAVEPOINT."""
+    return len(session.info.get('audit_records', []))
+
+
+def discard_audit_records(session, position: int) -> None:
+    """Отбрасывает записи аудита после position (откат SAVEPOINT)."""
+    del session.info.get('audit_records', [])[position:]
+
+
+@event.listens_for(Session, 'after_commit')
+def _emit_audit_records(session: Session) -> None:
+    # События приходят и для SAVEPOINT: записи копятся до коммита внешней транзакции
+    if session.in_nested_transaction():
+        return
+    for record in session.info.pop('audit_records', []):
+        log_pipeline.emit('audit', **record)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_audit_records(session: Session) -> None:
+    # Записи откатанного SAVEPOINT отбрасывает тот, кто его открыл (discard_audit_records)
+    if session.in_nested_transaction():
+        return
+    session.info.pop('audit_records', None)
+
+
+class AccessLogMiddleware:
+    """Журнал доступа: метод, путь, статус и длительность каждого запроса.
+
+    Присваивает запросу X-Request-ID (или берет его из заголовка) и возвращает его в ответе.
+    """
+
+    def __init__(self, app: ASGIApp, pipeline: LogPipeline):
+        self.app = app
+        self.pipeline = pipeline
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        request_id = Headers(scope=scope).get('x-request-id') or uuid.uuid4().hex
+        context = {'request_id': request_id, 'user_id': None}
+        token = request_context.set(context)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_id(message: Message) -> None:
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                MutableHeaders(scope=message)['X-Request-ID'] = request_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_context.reset(token)
+            client = scope.get('client')
+            self.pipeline.emit(
+                'access',
+                request_id=request_id,
+                method=scope['method'],
+                path=scope['path'],
+                query=scope.get('query_string', b'').decode('latin-1'),
+                status=status_code,
+                duration_ms=round((time.perf_counter() - started) * 1000, 2),
+                client=client[0] if client else None,
+                user_id=context['user_id'],
+            )
+
+
+log_pipeline = LogPipeline(
+    max_queue=settings.LOG_QUEUE_SIZE,
+    batch_size=settings.LOG_BATCH_SIZE,
+    flush_interval=settings.LOG_FLUSH_INTERVAL,
+    overflow=settings.LOG_OVERFLOW_POLICY,
+    file_path=settings.LOG_FILE_PATH,
+    audit_db=settings.AUDIT_DB_ENABLED,
+)
@@ -0,0 +1,36 @@
+import threading
+from collections import defaultdict
+from typing import Callable
+
+
+class Metrics:
+    """Внутрипроцессные метрики воркера: счетчики и вычисляемые показатели.
+
+    Счетчики можно увеличивать и из пула потоков.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: defaultdict[str, float] = defaultdict(float)
+        self._gauges: dict[str, Callable[[], float | None]] = {}
+
+    def inc(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def get(self, name: str) -> float:
+        return self._counters.get(name, 0)
+
+    def register_gauge(self, name: str, func: Callable[[], float | None]) -> None:
+        """Регистрирует показатель, который вычисляется в момент снятия снимка."""
+        self._gauges[name] = func
+
+    def snapshot(self) -> dict[str, float | None]:
+        with self._lock:
+            result = dict(self._counters)
+        for name, func in self._gauges.items():
+            result[name] = func()
+        return dict(sorted(result.items()))
+
+
+metrics = Metrics()
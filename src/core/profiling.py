@@ -0,0 +1,177 @@
+import asyncio
+import cProfile
+import io
+import itertools
+import marshal
+import pstats
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from fastapi import HTTPException
+from starlette.datastructures import Headers, MutableHeaders, QueryParams
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.auth.dependencies import get_current_admin_claims, get_token_claims
+from src.core.metrics import metrics
+from src.settings import settings
+
+PROFILE_HEADER = 'x-profile'
+PROFILE_QUERY_PARAM = '__profile'
+# Потоковые ответы профилируем только до отправки заголовков, иначе профиль и блокировка
+# держатся все время жизни подключения
+STREAMING_TYPES = ('text/event-stream',)
+
+
+@dataclass
+class ProfileEntry:
+    id: int
+    method: str
+    path: str
+    status_code: int | None
+    duration: float
+    created_at: datetime
+    reason: str
+    stats: dict = field(repr=False)
+
+    def render(self, sort: str = 'cumulative', limit: int = 50) -> str:
+        """Текстовый отчет pstats по limit самых тяжелых функций."""
+        stream = io.StringIO()
+        profile_stats = pstats.Stats(_StatsSource(dict(self.stats)), stream=stream)
+        profile_stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        profile_stats.print_callers(limit)
+        return stream.getvalue()
+
+    def dump(self) -> bytes:
+        """Профиль в формате cProfile/pstats (открывается в snakeviz, gprof2dot и т.п.)."""
+        return marshal.dumps(self.stats)
+
+
+class _StatsSource:
+    """Источник для pstats.Stats из уже снятой статистики."""
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+class ProfileStore:
+    """Кольцевой буфер последних профилей воркера."""
+
+    def __init__(self, max_entries: int):
+        self._entries: deque[ProfileEntry] = deque(maxlen=max_entries)
+        self._ids = itertools.count(1)
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def add(self, entry: ProfileEntry) -> None:
+        self._entries.append(entry)
+
+    def list(self) -> list[ProfileEntry]:
+        return list(reversed(self._entries))
+
+    def get(self, id: int) -> ProfileEntry | None:
+        return next((entry for entry in self._entries if entry.id == id), None)
+
+
+class ProfilingMiddleware:
+    """Профилирование запроса под cProfile по запросу администратора или по выборке.
+
+    Профиль снимается, если запрос несет заголовок X-Profile: 1 или параметр
+    __profile=1 и токен администратора, либо попал в выборку sample_rate.
+    Одновременно профилируется только один запрос: cProfile снимает весь поток
+    event loop, поэтому в профиль попадает и работа параллельных корутин,
+    а код в пуле потоков не попадает. Для потоковых ответов (SSE) профиль
+    завершается, когда обработчик вернул ответ и отправлены заголовки.
+    """
+
+    def __init__(self, app: ASGIApp, store: ProfileStore, sample_rate: float = 0.0):
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self._lock = asyncio.Lock()
+
+    async def _requested_by_admin(self, scope: Scope) -> bool:
+        headers = Headers(scope=scope)
+        query = QueryParams(scope.get('query_string', b''))
+        if headers.get(PROFILE_HEADER) != '1' and query.get(PROFILE_QUERY_PARAM) != '1':
+            return False
+        token = headers.get('access_token')
+        if not token:
+            return False
+        try:
+            await get_current_admin_claims(await get_token_claims(token))
+        except HTTPException:
+            return False
+        return True
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        if await self._requested_by_admin(scope):
+            reason = 'requested'
+        elif self.sample_rate and random.random() < self.sample_rate:
+            reason = 'sampled'
+        else:
+            await self.app(scope, receive, send)
+            return
+        if self._lock.locked():
+            metrics.inc('profiling.skipped_busy')
+            await self.app(scope, receive, send)
+            return
+
+        await self._lock.acquire()
+        await self._profile(scope, receive, send, reason)
+
+    async def _profile(self, scope: Scope, receive: Receive, send: Send, reason: str) -> None:
+        """Профилирует запрос; блокировку, взятую в __call__, освобождает по завершении профиля."""
+        profile_id = self.store.next_id()
+        status_code = None
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        finished = False
+
+        def finish() -> None:
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            profiler.disable()
+            profiler.create_stats()
+            self.store.add(ProfileEntry(
+                id=profile_id,
+                method=scope['method'],
+                path=scope['path'],
+                status_code=status_code,
+                duration=time.perf_counter() - started,
+                created_at=datetime.now(),
+                reason=reason,
+                stats=profiler.stats,
+            ))
+            metrics.inc(f'profiling.{reason}')
+            self._lock.release()
+
+        async def send_with_id(message: Message) -> None:
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                headers = MutableHeaders(scope=message)
+                headers['X-Profile-Id'] = str(profile_id)
+                if headers.get('content-type', '').startswith(STREAMING_TYPES):
+                    finish()
+            await send(message)
+
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            finish()
+
+
+profile_store = ProfileStore(max_entries=settings.PROFILING_MAX_ENTRIES)
@@ -0,0 +1,74 @@
+import loguru
+from typing import List, Literal
+from fastapi import APIRouter, Depends, Query, status
+from fastapi.responses import PlainTextResponse, Response
+
+from src.auth.dependencies import get_current_admin_claims
+from src.core.exceptions import ProfileNotFoundException
+from src.core.metrics import metrics
+from src.core.profiling import profile_store
+from src.core.schemas import ProfileEntrySchema, SlowQueryStatsSchema
+from src.dao.slow_queries import slow_query_log
+
+router = APIRouter(dependencies=[Depends(get_current_admin_claims)])
+logger = loguru.logger
+
+
+@router.get('/metrics')
+async def get_metrics() -> dict[str, float | None]:
+    return metrics.snapshot()
+
+
+@router.get('/profiles')
+async def get_profiles() -> List[ProfileEntrySchema]:
+    return profile_store.list()
+
+
+@router.get('/profiles/{id}', response_class=PlainTextResponse)
+async def get_profile(
+    id: int,
+    sort: Literal['cumulative', 'tottime', 'ncalls'] = Query('cumulative', description="Сортировка отчета"),
+    limit: int = Query(50, ge=1, le=1000, description="Количество функций в отчете"),
+) -> str:
+    entry = profile_store.get(id)
+    if not entry:
+        raise ProfileNotFoundException
+    return entry.render(sort=sort, limit=limit)
+
+
+@router.get('/profiles/{id}/download')
+async def download_profile(id: int) -> Response:
+    entry = profile_store.get(id)
+    if not entry:
+        raise ProfileNotFoundException
+    return Response(
+        entry.dump(),
+        media_type='application/octet-stream',
+        headers={'Content-Disposition': f'attachment; filename="profile-{id}.prof"'},
+    )
+
+
+@router.get('/slow-queries')
+async def get_slow_queries(
+    only_slow: bool = Query(False, description="Только формы запросов, хотя бы раз превысившие порог"),
+    limit: int = Query(100, ge=1, le=1000, description="Количество форм запросов (по убыванию суммарного времени)"),
+) -> List[SlowQueryStatsSchema]:
+    stats = [item for item in slow_query_log.snapshot() if item.slow_count or not only_slow]
+    return [
+        SlowQueryStatsSchema(
+            statement=item.statement,
+            count=item.count,
+            total_ms=item.total_time * 1000,
+            avg_ms=item.total_time * 1000 / item.count,
+            p99_ms=item.p99 * 1000,
+            max_ms=item.max_time * 1000,
+            slow_count=item.slow_count,
+            explain=item.explain,
+        )
+        for item in stats[:limit]
+    ]
+
+
+@router.delete('/slow-queries', status_code=status.HTTP_204_NO_CONTENT)
+async def reset_slow_queries() -> None:
+    slow_query_log.reset()
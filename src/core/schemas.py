@@ -0,0 +1,27 @@
+from datetime import datetime
+from typing import Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class ProfileEntrySchema(BaseModel):
+    id: int = Field(description="Идентификатор профиля (заголовок X-Profile-Id ответа)")
+    method: str = Field(description="HTTP-метод")
+    path: str = Field(description="Путь запроса")
+    status_code: Optional[int] = Field(description="Код ответа")
+    duration: float = Field(description="Длительность запроса под профилировщиком, сек")
+    created_at: datetime = Field(description="Время снятия профиля")
+    reason: Literal['requested', 'sampled'] = Field(description="По запросу администратора или по выборке")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SlowQueryStatsSchema(BaseModel):
+    statement: str = Field(description="Нормализованный запрос (параметры заменены на ?)")
+    count: int = Field(description="Количество выполнений")
+    total_ms: float = Field(description="Суммарное время, мс")
+    avg_ms: float = Field(description="Среднее время, мс")
+    p99_ms: float = Field(description="99-й перцентиль времени, мс")
+    max_ms: float = Field(description="Максимальное время, мс")
+    slow_count: int = Field(description="Сколько выполнений превысили порог")
+    explain: Optional[str] = Field(description="EXPLAIN (ANALYZE, BUFFERS) одного из медленных выполнений")
@@ -1,24 +1,130 @@
-from typing import List, TypeVar, Generic, Type
+from datetime import datetime
+from typing import Any, Callable, List, TypeVar, Generic, Type
 
 from pydantic import BaseModel
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import update as sqlalchemy_update, delete as sqlalchemy_delete, func
+from sqlalchemy import (
+    Select, asc, column, desc, false, insert, true, tuple_, union_all, values,
+    update as sqlalchemy_update, delete as sqlalchemy_delete, func, text,
+)
+from sqlalchemy.orm import aliased
 
-from src.dao.base_model import Base
+from src.core.log_pipeline import audit_write
+from src.dao.base_model import Base, Versioned
+from src.dao.cache import cache, cached_read
+from src.dao.exceptions import (
+    BulkLimitExceededException,
+    ChangesCursorExpiredException,
+    InvalidSortingException,
+    VersionConflictException,
+)
+from src.dao.models import Tombstone
+from src.settings import settings
 
 T = TypeVar("T", bound=Base)
 
+# Границы ленты изменений. updated_at = now(), то есть время начала транзакции, поэтому
+# строки открытых транзакций не старше начала самой старой из них: граница не идет дальше,
+# сколько бы ни длилась транзакция. pg_stat_activity показывает время транзакций
+# только своей роли БД, приложение работает под одной ролью.
+CHANGES_BOUNDS_QUERY = text("""
+    SELECT least(now() - make_interval(secs => :lag), min(xact_start))::timestamp AS upper_bound,
+           (now() - make_interval(secs => :retention))::timestamp AS expired_before
+    FROM pg_stat_activity
+    WHERE datname = current_database() AND xact_start IS NOT NULL AND pid <> pg_backend_pid()
+""")
+
+# Операции фильтрации: имя поля фильтра `<колонка>__<операция>` -> предикат SQLAlchemy
+LOOKUPS: dict[str, Callable[[Any, Any], Any]] = {
+    'eq': lambda column, value: column == value,
+    'ne': lambda column, value: column != value,
+    'gt': lambda column, value: column > value,
+    'gte': lambda column, value: column >= value,
+    'lt': lambda column, value: column < value,
+    'lte': lambda column, value: column <= value,
+    'in': lambda column, value: column.in_(value),
+    'icontains': lambda column, value: column.ilike(f"%{value}%"),
+}
+
+
+def sorting_pattern(fields: tuple[str, ...]) -> str:
+    """Регулярное выражение для параметра sorting: 'поле' или 'поле:asc|desc' из белого списка."""
+    return rf"^({'|'.join(fields)})(:(asc|desc))?$"
+
+
+def check_filter_schema(model: Type[Base], schema: Type[BaseModel]) -> None:
+    """Проверяет при импорте, что каждое поле схемы фильтров - колонка модели с известной операцией.
+
+    Ошибка в схеме фильтров обнаруживается при старте, а не ответом 500 на запрос.
+    """
+    for name in schema.model_fields:
+        column_name, _, lookup = name.partition('__')
+        if getattr(model, column_name, None) is None or (lookup or 'eq') not in LOOKUPS:
+            raise ValueError(f"Неизвестный фильтр '{name}' в {schema.__name__} для модели {model.__name__}")
+
 
 class BaseDAO(Generic[T]):
     model: Type[T] = None
+    # Поля, по которым разрешена сортировка
+    sorting_fields: tuple[str, ...] = ('id',)
+    # Время жизни записей кэша чтения (сек); None - чтения не кэшируются
+    cache_ttl: float | None = None
 
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, cached: bool = True):
+        """cached=False - чтения этого DAO идут мимо кэша (например, когда нужна актуальная версия)."""
         self._session = session
         if self.model is None:
             raise ValueError("Модель должна быть указана в дочернем классе")
+        if not cached:
+            self.cache_ttl = None
+
+    async def _after_write(self, action: str, ids: list[int]) -> None:
+        """Хук после записи (action: create, update или delete); переопределяется в наследниках.
+
+        Вызывается с id действительно затронутых строк (из RETURNING), поэтому побочные
+        эффекты не выполняются для записей, которые не изменились (нет строки, не та версия).
+        Наследники вызывают super(): здесь запись попадает в журнал аудита.
+        """
+        audit_write(self._session, self.model.__tablename__, action, ids)
+        cache.mark_dirty(self._session, self.model.__tablename__)
+
+    def _update_values(self, columns: set[str]) -> dict:
+        """Дополнительные значения UPDATE при изменении полей columns; расширяется в наследниках.
+
+        Здесь - увеличение версии строки у моделей с Versioned.
+        """
+        return {'version': self.model.version + 1} if issubclass(self.model, Versioned) else {}
+
+    def _compile_filters(self, filters: BaseModel | None) -> list:
+        """Преобразует схему фильтров в список условий WHERE.
+
+        Имя поля схемы имеет вид `<колонка>__<операция>` (см. LOOKUPS),
+        без суффикса - точное совпадение. Незаполненные (None) поля пропускаются.
+        """
+        if filters is None:
+            return []
+        conditions = []
+        for name, value in filters.model_dump(exclude_none=True).items():
+            column_name, _, lookup = name.partition('__')
+            column = getattr(self.model, column_name, None)
+            if column is None or (lookup or 'eq') not in LOOKUPS:
+                raise ValueError(f"Неизвестный фильтр '{name}' для модели {self.model.__name__}")
+            conditions.append(LOOKUPS[lookup or 'eq'](column, value))
+        return conditions
+
+    def _apply_sorting(self, query: Select, sorting: str | None) -> Select:
+        """Применяет сортировку вида 'поле:asc|desc' из белого списка sorting_fields."""
+        if not sorting:
+            return query
+        field_name, _, direction = sorting.partition(':')
+        if field_name not in self.sorting_fields or direction.lower() not in ('', 'asc', 'desc'):
+            raise InvalidSortingException
+        column = getattr(self.model, field_name)
+        return query.order_by(desc(column) if direction.lower() == 'desc' else asc(column))
 
+    @cached_read
     async def get_one_by_id(self, id: int):
         """Получить одну запись по айди, либо None."""
         query = select(self.model).filter_by(id=id)
@@ -29,6 +135,7 @@ class BaseDAO(Generic[T]):
             raise e
         return record
 
+    @cached_read
     async def get_one_by_filters(self, filters: BaseModel):
         """Получить одну запись по фильтрам, либо None."""
         filter_dict = filters.model_dump(exclude_unset=True)
@@ -40,10 +147,12 @@ class BaseDAO(Generic[T]):
             raise e
         return record
 
-    async def find_all(self, filters: BaseModel | None = None):
-        filter_dict = filters.model_dump(exclude_unset=True) if filters else {}
+    @cached_read
+    async def find_all(self, filters: BaseModel | None = None, sorting: str | None = None):
+        """Находит все записи по фильтрам и с сортировкой."""
+        query = select(self.model).where(*self._compile_filters(filters))
+        query = self._apply_sorting(query, sorting)
         try:
-            query = select(self.model).filter_by(**filter_dict)
             result = await self._session.execute(query)
             records = result.scalars().all()
             return records
@@ -57,6 +166,7 @@ class BaseDAO(Generic[T]):
             await self._session.flush()
         except SQLAlchemyError as e:
             raise e
+        await self._after_write('create', [new_instance.id])
         return new_instance
 
     async def add_many(self, instances: List[BaseModel]):
@@ -65,62 +175,215 @@ class BaseDAO(Generic[T]):
             new_instances = [self.model(**values) for values in values_list]
             self._session.add_all(new_instances)
             await self._session.flush()
-            return new_instances
         except SQLAlchemyError as e:
             raise e
+        await self._after_write('create', [instance.id for instance in new_instances])
+        return new_instances
 
-    async def update(self, id: int, values: BaseModel):
+    async def update(self, id: int, values: BaseModel, version: int | None = None):
+        """Обновляет запись одним запросом и увеличивает ее версию.
+
+        UPDATE ... RETURNING выполняется в CTE, а запись выбирается из него вместе
+        со связями lazy="joined" (JOIN), без отдельного запроса за ними.
+        Если передана version (из If-Match), обновление выполняется только при
+        совпадении версии, иначе VersionConflictException. Возвращает запись или None.
+        """
         values_dict = values.model_dump(exclude_unset=True)
         query = (
             sqlalchemy_update(self.model)
-            .filter_by(id=id)
-            .values(**values_dict)
-            .execution_options(synchronize_session="fetch")
+            .where(self.model.id == id)
+            .values(**values_dict, **self._update_values(set(values_dict)))
         )
-        await self._session.execute(query)
+        if version is not None:
+            query = query.where(self.model.version == version)
+        updated = aliased(self.model, query.returning(*self.model.__table__.c).cte('updated'))
         try:
-            await self._session.flush()
+            result = await self._session.execute(select(updated).execution_options(populate_existing=True))
+            record = result.unique().scalar_one_or_none()
         except SQLAlchemyError as e:
             raise e
-        return await self.get_one_by_id(id=id)
+        if record is None:
+            await self._check_version_conflict(id, version)
+            return None
+        await self._after_write('update', [id])
+        return record
 
-    async def delete(self, id: int):
-        query = sqlalchemy_delete(self.model).filter_by(id=id)
+    async def delete(self, id: int, version: int | None = None):
+        """Удаляет запись; с version - только при совпадении версии, иначе VersionConflictException."""
+        query = sqlalchemy_delete(self.model).where(self.model.id == id)
+        if version is not None:
+            query = query.where(self.model.version == version)
         result = await self._session.execute(query)
+        if result.rowcount:
+            # Фиксируем удаление для ленты изменений
+            await self._session.execute(
+                insert(Tombstone).values(table_name=self.model.__tablename__, record_id=id)
+            )
         try:
             await self._session.flush()
         except SQLAlchemyError as e:
             raise e
+        if result.rowcount:
+            await self._after_write('delete', [id])
+        else:
+            await self._check_version_conflict(id, version)
         return result.rowcount
 
+    async def _check_version_conflict(self, id: int, version: int | None) -> None:
+        """Условная запись не затронула строк: если запись есть, ее версия устарела."""
+        if version is None:
+            return
+        exists = await self._session.scalar(select(self.model.id).where(self.model.id == id))
+        if exists is not None:
+            raise VersionConflictException
+
+    @cached_read
     async def count(self, filters: BaseModel | None = None):
-        filter_dict = filters.model_dump(exclude_unset=True) if filters else {}
         try:
-            query = select(func.count(self.model.id)).filter_by(**filter_dict)
+            query = select(func.count(self.model.id)).where(*self._compile_filters(filters))
             result = await self._session.execute(query)
             count = result.scalar()
             return count
         except SQLAlchemyError as e:
             raise e
 
-    async def bulk_update(self, records: List[BaseModel]):
-        try:
-            updated_count = 0
-            for record in records:
-                record_dict = record.model_dump(exclude_unset=True)
-                if 'id' not in record_dict:
-                    continue
+    async def bulk_update(self, records: List[BaseModel], chunk_size: int = settings.BULK_CHUNK_SIZE) -> list[int]:
+        """Обновляет записи по id пачками: один UPDATE ... FROM (VALUES ...) на пачку.
+
+        Записи группируются по набору изменяемых полей. Повтор id не принимается (ValueError):
+        порядок применения таких изменений не определен. Возвращает число обновленных
+        строк по каждой пачке.
+        """
+        groups: dict[tuple[str, ...], list[dict]] = {}
+        seen_ids = set()
+        for record in records:
+            record_dict = record.model_dump(exclude_unset=True)
+            if 'id' not in record_dict:
+                continue
+            if record_dict['id'] in seen_ids:
+                raise ValueError(f"Повторяющийся id в массовом обновлении: {record_dict['id']}")
+            seen_ids.add(record_dict['id'])
+            columns = tuple(sorted(name for name in record_dict if name != 'id'))
+            if columns:
+                groups.setdefault(columns, []).append(record_dict)
 
-                update_data = {k: v for k, v in record_dict.items() if k != 'id'}
+        chunk_counts = []
+        for columns, rows in groups.items():
+            for start in range(0, len(rows), chunk_size):
+                chunk = rows[start:start + chunk_size]
+                data = values(
+                    *[column(name, self.model.__table__.c[name].type) for name in ('id', *columns)],
+                    name='data',
+                ).data([tuple(row[name] for name in ('id', *columns)) for row in chunk])
                 stmt = (
                     sqlalchemy_update(self.model)
-                    .filter_by(id=record_dict['id'])
-                    .values(**update_data)
+                    .where(self.model.id == data.c.id)
+                    .values({**{name: data.c[name] for name in columns}, **self._update_values(set(columns))})
+                    .returning(self.model.id)
+                    .execution_options(synchronize_session='fetch')
                 )
-                result = await self._session.execute(stmt)
-                updated_count += result.rowcount
+                try:
+                    updated_ids = list((await self._session.execute(stmt)).scalars().all())
+                except SQLAlchemyError as e:
+                    raise e
+                await self._after_write('update', updated_ids)
+                chunk_counts.append(len(updated_ids))
+        return chunk_counts
 
-            await self._session.flush()
-            return updated_count
+    async def bulk_delete(
+        self,
+        ids: List[int] | None = None,
+        filters: BaseModel | None = None,
+        chunk_size: int = settings.BULK_CHUNK_SIZE,
+        max_items: int = settings.BULK_MAX_ITEMS,
+    ) -> list[int]:
+        """Удаляет записи по списку id или по схеме фильтров пачками по chunk_size.
+
+        Фильтры без единого условия не принимаются, чтобы случайно не удалить всю таблицу.
+        Если фильтрам соответствует больше max_items записей, ничего не удаляется
+        (BulkLimitExceededException). Возвращает число удаленных строк по каждой пачке.
+        """
+        if ids is None:
+            conditions = self._compile_filters(filters)
+            if not conditions:
+                raise ValueError("Для массового удаления нужен список id или хотя бы один фильтр")
+            result = await self._session.execute(
+                select(self.model.id).where(*conditions).order_by(self.model.id).limit(max_items + 1)
+            )
+            ids = list(result.scalars().all())
+            if len(ids) > max_items:
+                raise BulkLimitExceededException
+
+        ids = list(dict.fromkeys(ids))
+        chunk_counts = []
+        for start in range(0, len(ids), chunk_size):
+            chunk_ids = ids[start:start + chunk_size]
+            stmt = (
+                sqlalchemy_delete(self.model)
+                .where(self.model.id.in_(chunk_ids))
+                .returning(self.model.id)
+                .execution_options(synchronize_session='fetch')
+            )
+            try:
+                deleted_ids = list((await self._session.execute(stmt)).scalars().all())
+                if deleted_ids:
+                    # Фиксируем удаление для ленты изменений
+                    await self._session.execute(
+                        insert(Tombstone),
+                        [{'table_name': self.model.__tablename__, 'record_id': id} for id in deleted_ids],
+                    )
+            except SQLAlchemyError as e:
+                raise e
+            if deleted_ids:
+                await self._after_write('delete', deleted_ids)
+            chunk_counts.append(len(deleted_ids))
+        return chunk_counts
+
+    async def find_changes(self, since: tuple[datetime, int] | None, limit: int) -> dict:
+        """Находит изменения после позиции since в порядке (updated_at, id).
+
+        Возвращает измененные записи, id удаленных записей и позицию последнего
+        изменения. Отдаются только изменения старше начала самой старой открытой
+        транзакции (см. CHANGES_BOUNDS_QUERY), чтобы курсор не обогнал строки
+        еще не закоммиченных транзакций. Курсор старше срока хранения отметок
+        об удалении отклоняется: удаления до него уже очищены.
+        """
+        # Граница вычисляется отдельным запросом до чтения изменений: транзакция,
+        # завершившаяся после него, уже видна следующему запросу
+        bounds = (await self._session.execute(CHANGES_BOUNDS_QUERY, {
+            'lag': settings.CHANGES_SAFETY_LAG_SECONDS,
+            'retention': settings.TOMBSTONE_RETENTION_SECONDS,
+        })).one()
+        if since and since[0] < bounds.expired_before:
+            raise ChangesCursorExpiredException
+        # Строго меньше: строки самой старой открытой транзакции помечены ровно ее xact_start
+        upper_bound = bounds.upper_bound
+        updated = (
+            select(self.model.id, self.model.updated_at, false().label('deleted'))
+            .where(self.model.updated_at < upper_bound)
+        )
+        deleted = (
+            select(Tombstone.record_id, Tombstone.updated_at, true())
+            .where(Tombstone.table_name == self.model.__tablename__, Tombstone.updated_at < upper_bound)
+        )
+        if since:
+            updated = updated.where(tuple_(self.model.updated_at, self.model.id) > tuple_(*since))
+            deleted = deleted.where(tuple_(Tombstone.updated_at, Tombstone.record_id) > tuple_(*since))
+        changes = union_all(updated, deleted).subquery()
+        query = select(changes).order_by(changes.c.updated_at, changes.c.id).limit(limit)
+        try:
+            rows = (await self._session.execute(query)).all()
+            updated_ids = [row.id for row in rows if not row.deleted]
+            records = []
+            if updated_ids:
+                result = await self._session.execute(select(self.model).where(self.model.id.in_(updated_ids)))
+                by_id = {record.id: record for record in result.scalars().all()}
+                records = [by_id[id] for id in updated_ids if id in by_id]
         except SQLAlchemyError as e:
             raise e
+        return {
+            'items': records,
+            'deleted': [row.id for row in rows if row.deleted],
+            'position': (rows[-1].updated_at, rows[-1].id) if rows else since,
+            'has_more': len(rows) == limit,
+        }
@@ -3,13 +3,28 @@ from datetime import datetime
 from decimal import Decimal
 from typing import Annotated
 
-from sqlalchemy import func, TIMESTAMP, Integer, inspect
+from sqlalchemy import func, TIMESTAMP, Integer, inspect, text
 from sqlalchemy.orm import Mapped, mapped_column, DeclarativeBase, declared_attr
 from sqlalchemy.ext.asyncio import AsyncAttrs
 
 str_uniq = Annotated[str, mapped_column(unique=True, nullable=False)]
 
 
+class Versioned:
+    """Версия строки для оптимистичных блокировок (ETag/If-Match); растет при каждом изменении.
+
+    Только для моделей, которые клиенты изменяют через API; служебные таблицы без версии.
+    """
+    version: Mapped[int] = mapped_column(
+        Integer,
+        server_default=text("1"),
+    )
+
+    @declared_attr.directive
+    def __mapper_args__(cls) -> dict:
+        return {'version_id_col': cls.__table__.c.version}
+
+
 class Base(AsyncAttrs, DeclarativeBase):
     __abstract__ = True
 
@@ -27,7 +42,6 @@ class Base(AsyncAttrs, DeclarativeBase):
         server_default=func.now(),
         onupdate=func.now()
     )
-
     @declared_attr
     def __tablename__(cls) -> str:
         return cls.__name__.lower() + 's'
@@ -0,0 +1,371 @@
+import asyncio
+import functools
+import hashlib
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime, time as dt_time
+from decimal import Decimal
+from typing import Any, Awaitable, Callable
+
+import loguru
+import orjson
+from pydantic import BaseModel
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from src.core.metrics import metrics
+from src.dao.base_model import Base
+from src.settings import settings
+
+logger = loguru.logger
+
+MISSING = object()
+
+
+class MemoryCacheBackend:
+    """LRU-кэш с TTL в памяти воркера. Поколения тегов тоже локальны для воркера."""
+    shared = False
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._generations: dict[str, int] = {}
+
+    async def get(self, key: str) -> Any:
+        item = self._entries.get(key)
+        if item is None:
+            return MISSING
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_generation(self, tag: str) -> int:
+        return self._generations.get(tag, 0)
+
+    async def bump_generation(self, tag: str) -> None:
+        self.bump_generation_local(tag)
+
+    def bump_generation_local(self, tag: str) -> None:
+        self._generations[tag] = self._generations.get(tag, 0) + 1
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisConnection:
+    """Соединение по протоколу Redis (RESP2): только то, что нужно кэшу."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    async def execute(self, *args: bytes | str | int) -> Any:
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        self.writer.write(b''.join(parts))
+        await self.writer.drain()
+        return await self._read_reply()
+
+    async def _read_reply(self) -> Any:
+        line = await self.reader.readuntil(b'\r\n')
+        prefix, payload = line[:1], line[1:-2]
+        if prefix == b'+':
+            return payload.decode()
+        if prefix == b'-':
+            raise RedisError(payload.decode())
+        if prefix == b':':
+            return int(payload)
+        if prefix == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            return (await self.reader.readexactly(length + 2))[:-2]
+        if prefix == b'*':
+            length = int(payload)
+            return None if length < 0 else [await self._read_reply() for _ in range(length)]
+        raise RedisError(f"Неожиданный ответ Redis: {line!r}")
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class RedisCacheBackend:
+    """Кэш в Redis (или совместимом сервере): общий для всех воркеров.
+
+    Значения хранятся в JSON (orjson): из кэша восстанавливаются только
+    колонки известных моделей, а не произвольные объекты. Соединения переиспользуются из пула до pool_size штук.
+    """
+    shared = True
+
+    def __init__(self, host: str, port: int, timeout: float = 0.5, pool_size: int = 10, prefix: str = 'cache'):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.prefix = prefix
+        self._idle: list[RedisConnection] = []
+        self._semaphore = asyncio.Semaphore(pool_size)
+
+    async def _execute(self, *args: bytes | str | int) -> Any:
+        async with self._semaphore:
+            connection = self._idle.pop() if self._idle else None
+            try:
+                if connection is None:
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(self.host, self.port), timeout=self.timeout
+                    )
+                    connection = RedisConnection(reader, writer)
+                result = await asyncio.wait_for(connection.execute(*args), timeout=self.timeout)
+            except BaseException:
+                # После ошибки или таймаута поток ответов рассинхронизирован: соединение не возвращаем
+                if connection is not None:
+                    connection.close()
+                raise
+            self._idle.append(connection)
+            return result
+
+    async def get(self, key: str) -> Any:
+        value = await self._execute('GET', f'{self.prefix}:{key}')
+        return MISSING if value is None else orjson.loads(value)
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        payload = orjson.dumps(value, default=str)
+        await self._execute('SET', f'{self.prefix}:{key}', payload, 'PX', max(int(ttl * 1000), 1))
+
+    async def get_generation(self, tag: str) -> int:
+        value = await self._execute('GET', f'{self.prefix}:tag:{tag}')
+        return int(value) if value is not None else 0
+
+    async def bump_generation(self, tag: str) -> None:
+        await self._execute('INCR', f'{self.prefix}:tag:{tag}')
+
+    def bump_generation_local(self, tag: str) -> None:
+        pass
+
+
+class Cache:
+    """Кэш результатов чтения DAO с тегами по таблицам.
+
+    Ключ содержит поколение тега таблицы: запись в таблицу увеличивает поколение
+    после коммита, и старые ключи больше не читаются (вытесняются по TTL/LRU).
+    Одновременные промахи по одному ключу в воркере выполняют запрос один раз.
+    """
+
+    def __init__(self, backend: MemoryCacheBackend | RedisCacheBackend | None):
+        self.backend = backend
+        self._in_flight: dict[str, asyncio.Future] = {}
+        metrics.register_gauge('cache.hit_ratio', self.hit_ratio)
+
+    @staticmethod
+    def hit_ratio() -> float | None:
+        hits, misses = metrics.get('cache.hits'), metrics.get('cache.misses')
+        return hits / (hits + misses) if hits + misses else None
+
+    @staticmethod
+    def make_key(table: str, generation: int, method: str, args: tuple, kwargs: dict) -> str:
+        def normalize(value: Any) -> Any:
+            if isinstance(value, BaseModel):
+                return [type(value).__name__, value.model_dump(mode='json', exclude_unset=True)]
+            return value
+
+        payload = orjson.dumps(
+            [[normalize(arg) for arg in args], {name: normalize(value) for name, value in kwargs.items()}],
+            option=orjson.OPT_SORT_KEYS,
+            default=str,
+        )
+        return f'{table}:{generation}:{method}:{hashlib.sha1(payload).hexdigest()}'
+
+    async def get_or_load(
+        self, table: str, method: str, args: tuple, kwargs: dict, ttl: float, load: Callable[[], Awaitable[Any]]
+    ) -> tuple[Any, bool]:
+        """Возвращает (значение, найдено_в_кэше). При ошибке бэкенда читает из БД."""
+        try:
+            key = self.make_key(table, await self.backend.get_generation(table), method, args, kwargs)
+            value = await self.backend.get(key)
+        except Exception as e:
+            metrics.inc('cache.errors')
+            logger.warning(f"Кэш недоступен: {e}")
+            return await load(), False
+        if value is not MISSING:
+            metrics.inc('cache.hits')
+            metrics.inc(f'cache.{table}.hits')
+            return value, True
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            value = await asyncio.shield(in_flight)
+            if value is not MISSING:
+                metrics.inc('cache.hits')
+                metrics.inc(f'cache.{table}.coalesced')
+                return value, True
+            return await load(), False
+
+        metrics.inc('cache.misses')
+        metrics.inc(f'cache.{table}.misses')
+        future = self._in_flight[key] = asyncio.get_running_loop().create_future()
+        encoded = MISSING
+        try:
+            result = await load()
+            encoded = encode_result(result)
+            try:
+                await self.backend.set(key, encoded, ttl)
+            except Exception as e:
+                metrics.inc('cache.errors')
+                logger.warning(f"Не удалось записать в кэш: {e}")
+            return result, False
+        finally:
+            del self._in_flight[key]
+            future.set_result(encoded)
+
+    def mark_dirty(self, session, table: str) -> None:
+        """Помечает таблицу измененной в сессии: до коммита ее чтения в этой сессии идут мимо кэша."""
+        session.info.setdefault('cache_dirty_tables', set()).add(table)
+
+    async def invalidate(self, table: str) -> None:
+        try:
+            await self.backend.bump_generation(table)
+        except Exception as e:
+            metrics.inc('cache.errors')
+            logger.warning(f"Не удалось сбросить кэш таблицы {table}: {e}")
+        metrics.inc(f'cache.{table}.invalidations')
+
+    def invalidate_local(self, table: str) -> None:
+        """Сброс локального кэша по уведомлению об изменении из другого воркера."""
+        if self.backend is not None:
+            self.backend.bump_generation_local(table)
+
+    async def invalidate_committed(self, session) -> None:
+        """Сбрасывает общий кэш таблиц, измененных закоммиченными транзакциями сессии.
+
+        Вызывается после коммита до ответа клиенту: следующий запрос клиента
+        не должен прочитать из кэша данные до его же записи.
+        """
+        for table in session.info.pop('cache_committed_tables', ()):
+            await self.invalidate(table)
+
+
+# Колонки, которые после JSON приходят строками и восстанавливаются по типу колонки
+PARSERS: dict[type, Callable[[str], Any]] = {
+    datetime: datetime.fromisoformat,
+    date: date.fromisoformat,
+    dt_time: dt_time.fromisoformat,
+    Decimal: Decimal,
+    uuid.UUID: uuid.UUID,
+}
+
+
+def encode_result(result: Any) -> Any:
+    """Экземпляры моделей хранятся словарями колонок с именем модели: в кэше нет объектов,
+    привязанных к сессии, и значение сериализуется в JSON."""
+    if isinstance(result, Base):
+        return ['one', type(result).__name__, column_values(result)]
+    if isinstance(result, (list, tuple)) and result and isinstance(result[0], Base):
+        return ['many', type(result[0]).__name__, [column_values(item) for item in result]]
+    return ['value', None, result]
+
+
+def decode_result(encoded: Any) -> Any:
+    kind, model_name, value = encoded
+    if kind == 'one':
+        return restore_instance(model_name, value)
+    if kind == 'many':
+        return [restore_instance(model_name, item) for item in value]
+    return value
+
+
+def column_values(instance: Base) -> dict:
+    return {attr.key: getattr(instance, attr.key) for attr in inspect(type(instance)).column_attrs}
+
+
+@functools.cache
+def model_columns(model_name: str) -> tuple[type[Base], dict[str, Callable[[str], Any]]]:
+    """Модель по имени и парсеры ее колонок, чьи значения не переживают JSON как есть."""
+    model = next(mapper.class_ for mapper in Base.registry.mappers if mapper.class_.__name__ == model_name)
+    parsers = {}
+    for attr in inspect(model).column_attrs:
+        try:
+            python_type = attr.columns[0].type.python_type
+        except NotImplementedError:
+            continue
+        if python_type in PARSERS:
+            parsers[attr.key] = PARSERS[python_type]
+    return model, parsers
+
+
+def restore_instance(model_name: str, values: dict) -> Base:
+    model, parsers = model_columns(model_name)
+    return model(**{
+        key: parsers[key](value) if key in parsers and isinstance(value, str) else value
+        for key, value in values.items()
+    })
+
+
+def cached_read(method: Callable) -> Callable:
+    """Кэширует метод чтения DAO, если у DAO задан cache_ttl.
+
+    Модели со связями кэшировать не стоит: восстановленные из кэша объекты
+    не привязаны к сессии и не подгружают связи.
+    """
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        table = self.model.__tablename__
+        if (
+            self.cache_ttl is None
+            or cache.backend is None
+            or table in self._session.info.get('cache_dirty_tables', ())
+        ):
+            return await method(self, *args, **kwargs)
+        value, from_cache = await cache.get_or_load(
+            table, method.__name__, args, kwargs, self.cache_ttl, lambda: method(self, *args, **kwargs)
+        )
+        return decode_result(value) if from_cache else value
+
+    return wrapper
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_tables(session: Session) -> None:
+    """Локальный кэш сбрасывается сразу; общий - в invalidate_committed после коммита,
+    т.к. из синхронного обработчика события нельзя дождаться запроса к Redis."""
+    if session.in_nested_transaction():
+        return
+    tables = session.info.pop('cache_dirty_tables', None)
+    if tables and cache.backend is not None:
+        if cache.backend.shared:
+            session.info.setdefault('cache_committed_tables', set()).update(tables)
+        else:
+            for table in tables:
+                cache.backend.bump_generation_local(table)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_dirty_tables(session: Session) -> None:
+    # Откат SAVEPOINT не отменяет изменений внешней транзакции: лишний сброс кэша безопасен
+    if session.in_nested_transaction():
+        return
+    session.info.pop('cache_dirty_tables', None)
+
+
+def create_backend() -> MemoryCacheBackend | RedisCacheBackend | None:
+    if settings.CACHE_BACKEND == 'memory':
+        return MemoryCacheBackend(max_entries=settings.CACHE_MAX_ENTRIES)
+    if settings.CACHE_BACKEND == 'redis':
+        return RedisCacheBackend(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+    return None
+
+
+cache = Cache(create_backend())
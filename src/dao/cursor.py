@@ -0,0 +1,22 @@
+import base64
+from datetime import datetime
+
+from src.dao.exceptions import InvalidCursorException
+
+
+def encode_cursor(updated_at: datetime, id: int) -> str:
+    """Кодирует позицию (updated_at, id) в непрозрачный курсор."""
+    raw = f"{updated_at.isoformat()}|{id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Декодирует курсор обратно в позицию (updated_at, id).
+
+    Принимает и id события SSE: суффикс после точки отбрасывается.
+    """
+    try:
+        updated_at, id = base64.urlsafe_b64decode(cursor.split('.', 1)[0].encode()).decode().split('|')
+        return datetime.fromisoformat(updated_at), int(id)
+    except ValueError:
+        raise InvalidCursorException
@@ -1,11 +1,17 @@
+from contextvars import ContextVar
 from typing import AsyncGenerator
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.orm import Session
 
+from src.core.deadlines import remaining_time
+from src.dao.cache import cache
+from src.dao.slow_queries import slow_query_log
 from src.settings import settings
 
 async_engine: AsyncEngine = create_async_engine(
@@ -13,17 +19,119 @@ async_engine: AsyncEngine = create_async_engine(
     # echo=DEV_MODE,
     pool_size=10,
     max_overflow=20,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
 )
+slow_query_log.install(async_engine)
+
+
+class TimeoutSession(Session):
+    """Сессия основного пула: таймауты транзакции выставляются в after_begin."""
+
+
+class CommitSession(AsyncSession):
+    """Асинхронная сессия основного пула: после коммита дожидается сброса общего кэша."""
+
+    async def commit(self) -> None:
+        await super().commit()
+        await cache.invalidate_committed(self)
+
+
 session_factory: async_sessionmaker[AsyncSession] = async_sessionmaker(
     bind=async_engine,
+    class_=CommitSession,
+    sync_session_class=TimeoutSession,
     autoflush=False,
     autocommit=False,
     expire_on_commit=False,
 )
 
+# Чтение без транзакции: autocommit не посылает BEGIN/ROLLBACK, соединения отдельного пула
+# только для чтения. statement_timeout при подключении - верхняя граница, без SET на каждый запрос;
+# остаток бюджета запроса ограничивает клиентский таймаут (set_readonly_command_timeout)
+readonly_engine: AsyncEngine = create_async_engine(
+    url=settings.db_url,
+    pool_size=settings.READONLY_POOL_SIZE,
+    max_overflow=settings.READONLY_POOL_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    isolation_level='AUTOCOMMIT',
+    connect_args={
+        'server_settings': {
+            'default_transaction_read_only': 'on',
+            'statement_timeout': str(int(settings.READONLY_STATEMENT_TIMEOUT_SECONDS * 1000)),
+        },
+    },
+)
+slow_query_log.install(readonly_engine)
+readonly_session_factory: async_sessionmaker[AsyncSession] = async_sessionmaker(
+    bind=readonly_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+# Остаток бюджета запроса переносится в таймауты транзакции одним запросом
+SET_TIMEOUTS_QUERY = text(
+    "SELECT set_config('statement_timeout', :statement_timeout, true), set_config('lock_timeout', :lock_timeout, true)"
+)
+# Запас клиентского таймаута: сначала запрос должен отменить сервер по statement_timeout
+COMMAND_TIMEOUT_MARGIN_SECONDS = 1
+
+
+@event.listens_for(TimeoutSession, 'after_begin')
+def set_transaction_timeouts(session: Session, transaction, connection) -> None:
+    """Ограничивает запросы транзакции оставшимся временем запроса.
+
+    Выполняется первым запросом транзакции, когда сессии действительно понадобилось
+    соединение, и с остатком бюджета на этот момент: сессия, открытая заранее
+    (например, на время хеширования паролей), не держит соединение и транзакцию.
+    """
+    remaining = remaining_time()
+    connection.execute(SET_TIMEOUTS_QUERY, {
+        'statement_timeout': f'{max(int(remaining * 1000), 1)}ms',
+        'lock_timeout': f'{max(int(min(remaining, settings.DB_LOCK_TIMEOUT_SECONDS) * 1000), 1)}ms',
+    })
+
+
+def _set_command_timeout(conn, timeout: float) -> None:
+    """asyncpg берет таймаут из настроек соединения, если он не передан в вызов.
+
+    Адаптер asyncpg в SQLAlchemy не передает timeout в prepare/fetch, поэтому меняется
+    приватный _config соединения: версия asyncpg закреплена в requirements.txt, а наличие
+    атрибута проверяет test_deadlines. Если его нет, остается только серверный statement_timeout.
+    """
+    driver_connection = conn.connection.driver_connection
+    config = getattr(driver_connection, '_config', None)
+    if not hasattr(config, 'command_timeout'):
+        return
+    driver_connection._config = config._replace(command_timeout=timeout)
+
+
+@event.listens_for(async_engine.sync_engine, 'before_cursor_execute')
+def set_command_timeout(conn, cursor, statement, parameters, context, executemany) -> None:
+    """Клиентский таймаут asyncpg для каждого запроса - остаток бюджета запроса.
+
+    Страховка на случай, если сервер не отменил запрос сам (обрыв сети, зависший сервер).
+    """
+    _set_command_timeout(conn, remaining_time() + COMMAND_TIMEOUT_MARGIN_SECONDS)
+
+
+@event.listens_for(readonly_engine.sync_engine, 'before_cursor_execute')
+def set_readonly_command_timeout(conn, cursor, statement, parameters, context, executemany) -> None:
+    """Чтение без транзакции ограничивается остатком бюджета на клиенте, без лишнего SET.
+
+    По таймауту asyncpg отменяет запрос на сервере, а TimeoutError превращается в 504.
+    """
+    _set_command_timeout(conn, remaining_time())
+
+# Сессия пакетного запроса (POST /batch): операции пакета выполняются в ней,
+# а транзакцией управляет сам пакет
+batch_session: ContextVar[AsyncSession | None] = ContextVar('batch_session', default=None)
+
 
 async def get_session_with_commit() -> AsyncGenerator[AsyncSession, None]:
     """Асинхронная сессия с автоматическим коммитом."""
+    if (session := batch_session.get()) is not None:
+        yield session
+        return
     async with session_factory() as session:
         try:
             yield session
@@ -37,6 +145,9 @@ async def get_session_with_commit() -> AsyncGenerator[AsyncSession, None]:
 
 async def get_session_without_commit() -> AsyncGenerator[AsyncSession, None]:
     """Асинхронная сессия без автоматического коммита."""
+    if (session := batch_session.get()) is not None:
+        yield session
+        return
     async with session_factory() as session:
         try:
             yield session
@@ -45,3 +156,17 @@ async def get_session_without_commit() -> AsyncGenerator[AsyncSession, None]:
             raise
         finally:
             await session.close()
+
+
+async def get_session_readonly() -> AsyncGenerator[AsyncSession, None]:
+    """Асинхронная сессия только для чтения, без транзакции (autocommit).
+
+    Каждый запрос видит свой снимок данных; для согласованного чтения
+    нескольких запросов нужна get_session_without_commit.
+    """
+    if (session := batch_session.get()) is not None:
+        yield session
+        return
+    remaining_time()
+    async with readonly_session_factory() as session:
+        yield session
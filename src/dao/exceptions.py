@@ -0,0 +1,31 @@
+from fastapi import status, HTTPException
+
+# Сортировка по полю, которого нет в белом списке
+InvalidSortingException = HTTPException(
+    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+    detail='Недопустимое поле сортировки'
+)
+
+# Некорректный курсор ленты изменений
+InvalidCursorException = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail='Некорректный курсор'
+)
+
+# Курсор ленты изменений старше срока хранения удалений: нужна полная синхронизация
+ChangesCursorExpiredException = HTTPException(
+    status_code=status.HTTP_410_GONE,
+    detail='Курсор устарел, выполните полную синхронизацию'
+)
+
+# Версия записи не совпала с If-Match: запись изменена другим запросом
+VersionConflictException = HTTPException(
+    status_code=status.HTTP_412_PRECONDITION_FAILED,
+    detail='Запись изменена другим запросом, получите актуальную версию'
+)
+
+# Массовая операция затрагивает больше записей, чем разрешено за один запрос
+BulkLimitExceededException = HTTPException(
+    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    detail='Слишком много записей для одной массовой операции'
+)
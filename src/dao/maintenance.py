@@ -0,0 +1,75 @@
+import asyncio
+from typing import Awaitable, Callable
+
+import loguru
+from sqlalchemy import text
+
+from src.core.metrics import metrics
+from src.dao.database import session_factory
+from src.settings import settings
+
+logger = loguru.logger
+
+# Удаляет отметки об удалении старше срока хранения, не больше :limit строк за запрос
+PURGE_TOMBSTONES_QUERY = text("""
+    DELETE FROM tombstones
+    WHERE id IN (
+        SELECT id FROM tombstones
+        WHERE updated_at < (now() - make_interval(secs => :retention))::timestamp
+        ORDER BY id
+        LIMIT :limit
+    )
+""")
+
+
+class MaintenanceJobs:
+    """Периодические задачи обслуживания БД (очистка, пересчет) в фоне воркера.
+
+    Задача запускается при старте и затем раз в interval секунд. Задачи идемпотентны:
+    их одновременное выполнение в нескольких воркерах безопасно. Ошибка задачи
+    логируется и не останавливает следующие запуски.
+    """
+
+    def __init__(self):
+        self._jobs: list[tuple[str, float, Callable[[], Awaitable[None]]]] = []
+        self._tasks: list[asyncio.Task] = []
+
+    def add(self, name: str, interval: float, job: Callable[[], Awaitable[None]]) -> None:
+        self._jobs.append((name, interval, job))
+
+    async def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run(*job)) for job in self._jobs]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self, name: str, interval: float, job: Callable[[], Awaitable[None]]) -> None:
+        while True:
+            try:
+                await job()
+                metrics.inc(f'maintenance.{name}.runs')
+            except Exception:
+                metrics.inc(f'maintenance.{name}.errors')
+                logger.exception(f"Ошибка задачи обслуживания {name}")
+            await asyncio.sleep(interval)
+
+
+async def purge_tombstones(batch_size: int = 10000) -> None:
+    """Очищает отметки об удалении старше TOMBSTONE_RETENTION_SECONDS короткими транзакциями."""
+    while True:
+        async with session_factory() as session:
+            result = await session.execute(
+                PURGE_TOMBSTONES_QUERY, {'retention': settings.TOMBSTONE_RETENTION_SECONDS, 'limit': batch_size}
+            )
+            await session.commit()
+        metrics.inc('maintenance.tombstones.purged', result.rowcount)
+        if result.rowcount < batch_size:
+            return
+
+
+maintenance = MaintenanceJobs()
+maintenance.add('tombstones', settings.TOMBSTONE_PURGE_INTERVAL_SECONDS, purge_tombstones)
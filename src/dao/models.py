@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from sqlalchemy import JSON, TIMESTAMP, Index, Integer, LargeBinary
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.dao.base_model import Base
+
+
+class Tombstone(Base):
+    """Отметка об удалении записи для ленты изменений. updated_at - момент удаления."""
+    table_name: Mapped[str]
+    record_id: Mapped[int]
+
+    __table_args__ = (
+        Index('ix_tombstones_table_name_updated_at', 'table_name', 'updated_at', 'record_id'),
+    )
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(table_name={self.table_name}, record_id={self.record_id})"
+
+
+class IdempotencyKey(Base):
+    """Сохраненный ответ на запрос с Idempotency-Key (общий для всех воркеров уровень кэша).
+
+    Пока запрос выполняется, status_code пуст, а expires_at ограничивает время блокировки ключа.
+    """
+    key: Mapped[str] = mapped_column(unique=True)
+    fingerprint: Mapped[str]
+    status_code: Mapped[int | None]
+    headers: Mapped[list | None] = mapped_column(JSON)
+    body: Mapped[bytes | None] = mapped_column(LargeBinary)
+    expires_at: Mapped[datetime] = mapped_column(TIMESTAMP, index=True)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(key={self.key})"
+
+
+class AuditLog(Base):
+    """Запись аудита изменения данных. created_at - момент коммита изменения."""
+    table_name: Mapped[str]
+    action: Mapped[str]
+    record_ids: Mapped[list[int]] = mapped_column(ARRAY(Integer))
+    user_id: Mapped[int | None]
+    request_id: Mapped[str | None]
+
+    __table_args__ = (
+        Index('ix_auditlogs_table_name_created_at', 'table_name', 'created_at'),
+    )
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(table_name={self.table_name}, action={self.action})"
@@ -0,0 +1,126 @@
+import asyncio
+import inspect
+from typing import Awaitable, Callable
+
+import asyncpg
+import loguru
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.settings import settings
+
+logger = loguru.logger
+
+# Postgres доставляет NOTIFY только после коммита транзакции, при откате уведомления отбрасываются.
+# now()::timestamp совпадает с updated_at, выставленным в этой же транзакции. Одинаковые уведомления
+# одной транзакции Postgres схлопывает, поэтому (tx, id, action) однозначно задает уведомление.
+NOTIFY_QUERY = text(
+    "SELECT pg_notify(:channel, json_build_object("
+    "'action', CAST(:action AS text), 'id', id, 'ts', now()::timestamp, 'tx', txid_current())::text) "
+    "FROM unnest(CAST(:ids AS integer[])) AS id"
+)
+
+
+async def notify(session: AsyncSession, channel: str, action: str, ids: list[int]) -> None:
+    """Отправляет по одному уведомлению на каждую запись в рамках текущей транзакции."""
+    await session.execute(NOTIFY_QUERY, {'channel': channel, 'action': action, 'ids': ids})
+
+
+class PgListener:
+    """Одно выделенное соединение asyncpg с LISTEN на все зарегистрированные каналы.
+
+    При обрыве соединения переподключается в фоне и вызывает on_reconnect,
+    т.к. уведомления за время простоя потеряны. on_connect вызывается после
+    каждого подключения, когда LISTEN уже установлен: там удобно загружать
+    начальное состояние, которое дальше поддерживается уведомлениями. Ошибка
+    в on_connect приводит к переподключению. on_disconnect вызывается сразу,
+    как только соединение потеряно или не удалось подключиться: с этого
+    момента состояние из уведомлений может отставать от БД.
+    """
+
+    def __init__(self, reconnect_delay: float = 1.0, max_reconnect_delay: float = 30.0):
+        self._handlers: dict[str, Callable[[str], None]] = {}
+        self._reconnect_callbacks: list[Callable[[], None]] = []
+        self._connect_callbacks: list[Callable[[], Awaitable[None] | None]] = []
+        self._disconnect_callbacks: list[Callable[[], None]] = []
+        self._reconnect_delay = reconnect_delay
+        self._max_reconnect_delay = max_reconnect_delay
+        self._task: asyncio.Task | None = None
+
+    def add_handler(self, channel: str, handler: Callable[[str], None]) -> None:
+        self._handlers[channel] = handler
+
+    def on_reconnect(self, callback: Callable[[], None]) -> None:
+        self._reconnect_callbacks.append(callback)
+
+    def on_connect(self, callback: Callable[[], Awaitable[None] | None]) -> None:
+        self._connect_callbacks.append(callback)
+
+    def on_disconnect(self, callback: Callable[[], None]) -> None:
+        self._disconnect_callbacks.append(callback)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _dispatch(self, connection, pid: int, channel: str, payload: str) -> None:
+        try:
+            self._handlers[channel](payload)
+        except Exception:
+            logger.exception(f"Ошибка обработки уведомления из канала {channel}")
+
+    async def _run(self) -> None:
+        delay = self._reconnect_delay
+        connected_before = False
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(
+                    host=settings.DB_HOST,
+                    port=settings.DB_PORT,
+                    user=settings.DB_USER,
+                    password=settings.DB_PASS,
+                    database=settings.DB_NAME,
+                )
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                for channel in self._handlers:
+                    await connection.add_listener(channel, self._dispatch)
+                if connected_before:
+                    for callback in self._reconnect_callbacks:
+                        callback()
+                connected_before = True
+                for callback in self._connect_callbacks:
+                    result = callback()
+                    if inspect.isawaitable(result):
+                        await result
+                delay = self._reconnect_delay
+                await lost.wait()
+                logger.warning("Соединение LISTEN потеряно, переподключение")
+            except Exception as e:
+                # Любая ошибка соединения (в т.ч. InterfaceError, TimeoutError) - переподключение,
+                # иначе задача завершится и уведомления перестанут приходить до перезапуска воркера
+                logger.warning(f"Соединение LISTEN недоступно: {e!r}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self._max_reconnect_delay)
+            finally:
+                for callback in self._disconnect_callbacks:
+                    try:
+                        callback()
+                    except Exception:
+                        logger.exception("Ошибка обработчика отключения LISTEN")
+                # terminate не ждет сервер и не бросает исключений на оборванном соединении
+                if connection is not None and not connection.is_closed():
+                    connection.terminate()
+
+
+listener = PgListener()
@@ -0,0 +1,189 @@
+import asyncio
+import contextvars
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+
+import loguru
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.settings import settings
+
+logger = loguru.logger
+
+# Литералы и списки параметров заменяются на ?, чтобы запросы одной формы попадали в один агрегат
+_NORMALIZE_PATTERNS = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\$\d+(?:::(?:TIMESTAMP WITH(?:OUT)? TIME ZONE|[A-Z]+(?:\([\d, ]+\))?)(?:\[\])?)?'), '?'),
+    (re.compile(r'%\(\w+\)s'), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)'), '(?, ...)'),
+    (re.compile(r'\s+'), ' '),
+]
+
+# Сколько форм запросов хранится; остальные складываются в общий агрегат
+MAX_SHAPES = 1000
+OTHER_SHAPE = '<other>'
+RESERVOIR_SIZE = 512
+
+# EXPLAIN ANALYZE выполняет запрос еще раз: функции с побочными эффектами и блокировки строк
+# повторять нельзя, поэтому они не анализируются
+_SIDE_EFFECTS_PATTERN = re.compile(
+    r'\b(?:pg_notify|set_config|pg_(?:try_)?advisory\w*|nextval|setval|pg_sleep\w*|'
+    r'pg_terminate_backend|pg_cancel_backend|lo_\w+|dblink\w*)\s*\(|'
+    r'\bFOR\s+(?:NO\s+KEY\s+)?(?:UPDATE|SHARE|KEY\s+SHARE)\b',
+    re.IGNORECASE,
+)
+_FROM_PATTERN = re.compile(r'\bFROM\b', re.IGNORECASE)
+
+
+def normalize_statement(statement: str) -> str:
+    for pattern, replacement in _NORMALIZE_PATTERNS:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+
+def is_explainable(statement: str) -> bool:
+    """Можно ли повторить запрос под EXPLAIN ANALYZE: только чтение таблиц.
+
+    SELECT без FROM - это вызов функции (pg_notify, set_config, advisory lock), а не чтение.
+    """
+    return (
+        statement.lstrip().upper().startswith('SELECT')
+        and _FROM_PATTERN.search(statement) is not None
+        and _SIDE_EFFECTS_PATTERN.search(statement) is None
+    )
+
+
+@dataclass
+class StatementStats:
+    statement: str
+    count: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+    slow_count: int = 0
+    explain: str | None = None
+    # Равномерная выборка длительностей (reservoir sampling) для оценки p99
+    samples: list[float] = field(default_factory=list)
+
+    def observe(self, duration: float, slow: bool) -> None:
+        self.count += 1
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+        self.slow_count += slow
+        if len(self.samples) < RESERVOIR_SIZE:
+            self.samples.append(duration)
+        else:
+            index = random.randrange(self.count)
+            if index < RESERVOIR_SIZE:
+                self.samples[index] = duration
+
+    @property
+    def p99(self) -> float:
+        ordered = sorted(self.samples)
+        return ordered[int(0.99 * (len(ordered) - 1))] if ordered else 0.0
+
+
+class SlowQueryLog:
+    """Агрегаты времени выполнения SQL по формам запросов на событиях курсора SQLAlchemy.
+
+    Запросы дольше threshold пишутся в лог. Если включен explain, для случайной
+    выборки медленных чтений (is_explainable) снимается EXPLAIN (ANALYZE, BUFFERS)
+    на отдельном соединении (не больше одного одновременно), вне контекста запроса и
+    со своим statement_timeout: ANALYZE повторно выполняет запрос, поэтому это только
+    для непродуктивных окружений.
+    """
+
+    def __init__(
+        self,
+        threshold: float,
+        explain: bool = False,
+        explain_sample_rate: float = 0.1,
+        explain_timeout: float = 5,
+    ):
+        self.threshold = threshold
+        self.explain = explain
+        self.explain_sample_rate = explain_sample_rate
+        self.explain_timeout = explain_timeout
+        self._stats: dict[str, StatementStats] = {}
+        self._lock = threading.Lock()
+        self._engine: AsyncEngine | None = None
+        self._explain_task: asyncio.Task | None = None
+
+    def install(self, engine: AsyncEngine) -> None:
+        # EXPLAIN снимается через первый подключенный движок
+        self._engine = self._engine or engine
+        event.listen(engine.sync_engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine.sync_engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def snapshot(self) -> list[StatementStats]:
+        with self._lock:
+            return sorted(self._stats.values(), key=lambda stats: stats.total_time, reverse=True)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if not context.execution_options.get('skip_slow_query_log'):
+            context._query_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        started = getattr(context, '_query_started', None)
+        if started is None:
+            return
+        duration = time.perf_counter() - started
+        slow = duration >= self.threshold
+        shape = normalize_statement(statement)
+        with self._lock:
+            stats = self._stats.get(shape)
+            if stats is None:
+                if len(self._stats) >= MAX_SHAPES:
+                    shape = OTHER_SHAPE
+                stats = self._stats.setdefault(shape, StatementStats(statement=shape))
+            stats.observe(duration, slow)
+        if not slow:
+            return
+        logger.warning(f"Медленный запрос {duration * 1000:.1f} мс: {shape}")
+        if (
+            self.explain
+            and not executemany
+            and is_explainable(statement)
+            and random.random() < self.explain_sample_rate
+            and (self._explain_task is None or self._explain_task.done())
+        ):
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            # Пустой контекст: задача не наследует бюджет времени и контекст запроса, вызвавшего EXPLAIN
+            self._explain_task = loop.create_task(
+                self._capture_explain(stats, statement, parameters), context=contextvars.Context()
+            )
+
+    async def _capture_explain(self, stats: StatementStats, statement: str, parameters) -> None:
+        try:
+            async with self._engine.connect() as connection:
+                connection = await connection.execution_options(skip_slow_query_log=True)
+                await connection.execute(
+                    text("SELECT set_config('statement_timeout', :timeout, true)"),
+                    {'timeout': f'{int(self.explain_timeout * 1000)}ms'},
+                )
+                result = await connection.exec_driver_sql(
+                    f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters
+                )
+                stats.explain = '\n'.join(row[0] for row in result.all())
+                await connection.rollback()
+        except Exception as e:
+            logger.warning(f"Не удалось получить EXPLAIN: {e}")
+
+
+slow_query_log = SlowQueryLog(
+    threshold=settings.SLOW_QUERY_THRESHOLD_MS / 1000,
+    explain=settings.DEV_MODE,
+    explain_sample_rate=settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+    explain_timeout=settings.SLOW_QUERY_EXPLAIN_TIMEOUT_SECONDS,
+)
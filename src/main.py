@@ -4,10 +4,23 @@ from typing import AsyncGenerator
 
 from fastapi import FastAPI
 from fastapi.responses import ORJSONResponse
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
 
 from src.auth.router.auth import router as auth_router
 from src.auth.router.users import router as users_router
+from src.auth.security import shutdown_hashing_pool
+from src.core.admission import AdmissionControlMiddleware, AdmissionLimiter, pool_timeout_handler
+from src.core.deadlines import DeadlineMiddleware, query_timeout_handler
+from src.core.log_pipeline import AccessLogMiddleware, log_pipeline
+from src.core.compression import CompressionMiddleware
+from src.core.idempotency import DatabaseIdempotencyBackend, IdempotencyMiddleware, IdempotencyStore
+from src.core.profiling import ProfilingMiddleware, profile_store
+from src.batch.router import router as batch_router
+from src.core.router import router as admin_router
+from src.dao.maintenance import maintenance
+from src.dao.notify import listener
 from src.products.router import router as products_router
+from src.settings import settings
 
 logger = loguru.logger
 
@@ -16,7 +29,14 @@ logger = loguru.logger
 async def lifespan(app: FastAPI) -> AsyncGenerator[dict, None]:
     """Application lifecycle management."""
     # logger.info("Инициализация приложения...")
+    await log_pipeline.start()
+    await listener.start()
+    await maintenance.start()
     yield
+    await maintenance.stop()
+    await listener.stop()
+    await log_pipeline.stop()
+    shutdown_hashing_pool()
     # logger.info("Завершение работы приложения...")
 
 
@@ -24,6 +44,57 @@ def register_routers(app: FastAPI) -> None:
     app.include_router(auth_router, prefix='/auth', tags=["Авторизация и аутентификация"])
     app.include_router(users_router, prefix='/users', tags=["Пользователи"])
     app.include_router(products_router, prefix='/products', tags=["Товары"])
+    app.include_router(batch_router, prefix='/batch', tags=["Пакетные запросы"])
+    app.include_router(admin_router, prefix='/admin', tags=["Администрирование"])
+
+
+def register_middlewares(app: FastAPI) -> None:
+    # Последний добавленный middleware - внешний. Идемпотентность внутри сжатия:
+    # сохраняется несжатый ответ, а сжимается он под Accept-Encoding каждого повтора.
+    app.add_middleware(
+        IdempotencyMiddleware,
+        store=IdempotencyStore(
+            max_entries=settings.IDEMPOTENCY_MAX_ENTRIES,
+            ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+            wait_timeout=settings.IDEMPOTENCY_WAIT_TIMEOUT,
+            backend=DatabaseIdempotencyBackend(
+                ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+                lock_seconds=settings.IDEMPOTENCY_LOCK_SECONDS,
+            ) if settings.IDEMPOTENCY_DB_ENABLED else None,
+        ),
+        routes={('POST', '/products'), ('POST', '/users/register')},
+    )
+    # Контроль допуска снаружи идемпотентности: повтор, ждущий первый запрос, тоже занимает место.
+    # Сжатие снаружи, чтобы место освобождалось сразу после обработки запроса.
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        limiters={
+            name: AdmissionLimiter(
+                name,
+                limit=limit,
+                max_queue=settings.ADMISSION_QUEUE_SIZE,
+                timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+            )
+            for name, limit in (
+                ('read', settings.ADMISSION_READ_LIMIT),
+                ('write', settings.ADMISSION_WRITE_LIMIT),
+                ('auth', settings.ADMISSION_AUTH_LIMIT),
+            )
+        },
+        auth_paths={'/auth/login', '/users/register', '/users/bulk-register'},
+        exempt_prefixes=('/products/events', '/admin', '/docs', '/redoc', '/openapi.json'),
+        retry_after=settings.ADMISSION_RETRY_AFTER,
+    )
+    # Бюджет времени отсчитывается до очереди контроля допуска
+    app.add_middleware(DeadlineMiddleware)
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        offload_size=settings.COMPRESSION_OFFLOAD_SIZE,
+    )
+    app.add_middleware(ProfilingMiddleware, store=profile_store, sample_rate=settings.PROFILING_SAMPLE_RATE)
+    # Журнал доступа - самый внешний: видит и отклоненные контролем допуска запросы
+    app.add_middleware(AccessLogMiddleware, pipeline=log_pipeline)
 
 
 def create_app() -> FastAPI:
@@ -36,6 +107,10 @@ def create_app() -> FastAPI:
         default_response_class=ORJSONResponse,
     )
     register_routers(app)
+    register_middlewares(app)
+    app.add_exception_handler(PoolTimeoutError, pool_timeout_handler)
+    app.add_exception_handler(DBAPIError, query_timeout_handler)
+    app.add_exception_handler(TimeoutError, query_timeout_handler)
     return app
 
 
@@ -8,6 +8,7 @@ from sqlalchemy.ext.asyncio import async_engine_from_config
 
 from src.settings import settings
 from src.dao.base_model import Base
+from src.dao.models import AuditLog, Tombstone
 from src.auth.models import User, Role
 from src.products.models import Product
 
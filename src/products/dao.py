@@ -1,6 +1,83 @@
+from sqlalchemy import select, text
+
 from src.dao.base_dao import BaseDAO
-from src.products.models import Product
+from src.dao.database import session_factory
+from src.dao.maintenance import maintenance
+from src.dao.notify import notify
+from src.products.events import PRODUCT_EVENTS_CHANNEL
+from src.products.models import Product, ProductPriceBucket, ProductStats
+from src.settings import settings
+
+STATS_ID = 1
+# Ключ advisory-блокировки пересчета: одновременно пересчитывает только один воркер
+STATS_REFRESH_LOCK_KEY = 30_001
+
+# Пересчет агрегатов и гистограммы одним проходом по товарам. Записи товаров агрегаты
+# не трогают и не ждут друг друга на строке агрегатов; данные отстают не больше чем
+# на период пересчета PRODUCT_STATS_REFRESH_SECONDS
+REFRESH_STATS_QUERY = text("""
+    WITH histogram AS (
+        SELECT CASE WHEN price < 1 THEN 0 ELSE floor(log(2, price::numeric))::int + 1 END AS bucket,
+               count(*) AS count,
+               sum(price::numeric) AS price_sum,
+               min(price) AS min_price,
+               max(price) AS max_price
+        FROM products
+        GROUP BY 1
+    ),
+    totals AS (
+        INSERT INTO product_stats (id, count, price_sum, min_price, max_price)
+        SELECT :stats_id, coalesce(sum(count), 0), coalesce(sum(price_sum), 0), min(min_price), max(max_price)
+        FROM histogram
+        ON CONFLICT (id) DO UPDATE
+        SET count = excluded.count, price_sum = excluded.price_sum,
+            min_price = excluded.min_price, max_price = excluded.max_price, updated_at = now()
+    ),
+    emptied AS (
+        DELETE FROM product_price_buckets WHERE bucket NOT IN (SELECT bucket FROM histogram)
+    )
+    INSERT INTO product_price_buckets (bucket, count)
+    SELECT bucket, count FROM histogram
+    ON CONFLICT (bucket) DO UPDATE SET count = excluded.count, updated_at = now()
+""")
 
 
 class ProductsDAO(BaseDAO):
     model = Product
+    sorting_fields = ('id', 'title', 'article', 'price', 'created_at', 'updated_at')
+    cache_ttl = settings.CACHE_TTL_SECONDS
+
+    async def _after_write(self, action: str, ids: list[int]) -> None:
+        await super()._after_write(action, ids)
+        if ids:
+            await notify(self._session, PRODUCT_EVENTS_CHANNEL, action, ids)
+
+
+class ProductStatsDAO(BaseDAO):
+    model = ProductStats
+
+    async def get_stats(self) -> tuple[ProductStats | None, list[ProductPriceBucket]]:
+        """Возвращает агрегаты и непустые корзины гистограммы."""
+        stats = await self.get_one_by_id(id=STATS_ID)
+        result = await self._session.execute(
+            select(ProductPriceBucket).where(ProductPriceBucket.count > 0).order_by(ProductPriceBucket.bucket)
+        )
+        return stats, list(result.scalars().all())
+
+    async def refresh(self) -> bool:
+        """Пересчитывает агрегаты; False, если их уже пересчитывает другой воркер."""
+        locked = await self._session.scalar(
+            text("SELECT pg_try_advisory_xact_lock(:key)"), {'key': STATS_REFRESH_LOCK_KEY}
+        )
+        if locked:
+            await self._session.execute(REFRESH_STATS_QUERY, {'stats_id': STATS_ID})
+        return locked
+
+
+async def refresh_product_stats() -> None:
+    async with session_factory() as session:
+        await ProductStatsDAO(session).refresh()
+        await session.commit()
+
+
+maintenance.add('product_stats', settings.PRODUCT_STATS_REFRESH_SECONDS, refresh_product_stats)
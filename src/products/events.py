@@ -0,0 +1,33 @@
+from datetime import datetime
+
+import orjson
+
+from src.core.events import EventBroker
+from src.dao.cache import cache
+from src.dao.cursor import encode_cursor
+from src.dao.notify import listener
+from src.products.models import Product
+from src.settings import settings
+
+PRODUCT_EVENTS_CHANNEL = 'product_events'
+
+product_events = EventBroker(queue_size=settings.SSE_QUEUE_SIZE, history_size=settings.SSE_HISTORY_SIZE)
+
+
+def handle_product_notification(payload: str) -> None:
+    """Публикует уведомление из Postgres подписчикам.
+
+    id события - курсор ленты изменений с суффиксом транзакции и действия
+    (<курсор>.<tx>.<action>): несколько изменений одной строки в транзакции
+    получают разные id. По id (или его части до точки) клиент может
+    досинхронизироваться через GET /products/changes?since=<id>.
+    """
+    data = orjson.loads(payload)
+    # Изменение могло прийти из другого воркера: локальный кэш товаров устарел
+    cache.invalidate_local(Product.__tablename__)
+    event_id = f"{encode_cursor(datetime.fromisoformat(data['ts']), data['id'])}.{data['tx']}.{data['action']}"
+    product_events.publish(event_id, {'action': data['action'], 'id': data['id']})
+
+
+listener.add_handler(PRODUCT_EVENTS_CHANNEL, handle_product_notification)
+listener.on_reconnect(product_events.reset_all)
@@ -5,3 +5,19 @@ ProductNotFoundException = HTTPException(
     status_code=status.HTTP_404_NOT_FOUND,
     detail='Товар не найден',
 )
+
+
+BulkDeleteWithoutConditionsException = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail='Укажите идентификаторы товаров или хотя бы один фильтр',
+)
+
+BulkTooLargeException = HTTPException(
+    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    detail='Слишком много товаров в запросе',
+)
+
+BulkDuplicateIdsException = HTTPException(
+    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+    detail='Товар встречается в запросе несколько раз',
+)
@@ -0,0 +1,31 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+from src.dao.base_dao import check_filter_schema
+from src.products.models import Product
+
+
+class ProductFilter(BaseModel):
+    article: Optional[str] = Field(None, description="Фильтр по артикулу (точное совпадение)")
+    price__gte: Optional[float] = Field(None, description="Цена от (включительно)")
+    price__lte: Optional[float] = Field(None, description="Цена до (включительно)")
+    created_at__gte: Optional[datetime] = Field(None, description="Создан не раньше")
+    created_at__lte: Optional[datetime] = Field(None, description="Создан не позже")
+    updated_at__gte: Optional[datetime] = Field(None, description="Изменен не раньше")
+    updated_at__lte: Optional[datetime] = Field(None, description="Изменен не позже")
+
+    # запрещает передачу дополнительных полей
+    model_config = ConfigDict(extra="forbid")
+
+    @field_validator('created_at__gte', 'created_at__lte', 'updated_at__gte', 'updated_at__lte')
+    @classmethod
+    def to_naive_utc(cls, value: datetime | None) -> datetime | None:
+        """Колонки TIMESTAMP без часового пояса хранят UTC: время с поясом приводим к UTC без пояса."""
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+
+check_filter_schema(Product, ProductFilter)
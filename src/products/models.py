@@ -1,14 +1,22 @@
-from sqlalchemy.orm import Mapped
+from decimal import Decimal
 
-from src.dao.base_model import Base
+from sqlalchemy import BigInteger, Index, Numeric, text
+from sqlalchemy.orm import Mapped, mapped_column
 
+from src.dao.base_model import Base, Versioned
 
-class Product(Base):
+
+class Product(Versioned, Base):
     title: Mapped[str]
-    article: Mapped[str]
-    price: Mapped[float]
+    article: Mapped[str] = mapped_column(index=True)
+    price: Mapped[float] = mapped_column(index=True)
     description: Mapped[str]
 
+    __table_args__ = (
+        Index('ix_products_created_at', 'created_at'),
+        Index('ix_products_updated_at_id', 'updated_at', 'id'),
+    )
+
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}(id={self.id})"
 
@@ -19,3 +27,21 @@ class Product(Base):
             'price': self.price,
             'description': self.description,
         }
+
+
+class ProductStats(Base):
+    """Агрегаты по каталогу (одна строка с id=1), пересчитываются по расписанию (ProductStatsDAO.refresh)."""
+    __tablename__ = 'product_stats'
+
+    count: Mapped[int] = mapped_column(BigInteger, server_default=text("0"))
+    price_sum: Mapped[Decimal] = mapped_column(Numeric, server_default=text("0"))
+    min_price: Mapped[float | None]
+    max_price: Mapped[float | None]
+
+
+class ProductPriceBucket(Base):
+    """Гистограмма цен: bucket 0 - цены до 1, bucket k - цены в [2^(k-1), 2^k)."""
+    __tablename__ = 'product_price_buckets'
+
+    bucket: Mapped[int] = mapped_column(unique=True)
+    count: Mapped[int] = mapped_column(BigInteger, server_default=text("0"))
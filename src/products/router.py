@@ -1,54 +1,194 @@
 import loguru
 
-from typing import List
-from fastapi import APIRouter, Depends, status
-from fastapi.responses import Response
+from typing import List, Optional
+from fastapi import APIRouter, Body, Depends, Header, Query, status
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.dao.database import get_session_without_commit, get_session_with_commit
-from src.products.dao import ProductsDAO
-from src.products.exceptions import ProductNotFoundException
-from src.products.schemas import ProductBaseModelSchema, ProductCreateUpdateModelSchema
+from src.auth.dependencies import get_current_admin_claims
+from src.core.deadlines import request_deadline
+from src.core.etag import format_etag, get_if_match_version
+from src.dao.base_dao import sorting_pattern
+from src.dao.cursor import decode_cursor, encode_cursor
+from src.dao.database import get_session_readonly, get_session_with_commit
+from src.settings import settings
+from src.products.dao import ProductsDAO, ProductStatsDAO
+from src.products.events import product_events
+from src.products.exceptions import (
+    BulkDeleteWithoutConditionsException,
+    BulkDuplicateIdsException,
+    BulkTooLargeException,
+    ProductNotFoundException,
+)
+from src.products.filters import ProductFilter
+from src.products.schemas import (
+    ProductBaseModelSchema,
+    ProductBulkDeleteSchema,
+    ProductBulkResultSchema,
+    ProductBulkUpdateItemSchema,
+    ProductChangesSchema,
+    ProductCreateUpdateModelSchema,
+    ProductPriceBucketSchema,
+    ProductStatsSchema,
+)
 
 router = APIRouter()
 logger = loguru.logger
 
 
-@router.get('')
-async def get_all_products(session: AsyncSession = Depends(get_session_without_commit)) -> List[ProductBaseModelSchema]:
-    return await ProductsDAO(session).find_all()
+@router.get('', dependencies=[Depends(request_deadline(settings.LIST_REQUEST_TIMEOUT_SECONDS))])
+async def get_all_products(
+    filters: ProductFilter = Depends(),
+    sorting: Optional[str] = Query(
+        "id:asc",
+        pattern=sorting_pattern(ProductsDAO.sorting_fields),
+        description="Поле и направление сортировки, например: 'price:asc', 'created_at:desc'"
+    ),
+    session: AsyncSession = Depends(get_session_readonly),
+) -> List[ProductBaseModelSchema]:
+    return await ProductsDAO(session).find_all(filters=filters, sorting=sorting)
+
+
+@router.get('/changes', dependencies=[Depends(request_deadline(settings.LIST_REQUEST_TIMEOUT_SECONDS))])
+async def get_product_changes(
+    since: Optional[str] = Query(None, description="Курсор из предыдущего ответа; без него - с самого начала"),
+    limit: int = Query(500, ge=1, le=5000, description="Максимальное количество изменений в ответе"),
+    session: AsyncSession = Depends(get_session_readonly),
+) -> ProductChangesSchema:
+    changes = await ProductsDAO(session).find_changes(
+        since=decode_cursor(since) if since else None,
+        limit=limit,
+    )
+    position = changes['position']
+    return ProductChangesSchema(
+        items=changes['items'],
+        deleted=changes['deleted'],
+        next_cursor=encode_cursor(*position) if position else None,
+        has_more=changes['has_more'],
+    )
+
+
+@router.get('/stats', dependencies=[Depends(request_deadline(settings.LIST_REQUEST_TIMEOUT_SECONDS))])
+async def get_product_stats(session: AsyncSession = Depends(get_session_readonly)) -> ProductStatsSchema:
+    stats, buckets = await ProductStatsDAO(session).get_stats()
+    count = stats.count if stats else 0
+    return ProductStatsSchema(
+        count=count,
+        min_price=stats.min_price if stats else None,
+        max_price=stats.max_price if stats else None,
+        avg_price=float(stats.price_sum) / count if count else None,
+        histogram=[
+            ProductPriceBucketSchema(
+                price_from=0 if bucket.bucket == 0 else 2 ** (bucket.bucket - 1),
+                price_to=2 ** bucket.bucket,
+                count=bucket.count,
+            )
+            for bucket in buckets
+        ],
+        updated_at=stats.updated_at if stats else None,
+    )
+
+
+@router.get('/events', response_class=StreamingResponse)
+async def get_product_events(last_event_id: Optional[str] = Header(None)) -> StreamingResponse:
+    """Поток изменений товаров (Server-Sent Events)."""
+    return StreamingResponse(
+        product_events.stream('product', last_event_id, heartbeat=settings.SSE_HEARTBEAT_SECONDS),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
 
 
 @router.post('')
 async def create_product(
     product_data: ProductCreateUpdateModelSchema,
+    response: Response,
     session: AsyncSession = Depends(get_session_with_commit),
 ) -> ProductBaseModelSchema:
     new_product = await ProductsDAO(session).add(**product_data.model_dump(exclude_unset=True))
+    response.headers['ETag'] = format_etag(new_product.version)
     return new_product
 
 
+@router.patch(
+    '/bulk',
+    dependencies=[
+        Depends(get_current_admin_claims),
+        Depends(request_deadline(settings.BULK_REQUEST_TIMEOUT_SECONDS)),
+    ],
+)
+async def bulk_update_products(
+    items: List[ProductBulkUpdateItemSchema] = Body(description="Товары с id и изменяемыми полями"),
+    session: AsyncSession = Depends(get_session_with_commit),
+) -> ProductBulkResultSchema:
+    """Массовое обновление товаров пачками по BULK_CHUNK_SIZE."""
+    if len(items) > settings.BULK_MAX_ITEMS:
+        raise BulkTooLargeException
+    try:
+        chunks = await ProductsDAO(session).bulk_update(items)
+    except ValueError:
+        raise BulkDuplicateIdsException
+    return ProductBulkResultSchema(total=sum(chunks), chunks=chunks)
+
+
+@router.delete(
+    '/bulk',
+    dependencies=[
+        Depends(get_current_admin_claims),
+        Depends(request_deadline(settings.BULK_REQUEST_TIMEOUT_SECONDS)),
+    ],
+)
+async def bulk_delete_products(
+    data: ProductBulkDeleteSchema = Body(ProductBulkDeleteSchema()),
+    filters: ProductFilter = Depends(),
+    session: AsyncSession = Depends(get_session_with_commit),
+) -> ProductBulkResultSchema:
+    """Массовое удаление товаров по списку id или по фильтрам, не больше BULK_MAX_ITEMS за запрос."""
+    if data.ids is not None and len(data.ids) > settings.BULK_MAX_ITEMS:
+        raise BulkTooLargeException
+    try:
+        chunks = await ProductsDAO(session).bulk_delete(ids=data.ids, filters=filters)
+    except ValueError:
+        raise BulkDeleteWithoutConditionsException
+    return ProductBulkResultSchema(total=sum(chunks), chunks=chunks)
+
+
+@router.get('/{id}')
+async def get_product_by_id(
+    id: int,
+    response: Response,
+    session: AsyncSession = Depends(get_session_readonly),
+) -> ProductBaseModelSchema:
+    """Читается мимо кэша: ETag должен совпадать с текущей версией для If-Match."""
+    product = await ProductsDAO(session, cached=False).get_one_by_id(id=id)
+    if not product:
+        raise ProductNotFoundException
+    response.headers['ETag'] = format_etag(product.version)
+    return product
+
+
 @router.put('/{id}')
 @router.patch('/{id}')
 async def update_product(
     id: int,
     new_product_data: ProductCreateUpdateModelSchema,
+    response: Response,
+    version: Optional[int] = Depends(get_if_match_version),
     session: AsyncSession = Depends(get_session_with_commit),
 ) -> ProductBaseModelSchema:
-    dao = ProductsDAO(session)
-    upd_user = await dao.get_one_by_id(id=id)
-    if not upd_user:
+    """С If-Match товар обновляется только при совпадении версии, иначе 412."""
+    product = await ProductsDAO(session).update(id=id, values=new_product_data, version=version)
+    if not product:
         raise ProductNotFoundException
-    return await dao.update(id=id, values=new_product_data)
+    response.headers['ETag'] = format_etag(product.version)
+    return product
 
 
 @router.delete('/{id}', status_code=status.HTTP_204_NO_CONTENT)
 async def delete_product(
     id: int,
+    version: Optional[int] = Depends(get_if_match_version),
     session: AsyncSession = Depends(get_session_with_commit),
 ) -> None:
-    dao = ProductsDAO(session)
-    upd_user = await dao.get_one_by_id(id=id)
-    if not upd_user:
+    if not await ProductsDAO(session).delete(id=id, version=version):
         raise ProductNotFoundException
-    return await dao.delete(id=id)
@@ -1,4 +1,5 @@
-from typing import Optional
+from datetime import datetime
+from typing import List, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -9,6 +10,7 @@ class ProductBaseModelSchema(BaseModel):
     article: str = Field(description='Артикул товара')
     price: float = Field(description='Цена товара')
     description: str = Field(description='Описание товара')
+    version: int = Field(description='Версия записи (ETag), для If-Match при изменении')
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -20,3 +22,38 @@ class ProductCreateUpdateModelSchema(BaseModel):
     description: Optional[str] = None
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class ProductBulkUpdateItemSchema(ProductCreateUpdateModelSchema):
+    id: int = Field(description='Идентификатор обновляемого товара')
+
+
+class ProductBulkDeleteSchema(BaseModel):
+    ids: Optional[List[int]] = Field(None, description='Идентификаторы удаляемых товаров; без них удаляется по фильтрам')
+
+
+class ProductBulkResultSchema(BaseModel):
+    total: int = Field(description='Всего затронуто товаров')
+    chunks: List[int] = Field(description='Число затронутых товаров по каждой пачке (одному запросу к БД)')
+
+
+class ProductChangesSchema(BaseModel):
+    items: List[ProductBaseModelSchema] = Field(description='Созданные или измененные товары')
+    deleted: List[int] = Field(description='Идентификаторы удаленных товаров')
+    next_cursor: Optional[str] = Field(description='Курсор для следующего запроса')
+    has_more: bool = Field(description='Есть ли еще изменения после next_cursor')
+
+
+class ProductPriceBucketSchema(BaseModel):
+    price_from: float = Field(description='Нижняя граница цены (включительно)')
+    price_to: float = Field(description='Верхняя граница цены (не включительно)')
+    count: int = Field(description='Количество товаров')
+
+
+class ProductStatsSchema(BaseModel):
+    count: int = Field(description='Количество товаров')
+    min_price: Optional[float] = Field(description='Минимальная цена')
+    max_price: Optional[float] = Field(description='Максимальная цена')
+    avg_price: Optional[float] = Field(description='Средняя цена')
+    histogram: List[ProductPriceBucketSchema] = Field(description='Гистограмма цен')
+    updated_at: Optional[datetime] = Field(description='Время последнего пересчета агрегатов (отстают не больше чем на период пересчета)')
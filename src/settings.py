@@ -6,6 +6,9 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 class Settings(BaseSettings):
     BASE_DIR: str = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 
+    # Непродуктивный режим: включает диагностику, которая нагружает БД (EXPLAIN ANALYZE медленных запросов)
+    DEV_MODE: bool = False
+
     SECRET_KEY: str
     ALGORITHM: str
 
@@ -19,8 +22,97 @@ class Settings(BaseSettings):
     def db_url(self) -> str:
         return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
-    # REDIS_HOST: str | None
-    # REDIS_PORT: int | None
+    # Лента изменений не отдает записи моложе этого порога (сек) и начала самой старой открытой транзакции
+    CHANGES_SAFETY_LAG_SECONDS: int = 2
+    # Период пересчета статистики товаров (сек) - граница ее устаревания
+    PRODUCT_STATS_REFRESH_SECONDS: float = 10
+
+    # Срок хранения отметок об удалении (сек): курсор ленты старше него отклоняется с 410;
+    # период их очистки (сек)
+    TOMBSTONE_RETENTION_SECONDS: int = 7 * 24 * 60 * 60
+    TOMBSTONE_PURGE_INTERVAL_SECONDS: float = 60 * 60
+
+    # Server-Sent Events: размер очереди подписчика, история для Last-Event-ID, период keep-alive (сек)
+    SSE_QUEUE_SIZE: int = 100
+    SSE_HISTORY_SIZE: int = 1000
+    SSE_HEARTBEAT_SECONDS: float = 15
+
+    # Сжатие ответов: минимальный размер тела и размер, с которого сжатие уходит в пул потоков (байт)
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_OFFLOAD_SIZE: int = 64 * 1024
+
+    # Idempotency-Key: время хранения ответа (сек), размер кэша в памяти, ожидание параллельного
+    # запроса с тем же ключом (сек), общий для воркеров уровень в БД и время блокировки ключа в нем (сек)
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 60 * 60
+    IDEMPOTENCY_MAX_ENTRIES: int = 10000
+    IDEMPOTENCY_WAIT_TIMEOUT: float = 30
+    IDEMPOTENCY_DB_ENABLED: bool = False
+    IDEMPOTENCY_LOCK_SECONDS: int = 60
+
+    # Массовая регистрация: число процессов для bcrypt (0 - по числу ядер) и максимум пользователей в запросе.
+    # bcrypt - около 0.25 с на пароль на ядро: 1000 паролей укладываются в BULK_REQUEST_TIMEOUT_SECONDS
+    # даже на одном ядре. Увеличивать вместе с бюджетом или числом процессов
+    HASHING_WORKERS: int = 0
+    BULK_REGISTER_MAX_ITEMS: int = 1000
+
+    # Профилирование: доля случайно профилируемых запросов и размер буфера профилей
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_MAX_ENTRIES: int = 50
+
+    # Журнал медленных запросов: порог (мс), доля медленных SELECT, для которых снимается EXPLAIN в DEV_MODE,
+    # и statement_timeout этого EXPLAIN (сек)
+    SLOW_QUERY_THRESHOLD_MS: float = 100
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float = 0.1
+    SLOW_QUERY_EXPLAIN_TIMEOUT_SECONDS: float = 5
+
+    # Контроль допуска: одновременные запросы на чтение, запись и auth (bcrypt), длина очереди
+    # ожидания и время ожидания в ней (сек), Retry-After для отклоненных (сек) и ожидание соединения из пула (сек)
+    ADMISSION_READ_LIMIT: int = 20
+    ADMISSION_WRITE_LIMIT: int = 10
+    ADMISSION_AUTH_LIMIT: int = 4
+    ADMISSION_QUEUE_SIZE: int = 100
+    ADMISSION_QUEUE_TIMEOUT: float = 2
+    ADMISSION_RETRY_AFTER: int = 1
+    DB_POOL_TIMEOUT: float = 5
+
+    # Пул соединений только для чтения (без транзакций) и statement_timeout его соединений (сек)
+    READONLY_POOL_SIZE: int = 10
+    READONLY_POOL_MAX_OVERFLOW: int = 10
+    READONLY_STATEMENT_TIMEOUT_SECONDS: float = 10
+
+    # Бюджет времени запроса по умолчанию (сек): переносится в statement_timeout/lock_timeout транзакции
+    REQUEST_TIMEOUT_SECONDS: float = 30
+    # Максимальное ожидание блокировки (сек): дольше - 503 с Retry-After, не дожидаясь конца бюджета
+    DB_LOCK_TIMEOUT_SECONDS: float = 5
+    # Бюджеты маршрутов: списки и ленты с фильтрами, массовые операции
+    LIST_REQUEST_TIMEOUT_SECONDS: float = 10
+    BULK_REQUEST_TIMEOUT_SECONDS: float = 300
+
+    # Журнал доступа и аудита: размер очереди в памяти, размер пачки, период сброса (сек),
+    # политика переполнения (drop_new или drop_oldest), файл строк JSON ('-' - stdout, '' - не писать)
+    # и запись аудита в БД
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_BATCH_SIZE: int = 500
+    LOG_FLUSH_INTERVAL: float = 1
+    LOG_OVERFLOW_POLICY: str = 'drop_new'
+    LOG_FILE_PATH: str = '-'
+    AUDIT_DB_ENABLED: bool = True
+
+    # Массовое обновление и удаление: строк на один запрос и максимум строк в запросе
+    BULK_CHUNK_SIZE: int = 1000
+    BULK_MAX_ITEMS: int = 100000
+
+    # Пакетные запросы: максимум операций в пакете и одновременных независимых чтений
+    BATCH_MAX_OPERATIONS: int = 100
+    BATCH_READ_CONCURRENCY: int = 4
+
+    # Кэш чтений DAO: бэкенд (memory, redis или пусто - выключен), размер LRU в памяти, время жизни записей (сек)
+    CACHE_BACKEND: str = 'memory'
+    CACHE_MAX_ENTRIES: int = 10000
+    CACHE_TTL_SECONDS: float = 30
+
+    REDIS_HOST: str | None = None
+    REDIS_PORT: int = 6379
     # SENTRY_DSN: str | None
 
     model_config = SettingsConfigDict(
@@ -0,0 +1,40 @@
+import os
+
+import asyncpg
+import pytest
+
+# Настройки без .env: локальный Postgres по умолчанию, переопределяются переменными окружения
+for name, value in {
+    'SECRET_KEY': 'test-secret',
+    'ALGORITHM': 'HS256',
+    'DB_HOST': '127.0.0.1',
+    'DB_PORT': '5432',
+    'DB_USER': 'postgres',
+    'DB_PASS': 'postgres',
+    'DB_NAME': 'postgres',
+}.items():
+    os.environ.setdefault(name, value)
+
+
+@pytest.fixture
+def anyio_backend():
+    return 'asyncio'
+
+
+@pytest.fixture
+async def db():
+    """Пропускает тест без доступного Postgres; после теста закрывает пулы (у каждого теста свой event loop)."""
+    from src.dao.database import async_engine, readonly_engine
+    from src.settings import settings
+
+    try:
+        connection = await asyncpg.connect(
+            host=settings.DB_HOST, port=settings.DB_PORT, user=settings.DB_USER,
+            password=settings.DB_PASS, database=settings.DB_NAME, timeout=2,
+        )
+    except (OSError, asyncpg.PostgresError) as e:
+        pytest.skip(f"Postgres недоступен: {e}")
+    await connection.close()
+    yield
+    await async_engine.dispose()
+    await readonly_engine.dispose()
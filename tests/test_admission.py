@@ -0,0 +1,103 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.core.admission import AdmissionControlMiddleware, AdmissionLimiter
+
+pytestmark = pytest.mark.anyio
+
+
+def make_app(limit: int = 1, max_queue: int = 1, timeout: float = 5) -> tuple[FastAPI, dict, asyncio.Event]:
+    """Приложение, маршруты которого ждут gate; limiters - ограничители по классам."""
+    gate = asyncio.Event()
+    limiters = {
+        name: AdmissionLimiter(f'test.{name}', limit=limit, max_queue=max_queue, timeout=timeout)
+        for name in ('read', 'write', 'auth')
+    }
+    app = FastAPI()
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        limiters=limiters,
+        auth_paths={'/auth/login'},
+        exempt_prefixes=('/events',),
+        retry_after=3,
+    )
+
+    @app.get('/items')
+    @app.post('/items')
+    @app.post('/auth/login')
+    @app.get('/events')
+    async def wait_gate() -> dict:
+        await gate.wait()
+        return {}
+
+    return app, limiters, gate
+
+
+async def wait_for(condition) -> None:
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0.001)
+
+    await asyncio.wait_for(poll(), timeout=2)
+
+
+async def test_full_queue_is_rejected_with_retry_after_per_class():
+    app, limiters, gate = make_app()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+        active = asyncio.ensure_future(client.get('/items'))
+        await wait_for(lambda: limiters['read'].active == 1)
+        queued = asyncio.ensure_future(client.get('/items'))
+        await wait_for(lambda: limiters['read'].waiting == 1)
+
+        rejected = await client.get('/items')
+        assert rejected.status_code == 503
+        assert rejected.headers['Retry-After'] == '3'
+
+        # Другие классы и исключенные пути ограничиваются отдельно
+        other = [
+            asyncio.ensure_future(client.post('/items')),
+            asyncio.ensure_future(client.post('/auth/login')),
+            asyncio.ensure_future(client.get('/events')),
+        ]
+        await wait_for(lambda: limiters['write'].active == 1 and limiters['auth'].active == 1)
+        gate.set()
+        responses = await asyncio.gather(active, queued, *other)
+
+    assert [response.status_code for response in responses] == [200] * 5
+    for limiter in limiters.values():
+        assert (limiter.active, limiter.waiting, limiter._semaphore.locked()) == (0, 0, False)
+
+
+async def test_queue_timeout_does_not_leak_permit():
+    app, limiters, gate = make_app(max_queue=5, timeout=0.05)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+        active = asyncio.ensure_future(client.get('/items'))
+        await wait_for(lambda: limiters['read'].active == 1)
+        timed_out = await asyncio.gather(*(client.get('/items') for _ in range(3)))
+        assert [response.status_code for response in timed_out] == [503] * 3
+        gate.set()
+        assert (await active).status_code == 200
+        assert (await client.get('/items')).status_code == 200
+
+    limiter = limiters['read']
+    assert (limiter.active, limiter.waiting, limiter._semaphore._value) == (0, 0, 1)
+
+
+async def test_permit_handed_to_cancelled_waiter_is_returned():
+    limiter = AdmissionLimiter('test.handoff', limit=1, max_queue=1, timeout=5)
+    await limiter.acquire()
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await wait_for(lambda: limiter.waiting == 1)
+
+    # Место передается ожидающему, и в ту же итерацию запрос отменяется (клиент отключился)
+    limiter.release()
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert (limiter.active, limiter.waiting, limiter._semaphore.locked()) == (0, 0, False)
+    await asyncio.wait_for(limiter.acquire(), timeout=1)
+    assert limiter.active == 1
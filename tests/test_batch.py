@@ -0,0 +1,174 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI, HTTPException, Request
+from sqlalchemy import text
+
+from src.batch.dispatch import dispatch
+from src.batch.schemas import BatchOperationResultSchema, BatchRequestSchema
+from src.core.deadlines import request_deadline, request_timeout
+from src.core.log_pipeline import log_pipeline
+from src.dao.database import session_factory
+from src.main import app as main_app
+from src.products.dao import ProductsDAO
+
+pytestmark = pytest.mark.anyio
+
+app = FastAPI()
+
+
+@app.get('/products/slow', dependencies=[Depends(request_deadline(300))])
+async def slow() -> float:
+    return request_timeout.get()
+
+
+@app.get('/products/plain')
+async def plain() -> float:
+    return request_timeout.get()
+
+
+@app.post('/batch')
+async def batch(request: Request, batch: BatchRequestSchema) -> list[BatchOperationResultSchema]:
+    # Последовательно в контексте пакетного запроса, как операции с записью в run_operations
+    return [await dispatch(request, index, operation) for index, operation in enumerate(batch.operations)]
+
+
+async def run_batch(*operations: tuple[str, str]) -> list[dict]:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+        response = await client.post('/batch', json={
+            'operations': [{'method': method, 'path': path} for method, path in operations],
+        })
+    assert response.status_code == 200
+    return response.json()
+
+
+async def test_unknown_route_and_method_map_to_status():
+    results = await run_batch(('GET', '/products/missing/route'), ('DELETE', '/products/plain'))
+    assert [(result['status'], result['body']) for result in results] == [
+        (404, {'detail': 'Not Found'}),
+        (405, {'detail': 'Method Not Allowed'}),
+    ]
+
+
+async def test_operation_deadline_does_not_leak_to_next_operation():
+    default = request_timeout.get()
+    results = await run_batch(('GET', '/products/slow'), ('GET', '/products/plain'))
+    assert [result['body'] for result in results] == [300, default]
+
+
+def product(title: str) -> dict:
+    return {'method': 'POST', 'path': '/products', 'body': {
+        'title': title, 'article': 'BATCH-TEST', 'price': 1, 'description': 'd',
+    }}
+
+
+async def post_batch(mode: str, operations: list[dict]) -> dict:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main_app), base_url='http://test') as client:
+        response = await client.post('/batch', json={'mode': mode, 'operations': operations})
+    assert response.status_code == 200
+    return response.json()
+
+
+async def stored_titles() -> list[str]:
+    async with session_factory() as session:
+        result = await session.execute(text("SELECT title FROM products WHERE article = 'BATCH-TEST' ORDER BY id"))
+        return list(result.scalars().all())
+
+
+@pytest.fixture
+async def cleanup(db):
+    yield
+    async with session_factory() as session:
+        await session.execute(text("DELETE FROM products WHERE article = 'BATCH-TEST'"))
+        await session.commit()
+
+
+@pytest.fixture
+def audit_records(monkeypatch) -> list[dict]:
+    records = []
+
+    def emit(kind: str, **fields) -> None:
+        if kind == 'audit':
+            records.append(fields)
+
+    monkeypatch.setattr(log_pipeline, 'emit', emit)
+    return records
+
+
+async def test_atomic_batch_rolls_back_and_skips_rest(cleanup, audit_records):
+    response = await post_batch('atomic', [
+        product('first'),
+        {'method': 'PATCH', 'path': '/products/2147483647', 'body': {'price': 2}},
+        product('never'),
+    ])
+
+    assert response['committed'] is False
+    assert [result['status'] for result in response['results']] == [200, 404, 424]
+    assert await stored_titles() == []
+    assert audit_records == []
+
+
+async def test_best_effort_rolls_back_only_failing_savepoint(cleanup, audit_records, monkeypatch):
+    add = ProductsDAO.add
+
+    async def add_then_fail(self, **kwargs):
+        instance = await add(self, **kwargs)
+        if kwargs['title'] == 'failing':
+            # Ошибка после записи: откатываются и строка, и ее запись аудита
+            raise HTTPException(status_code=409, detail='conflict')
+        return instance
+
+    monkeypatch.setattr(ProductsDAO, 'add', add_then_fail)
+    response = await post_batch('best_effort', [product('first'), product('failing'), product('last')])
+
+    assert response['committed'] is True
+    assert [result['status'] for result in response['results']] == [200, 409, 200]
+    assert await stored_titles() == ['first', 'last']
+    created_ids = [response['results'][index]['body']['id'] for index in (0, 2)]
+    assert [(record['action'], record['ids']) for record in audit_records] == [
+        ('create', [created_ids[0]]), ('create', [created_ids[1]]),
+    ]
+
+
+async def test_leading_reads_run_concurrently(cleanup, monkeypatch):
+    async with session_factory() as session:
+        ids = [(await ProductsDAO(session).add(
+            title=f'read {number}', article='BATCH-TEST', price=number, description='d',
+        )).id for number in range(3)]
+        await session.commit()
+
+    running = 0
+    max_running = 0
+    get_one_by_id = ProductsDAO.get_one_by_id
+
+    async def slow_get_one_by_id(self, id: int):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        return await get_one_by_id(self, id=id)
+
+    monkeypatch.setattr(ProductsDAO, 'get_one_by_id', slow_get_one_by_id)
+    response = await post_batch('atomic', [
+        *({'method': 'GET', 'path': f'/products/{id}'} for id in ids),
+        product('after reads'),
+        {'method': 'GET', 'path': f'/products/{ids[0]}'},
+    ])
+
+    assert response['committed'] is True
+    assert [result['body']['id'] for result in response['results'][:3]] == ids
+    assert [result['status'] for result in response['results']] == [200] * 5
+    assert max_running == 3
+
+
+async def test_unknown_route_and_method_in_real_app(db):
+    response = await post_batch('best_effort', [
+        {'method': 'GET', 'path': '/products/1/missing'},
+        {'method': 'DELETE', 'path': '/products'},
+    ])
+    assert [(result['status'], result['body']) for result in response['results']] == [
+        (404, {'detail': 'Not Found'}),
+        (405, {'detail': 'Method Not Allowed'}),
+    ]
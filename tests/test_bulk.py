@@ -0,0 +1,33 @@
+import pytest
+
+from src.dao.database import session_factory
+from src.dao.exceptions import BulkLimitExceededException
+from src.products.dao import ProductsDAO
+from src.products.filters import ProductFilter
+from src.products.schemas import ProductBulkUpdateItemSchema
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_bulk_delete_by_filters_over_limit_deletes_nothing(db):
+    async with session_factory() as session:
+        dao = ProductsDAO(session)
+        for number in range(3):
+            await dao.add(title='bulk', article='BULK-LIMIT', price=number, description='d')
+
+        with pytest.raises(type(BulkLimitExceededException)) as error:
+            await dao.bulk_delete(filters=ProductFilter(article='BULK-LIMIT'), max_items=2)
+        assert error.value is BulkLimitExceededException
+        assert await dao.count(filters=ProductFilter(article='BULK-LIMIT')) == 3
+
+        assert await dao.bulk_delete(filters=ProductFilter(article='BULK-LIMIT'), max_items=3) == [3]
+        await session.rollback()
+
+
+async def test_bulk_update_rejects_duplicate_ids(db):
+    async with session_factory() as session:
+        with pytest.raises(ValueError):
+            await ProductsDAO(session).bulk_update([
+                ProductBulkUpdateItemSchema(id=1, price=1),
+                ProductBulkUpdateItemSchema(id=1, title='other'),
+            ])
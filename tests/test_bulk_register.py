@@ -0,0 +1,109 @@
+import httpx
+import pytest
+from sqlalchemy import event, select, text
+
+from src.auth.dao import UsersDAO
+from src.auth.models import User
+from src.auth.router import users as users_router
+from src.auth.security import create_tokens
+from src.dao.database import async_engine, session_factory
+from src.main import app
+
+pytestmark = pytest.mark.anyio
+
+
+def make_user(number: int, **overrides) -> dict:
+    return {
+        'email': f'bulkreg{number}@example.com',
+        'phone_number': f'+7900000{number:04d}',
+        'first_name': 'bulk',
+        'last_name': 'register',
+        'password': f'password{number}',
+        'confirm_password': f'password{number}',
+        **overrides,
+    }
+
+
+@pytest.fixture
+async def admin_id(db):
+    async with session_factory() as session:
+        user_id = (await session.execute(text(
+            "INSERT INTO users (phone_number, first_name, last_name, email, password, role_id) "
+            "VALUES ('+79000009999', 'a', 'a', 'bulkreg-admin@example.com', 'x', 2) RETURNING id"
+        ))).scalar_one()
+        await session.commit()
+    yield user_id
+    async with session_factory() as session:
+        await session.execute(text("DELETE FROM users WHERE email LIKE 'bulkreg%'"))
+        await session.commit()
+
+
+async def post(users: list[dict], role: str, user_id: int) -> httpx.Response:
+    token = create_tokens({'sub': str(user_id), 'role': role, 'ver': 1})['access_token']
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+        return await client.post('/users/bulk-register', json=users, headers={'access_token': token})
+
+
+async def test_bulk_register_is_admin_only(admin_id):
+    assert (await post([make_user(1)], role='user', user_id=admin_id)).status_code == 403
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+        assert (await client.post('/users/bulk-register', json=[make_user(1)])).status_code == 400
+    async with session_factory() as session:
+        assert await session.scalar(select(User.id).where(User.email == 'bulkreg1@example.com')) is None
+
+
+async def test_duplicates_are_rejected_before_hashing(admin_id, monkeypatch):
+    hashed = []
+
+    async def fake_hash_passwords(passwords: list[str]) -> list[str]:
+        hashed.extend(passwords)
+        return [f'hash-{password}' for password in passwords]
+
+    monkeypatch.setattr(users_router, 'hash_passwords', fake_hash_passwords)
+    response = await post([
+        make_user(1),
+        make_user(2, email='bulkreg-admin@example.com'),  # email уже занят
+        make_user(3, phone_number='+79000000001'),  # телефон занят первым элементом пачки
+        make_user(4, confirm_password='other'),
+        make_user(5),
+    ], role='admin', user_id=admin_id)
+
+    assert response.status_code == 200
+    result = response.json()
+    assert (result['accepted'], result['rejected']) == (2, 3)
+    assert [item['status'] for item in result['items']] == ['accepted', 'rejected', 'rejected', 'rejected', 'accepted']
+    assert hashed == ['password1', 'password5']
+    async with session_factory() as session:
+        stored = await session.scalar(select(User.password).where(User.email == 'bulkreg5@example.com'))
+    assert stored == 'hash-password5'
+
+
+async def test_bulk_create_inserts_by_chunks(db):
+    inserts = []
+
+    def count_inserts(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('INSERT INTO users'):
+            inserts.append(statement)
+
+    event.listen(async_engine.sync_engine, 'before_cursor_execute', count_inserts)
+    try:
+        async with session_factory() as session:
+            await session.execute(text(
+                "INSERT INTO users (phone_number, first_name, last_name, email, password) "
+                "VALUES ('+79000000003', 'a', 'a', 'bulkreg3@example.com', 'x')"
+            ))
+            inserts.clear()
+            created = await UsersDAO(session).bulk_create(
+                [
+                    {key: value for key, value in make_user(number).items() if key != 'confirm_password'}
+                    for number in range(1, 6)
+                ],
+                chunk_size=2,
+            )
+            await session.rollback()
+    finally:
+        event.remove(async_engine.sync_engine, 'before_cursor_execute', count_inserts)
+
+    assert len(inserts) == 3
+    # Конфликтующая строка пропущена, остальные вставлены
+    assert set(created) == {f'bulkreg{number}@example.com' for number in (1, 2, 4, 5)}
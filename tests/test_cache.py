@@ -0,0 +1,177 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from src.dao.cache import (
+    MISSING,
+    Cache,
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    cache,
+    decode_result,
+    encode_result,
+)
+from src.dao.database import session_factory
+from src.products.dao import ProductsDAO
+from src.products.models import Product
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeRedis:
+    """Сервер с подмножеством команд Redis (GET, SET PX, INCR) по протоколу RESP2."""
+
+    def __init__(self):
+        self.data: dict[bytes, bytes] = {}
+        self.commands: list[list[bytes]] = []
+        self.server = None
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                count = int((await reader.readuntil(b'\r\n'))[1:-2])
+                args = []
+                for _ in range(count):
+                    length = int((await reader.readuntil(b'\r\n'))[1:-2])
+                    args.append((await reader.readexactly(length + 2))[:-2])
+                self.commands.append(args)
+                writer.write(self._reply(args))
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            writer.close()
+
+    def _reply(self, args: list[bytes]) -> bytes:
+        command = args[0].upper()
+        if command == b'GET':
+            value = self.data.get(args[1])
+            return b'$-1\r\n' if value is None else b'$%d\r\n%s\r\n' % (len(value), value)
+        if command == b'SET':
+            self.data[args[1]] = args[2]
+            return b'+OK\r\n'
+        if command == b'INCR':
+            value = int(self.data.get(args[1], b'0')) + 1
+            self.data[args[1]] = str(value).encode()
+            return b':%d\r\n' % value
+        return b'-ERR unknown command\r\n'
+
+
+@pytest.fixture
+async def redis_backend():
+    server = FakeRedis()
+    port = await server.start()
+    backend = RedisCacheBackend(host='127.0.0.1', port=port)
+    backend.server = server
+    yield backend
+    for connection in backend._idle:
+        connection.close()
+    await server.stop()
+
+
+async def test_memory_backend_evicts_least_recently_used_and_expired():
+    backend = MemoryCacheBackend(max_entries=2)
+    await backend.set('a', 1, ttl=60)
+    await backend.set('b', 2, ttl=60)
+    assert await backend.get('a') == 1
+    await backend.set('c', 3, ttl=60)
+
+    assert await backend.get('b') is MISSING
+    assert await backend.get('a') == 1
+
+    await backend.set('short', 4, ttl=0.01)
+    await asyncio.sleep(0.02)
+    assert await backend.get('short') is MISSING
+
+
+async def test_invalidated_tag_is_loaded_again():
+    test_cache = Cache(MemoryCacheBackend(max_entries=10))
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return len(loads)
+
+    assert await test_cache.get_or_load('products', 'count', (), {}, 60, load) == (1, False)
+    assert await test_cache.get_or_load('products', 'count', (), {}, 60, load) == (['value', None, 1], True)
+    await test_cache.invalidate('products')
+    assert await test_cache.get_or_load('products', 'count', (), {}, 60, load) == (2, False)
+
+
+async def test_concurrent_misses_load_once():
+    test_cache = Cache(MemoryCacheBackend(max_entries=10))
+    loads = []
+
+    async def load():
+        loads.append(1)
+        await asyncio.sleep(0.05)
+        return 42
+
+    results = await asyncio.gather(*(
+        test_cache.get_or_load('products', 'count', (), {}, 60, load) for _ in range(10)
+    ))
+    assert len(loads) == 1
+    assert sorted(from_cache for _, from_cache in results) == [False] + [True] * 9
+    assert {decode_result(value) if from_cache else value for value, from_cache in results} == {42}
+
+
+async def test_redis_backend_stores_models_as_json(redis_backend):
+    product = Product(
+        id=1, title='t', article='A-1', price=9.5, description='d',
+        created_at=datetime(2026, 1, 2, 3, 4, 5), updated_at=datetime(2026, 1, 2, 3, 4, 6), version=3,
+    )
+    await redis_backend.set('products:0:get_one_by_id:x', encode_result(product), ttl=60)
+
+    stored = redis_backend.server.data[b'cache:products:0:get_one_by_id:x']
+    assert stored.startswith(b'["one","Product",')
+    assert redis_backend.server.commands[-1][3:] == [b'PX', b'60000']
+
+    restored = decode_result(await redis_backend.get('products:0:get_one_by_id:x'))
+    assert isinstance(restored, Product)
+    assert restored.to_dict() == product.to_dict()
+    assert restored.updated_at == product.updated_at
+    assert await redis_backend.get('missing') is MISSING
+
+    assert await redis_backend.get_generation('products') == 0
+    await redis_backend.bump_generation('products')
+    assert await redis_backend.get_generation('products') == 1
+
+
+async def test_commit_waits_for_shared_cache_invalidation(db, redis_backend, monkeypatch):
+    monkeypatch.setattr(cache, 'backend', redis_backend)
+    async with session_factory() as session:
+        product = await ProductsDAO(session).add(title='cache', article='CACHE-1', price=1, description='d')
+        await session.commit()
+        # Поколение поднято к моменту возврата из commit, а не в фоновой задаче
+        assert await redis_backend.get_generation('products') == 1
+        await ProductsDAO(session).delete(product.id)
+        await session.commit()
+    assert await redis_backend.get_generation('products') == 2
+
+
+async def test_savepoints_do_not_invalidate_before_outer_commit(db, monkeypatch):
+    backend = MemoryCacheBackend(max_entries=100)
+    monkeypatch.setattr(cache, 'backend', backend)
+    async with session_factory() as session:
+        dao = ProductsDAO(session)
+        savepoint = await session.begin_nested()
+        product = await dao.add(title='cache', article='CACHE-SAVEPOINT', price=1, description='d')
+        await savepoint.commit()
+        # Изменения еще не видны другим сессиям: поколение поднимать рано
+        assert await backend.get_generation('products') == 0
+
+        savepoint = await session.begin_nested()
+        await dao.add(title='cache', article='CACHE-SAVEPOINT', price=2, description='d')
+        await savepoint.rollback()
+        await session.commit()
+        assert await backend.get_generation('products') == 1
+
+        await dao.delete(product.id)
+        await session.commit()
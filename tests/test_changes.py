@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+import asyncpg
+import pytest
+from sqlalchemy import text
+
+from src.dao.database import session_factory
+from src.products.dao import ProductsDAO
+from src.settings import settings
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_changes_stop_before_oldest_open_transaction(db, monkeypatch):
+    monkeypatch.setattr(settings, 'CHANGES_SAFETY_LAG_SECONDS', 0)
+    open_transaction = await asyncpg.connect(
+        host=settings.DB_HOST, port=settings.DB_PORT, user=settings.DB_USER,
+        password=settings.DB_PASS, database=settings.DB_NAME,
+    )
+    transaction = open_transaction.transaction()
+    await transaction.start()
+    try:
+        await open_transaction.execute(
+            "INSERT INTO products (title, article, price, description) VALUES ('open', 'CHG-OPEN', 1, 'd')"
+        )
+        xact_start = await open_transaction.fetchval("SELECT now()::timestamp")
+        # Строка другой транзакции с той же отметкой времени уже закоммичена
+        async with session_factory() as session:
+            committed_id = (await session.execute(text(
+                "INSERT INTO products (title, article, price, description, updated_at) "
+                "VALUES ('same', 'CHG-SAME', 1, 'd', :ts) RETURNING id"
+            ), {'ts': xact_start})).scalar_one()
+            await session.commit()
+
+        async with session_factory() as session:
+            changes = await ProductsDAO(session).find_changes(since=(xact_start - timedelta(hours=1), 0), limit=5000)
+        # Иначе курсор встал бы на xact_start и пропустил строку открытой транзакции
+        assert committed_id not in [item.id for item in changes['items']]
+        assert changes['position'] is None or changes['position'][0] < xact_start
+    finally:
+        await transaction.rollback()
+        await open_transaction.close()
+        async with session_factory() as session:
+            await session.execute(text("DELETE FROM products WHERE article = 'CHG-SAME'"))
+            await session.commit()
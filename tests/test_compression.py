@@ -0,0 +1,111 @@
+import gzip
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+
+from src.core.compression import COMPRESSORS, CompressionMiddleware, negotiate_encoding
+
+pytestmark = pytest.mark.anyio
+
+BIG_JSON = b'[' + b','.join(b'{"id": %d, "title": "product"}' % i for i in range(200)) + b']'
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+
+@app.get('/big')
+async def big() -> Response:
+    return Response(BIG_JSON, media_type='application/json')
+
+
+@app.get('/small')
+async def small() -> Response:
+    return Response(b'{"id": 1}', media_type='application/json')
+
+
+@app.get('/encoded')
+async def encoded() -> Response:
+    return Response(gzip.compress(BIG_JSON), media_type='application/json', headers={'Content-Encoding': 'gzip'})
+
+
+@app.get('/events')
+async def events() -> StreamingResponse:
+    async def stream():
+        yield b'data: 1\n\n' * 200
+
+    return StreamingResponse(stream(), media_type='text/event-stream')
+
+
+@app.get('/stream')
+async def stream() -> StreamingResponse:
+    async def chunks():
+        for _ in range(3):
+            yield BIG_JSON
+
+    return StreamingResponse(chunks(), media_type='application/json')
+
+
+async def get(path: str, accept_encoding: str) -> httpx.Response:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+        # Тело читаем как есть, без распаковки на стороне httpx
+        async with client.stream('GET', path, headers={'Accept-Encoding': accept_encoding}) as response:
+            response.raw_content = b''.join([chunk async for chunk in response.aiter_raw()])
+            return response
+
+
+@pytest.mark.parametrize('accept_encoding, expected', [
+    ('gzip', 'gzip'),
+    ('gzip;q=0', None),
+    ('identity', None),
+    ('*;q=0', None),
+    ('', None),
+    ('gzip;q=1, *;q=0.1', 'gzip'),
+])
+def test_negotiate_encoding(accept_encoding, expected):
+    assert negotiate_encoding(accept_encoding) == expected
+
+
+def test_negotiate_prefers_client_weight_then_server_order():
+    pytest.importorskip('brotli')
+    pytest.importorskip('zstandard')
+    assert list(COMPRESSORS) == ['zstd', 'br', 'gzip']
+    assert negotiate_encoding('gzip, br, zstd') == 'zstd'
+    assert negotiate_encoding('gzip;q=0.9, br;q=0.5, zstd;q=0.1') == 'gzip'
+    assert negotiate_encoding('br, gzip;q=0.5') == 'br'
+
+
+async def test_large_response_is_gzipped():
+    response = await get('/big', 'gzip')
+    assert response.headers['content-encoding'] == 'gzip'
+    assert response.headers['vary'] == 'Accept-Encoding'
+    assert int(response.headers['content-length']) == len(response.raw_content)
+    assert gzip.decompress(response.raw_content) == BIG_JSON
+
+
+@pytest.mark.parametrize('encoding, module', [('br', 'brotli'), ('zstd', 'zstandard')])
+async def test_large_response_with_optional_encodings(encoding, module):
+    library = pytest.importorskip(module)
+    response = await get('/big', encoding)
+    assert response.headers['content-encoding'] == encoding
+    if module == 'zstandard':
+        assert library.ZstdDecompressor().decompressobj().decompress(response.raw_content) == BIG_JSON
+    else:
+        assert library.decompress(response.raw_content) == BIG_JSON
+
+
+@pytest.mark.parametrize('path', ['/small', '/encoded', '/events'])
+async def test_small_encoded_and_sse_responses_pass_through(path):
+    response = await get(path, 'gzip')
+    expected_encoding = 'gzip' if path == '/encoded' else None
+    assert response.headers.get('content-encoding') == expected_encoding
+    if path == '/encoded':
+        assert gzip.decompress(response.raw_content) == BIG_JSON
+
+
+async def test_streaming_response_is_compressed_by_chunks():
+    response = await get('/stream', 'gzip')
+    assert response.headers['content-encoding'] == 'gzip'
+    assert 'content-length' not in response.headers
+    assert gzip.decompress(response.raw_content) == BIG_JSON * 3
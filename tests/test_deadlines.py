@@ -0,0 +1,61 @@
+import time
+
+import pytest
+from sqlalchemy import text
+
+from src.core.deadlines import request_started, request_timeout
+from src.dao.database import async_engine, get_session_readonly, get_session_with_commit
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_transaction_timeouts_follow_remaining_budget(db):
+    started = request_started.set(time.monotonic() - 8)
+    timeout = request_timeout.set(10)
+    try:
+        sessions = get_session_with_commit()
+        session = await anext(sessions)
+        # Пока сессия не выполнила запрос, соединение из пула не занято
+        assert async_engine.pool.checkedout() == 0
+
+        statement_timeout = (await session.execute(text(
+            "SELECT extract(epoch FROM current_setting('statement_timeout')::interval)"
+        ))).scalar_one()
+        connection = await session.connection()
+        raw_connection = await connection.get_raw_connection()
+        command_timeout = raw_connection.driver_connection._config.command_timeout
+        await sessions.aclose()
+    finally:
+        request_started.reset(started)
+        request_timeout.reset(timeout)
+
+    assert 1 < statement_timeout <= 2
+    assert 2 < command_timeout <= 3
+
+
+async def test_asyncpg_connection_has_command_timeout_config(db):
+    # _set_command_timeout опирается на приватный атрибут asyncpg: при обновлении asyncpg тест
+    # покажет, что клиентский таймаут перестал работать
+    async with async_engine.connect() as connection:
+        raw_connection = await connection.get_raw_connection()
+        config = getattr(raw_connection.driver_connection, '_config', None)
+    assert hasattr(config, 'command_timeout')
+    assert hasattr(config, '_replace')
+
+
+async def test_readonly_query_is_canceled_at_remaining_budget(db):
+    started = request_started.set(time.monotonic())
+    timeout = request_timeout.set(0.3)
+    try:
+        sessions = get_session_readonly()
+        session = await anext(sessions)
+        began = time.monotonic()
+        with pytest.raises(TimeoutError):
+            await session.execute(text("SELECT pg_sleep(5)"))
+        elapsed = time.monotonic() - began
+        await sessions.aclose()
+    finally:
+        request_started.reset(started)
+        request_timeout.reset(timeout)
+
+    assert elapsed < 1
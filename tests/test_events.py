@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from src.core.events import RESET, EventBroker
+
+pytestmark = pytest.mark.anyio
+
+
+def drain(subscription) -> list:
+    items = []
+    while not subscription.queue.empty():
+        items.append(subscription.queue.get_nowait())
+    return items
+
+
+async def test_publish_fans_out_to_every_subscriber():
+    broker = EventBroker(queue_size=10, history_size=10)
+    first, second = broker.subscribe(), broker.subscribe()
+
+    broker.publish('1', {'id': 1})
+    broker.publish('2', {'id': 2})
+
+    assert drain(first) == drain(second) == [('1', {'id': 1}), ('2', {'id': 2})]
+
+
+async def test_full_queue_resets_only_slow_subscriber():
+    broker = EventBroker(queue_size=2, history_size=10)
+    slow, fast = broker.subscribe(), broker.subscribe()
+
+    broker.publish('1', {})
+    broker.publish('2', {})
+    drain(fast)
+    broker.publish('3', {})
+
+    assert drain(slow) == [RESET]
+    assert drain(fast) == [('3', {})]
+    assert broker.subscribers_count == 1
+
+
+async def test_resume_replays_events_after_last_event_id():
+    broker = EventBroker(queue_size=10, history_size=10)
+    for event_id in ('1', '2', '3'):
+        broker.publish(event_id, {'id': event_id})
+
+    subscription = broker.subscribe(last_event_id='1')
+
+    assert drain(subscription) == [('2', {'id': '2'}), ('3', {'id': '3'})]
+    broker.publish('4', {'id': '4'})
+    assert drain(subscription) == [('4', {'id': '4'})]
+
+
+@pytest.mark.parametrize('history_size, queue_size', [(1, 10), (10, 2)])
+async def test_resume_resets_when_history_is_insufficient(history_size, queue_size):
+    broker = EventBroker(queue_size=queue_size, history_size=history_size)
+    for event_id in ('1', '2', '3', '4'):
+        broker.publish(event_id, {})
+
+    subscription = broker.subscribe(last_event_id='1')
+
+    assert drain(subscription) == [RESET]
+    assert broker.subscribers_count == 0
+
+
+async def test_stream_ends_with_reset_event_carrying_last_id():
+    broker = EventBroker(queue_size=1, history_size=10)
+    stream = broker.stream('product', last_event_id=None, heartbeat=1)
+    first = asyncio.ensure_future(stream.__anext__())
+    await asyncio.sleep(0)
+
+    broker.publish('1', {'id': 1})
+    assert await first == b'id: 1\nevent: product\ndata: {"id":1}\n\n'
+    broker.publish('2', {'id': 2})
+    broker.publish('3', {'id': 3})
+
+    assert await stream.__anext__() == b'event: reset\ndata: {"last_event_id":"1"}\n\n'
+    with pytest.raises(StopAsyncIteration):
+        await stream.__anext__()
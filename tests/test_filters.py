@@ -0,0 +1,73 @@
+from datetime import datetime
+from typing import Optional
+
+import httpx
+import pytest
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from src.dao.base_dao import check_filter_schema, sorting_pattern
+from src.dao.exceptions import InvalidSortingException
+from src.main import app
+from src.products.dao import ProductsDAO
+from src.products.filters import ProductFilter
+from src.products.models import Product
+
+pytestmark = pytest.mark.anyio
+
+
+def compile_where(filters: BaseModel) -> str:
+    conditions = ProductsDAO(session=None)._compile_filters(filters)
+    query = select(Product.id).where(*conditions)
+    return str(query.compile(dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True})).split('WHERE ')[1]
+
+
+def test_filters_compile_to_lookups():
+    class Filter(BaseModel):
+        article: Optional[str] = None
+        price__gte: Optional[float] = None
+        price__lt: Optional[float] = None
+        id__in: Optional[list[int]] = None
+        title__icontains: Optional[str] = None
+
+    where = compile_where(Filter(article='A-1', price__gte=10, id__in=[1, 2], title__icontains='box'))
+    assert where == (
+        "products.article = 'A-1' AND products.price >= 10.0 AND products.id IN (1, 2) "
+        "AND products.title ILIKE '%%box%%'"
+    )
+
+
+def test_aware_datetime_filter_becomes_naive_utc():
+    filters = ProductFilter(created_at__gte='2024-01-01T03:00:00+03:00', updated_at__lte='2024-01-01T00:00:00Z')
+    assert filters.created_at__gte == datetime(2024, 1, 1)
+    assert filters.updated_at__lte == datetime(2024, 1, 1)
+    assert ProductFilter(created_at__gte='2024-01-01T00:00:00').created_at__gte == datetime(2024, 1, 1)
+
+
+@pytest.mark.parametrize('field', ['missing', 'price__between'])
+def test_check_filter_schema_rejects_unknown_fields(field):
+    schema = type('Filter', (BaseModel,), {'__annotations__': {field: Optional[int]}, field: None})
+    with pytest.raises(ValueError, match=field):
+        check_filter_schema(Product, schema)
+
+
+def test_sorting_pattern_and_apply_sorting():
+    pattern = sorting_pattern(('id', 'price'))
+    assert pattern == r'^(id|price)(:(asc|desc))?$'
+
+    dao = ProductsDAO(session=None)
+    assert 'ORDER BY products.price DESC' in str(dao._apply_sorting(select(Product), 'price:desc'))
+    with pytest.raises(type(InvalidSortingException)):
+        dao._apply_sorting(select(Product), 'price:sideways')
+    with pytest.raises(type(InvalidSortingException)):
+        dao._apply_sorting(select(Product), 'password')
+
+
+async def test_invalid_query_parameters_return_422(db):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+        assert (await client.get('/products', params={'sorting': 'price:sideways'})).status_code == 422
+        assert (await client.get('/products', params={'price__gte': 'abc'})).status_code == 422
+        response = await client.get('/products', params={'created_at__gte': '2999-01-01T00:00:00Z'})
+    assert response.status_code == 200
+    assert response.json() == []
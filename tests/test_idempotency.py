@@ -0,0 +1,96 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
+
+from src.auth.security import create_tokens
+from src.core.idempotency import IdempotencyMiddleware, IdempotencyStore
+
+pytestmark = pytest.mark.anyio
+
+
+def make_app(statuses: list[int] | None = None, delay: float = 0) -> tuple[FastAPI, list[dict]]:
+    """Приложение с одним идемпотентным маршрутом; calls - тела выполненных запросов."""
+    calls = []
+    app = FastAPI()
+    app.add_middleware(
+        IdempotencyMiddleware,
+        store=IdempotencyStore(max_entries=100, ttl=60, wait_timeout=5),
+        routes={('POST', '/items')},
+    )
+
+    @app.post('/items')
+    async def create_item(request: Request) -> ORJSONResponse:
+        calls.append(await request.json())
+        await asyncio.sleep(delay)
+        status_code = statuses.pop(0) if statuses else 201
+        return ORJSONResponse({'call': len(calls)}, status_code=status_code)
+
+    return app, calls
+
+
+def client(app: FastAPI, address: str = '10.0.0.1') -> httpx.AsyncClient:
+    transport = httpx.ASGITransport(app=app, client=(address, 40000))
+    return httpx.AsyncClient(transport=transport, base_url='http://test')
+
+
+async def test_repeat_is_replayed_without_execution():
+    app, calls = make_app()
+    async with client(app) as http:
+        first = await http.post('/items', json={'title': 'a'}, headers={'Idempotency-Key': 'k1'})
+        second = await http.post('/items', json={'title': 'a'}, headers={'Idempotency-Key': 'k1'})
+
+    assert len(calls) == 1
+    assert (first.status_code, first.json()) == (second.status_code, second.json()) == (201, {'call': 1})
+    assert 'idempotent-replayed' not in first.headers
+    assert second.headers['idempotent-replayed'] == 'true'
+
+
+async def test_concurrent_requests_wait_for_first():
+    app, calls = make_app(delay=0.05)
+    async with client(app) as http:
+        responses = await asyncio.gather(*(
+            http.post('/items', json={'title': 'a'}, headers={'Idempotency-Key': 'k1'}) for _ in range(5)
+        ))
+
+    assert len(calls) == 1
+    assert {response.json()['call'] for response in responses} == {1}
+    assert sum(response.headers.get('idempotent-replayed') == 'true' for response in responses) == 4
+
+
+async def test_same_key_with_other_body_is_rejected():
+    app, calls = make_app()
+    async with client(app) as http:
+        await http.post('/items', json={'title': 'a'}, headers={'Idempotency-Key': 'k1'})
+        response = await http.post('/items', json={'title': 'b'}, headers={'Idempotency-Key': 'k1'})
+
+    assert response.status_code == 422
+    assert len(calls) == 1
+
+
+async def test_keys_are_scoped_to_caller():
+    app, calls = make_app()
+    tokens = [create_tokens({'sub': str(user_id), 'role': 'user', 'ver': 1})['access_token'] for user_id in (1, 2)]
+    async with client(app) as http:
+        for token in tokens:
+            await http.post('/items', json={'title': 'a'}, headers={'Idempotency-Key': 'k1', 'access_token': token})
+    async with client(app, address='10.0.0.2') as http:
+        await http.post('/items', json={'title': 'a'}, headers={'Idempotency-Key': 'k1'})
+    async with client(app, address='10.0.0.3') as http:
+        await http.post('/items', json={'title': 'a'}, headers={'Idempotency-Key': 'k1'})
+
+    assert len(calls) == 4
+
+
+async def test_key_is_released_after_non_stored_status():
+    app, calls = make_app(statuses=[409, 400])
+    async with client(app) as http:
+        conflict = await http.post('/items', json={'title': 'a'}, headers={'Idempotency-Key': 'k1'})
+        retried = await http.post('/items', json={'title': 'a'}, headers={'Idempotency-Key': 'k1'})
+        replayed = await http.post('/items', json={'title': 'a'}, headers={'Idempotency-Key': 'k1'})
+
+    assert [conflict.status_code, retried.status_code, replayed.status_code] == [409, 400, 400]
+    assert len(calls) == 2
+    assert replayed.headers['idempotent-replayed'] == 'true'
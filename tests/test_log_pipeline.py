@@ -0,0 +1,29 @@
+import pytest
+
+from src.core.log_pipeline import LogPipeline
+from src.core.metrics import metrics
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_records_go_to_stdout_by_default(capfdbinary):
+    pipeline = LogPipeline(max_queue=10, batch_size=10, flush_interval=1, file_path='-', audit_db=False)
+    written = metrics.get('logging.written')
+    await pipeline.start()
+    pipeline.emit('access', path='/products')
+    await pipeline.stop()
+
+    assert b'"path":"/products"' in capfdbinary.readouterr().out
+    assert metrics.get('logging.written') == written + 1
+
+
+async def test_records_without_sink_are_not_queued_or_counted():
+    pipeline = LogPipeline(max_queue=10, batch_size=10, flush_interval=1, file_path='', audit_db=False)
+    written = metrics.get('logging.written')
+    await pipeline.start()
+    pipeline.emit('access', path='/products')
+    pipeline.emit('audit', table_name='products', action='create', ids=[1])
+    assert not pipeline._queue
+    await pipeline.stop()
+
+    assert metrics.get('logging.written') == written
@@ -0,0 +1,83 @@
+import asyncio
+
+import asyncpg
+import pytest
+
+from src.dao import notify
+from src.dao.cursor import decode_cursor
+from src.dao.database import session_factory
+from src.dao.notify import PgListener, listener
+from src.products.dao import ProductsDAO
+from src.products.events import product_events
+from src.products.schemas import ProductCreateUpdateModelSchema
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeConnection:
+    def __init__(self):
+        self.channels = []
+
+    def add_termination_listener(self, callback):
+        pass
+
+    async def add_listener(self, channel, callback):
+        self.channels.append(channel)
+
+    def is_closed(self):
+        return False
+
+    def terminate(self):
+        pass
+
+
+async def test_listener_reconnects_after_any_connection_error(monkeypatch):
+    errors = [asyncpg.InterfaceError('connection is closed'), TimeoutError(), ConnectionResetError()]
+    connection = FakeConnection()
+
+    async def connect(**kwargs):
+        if errors:
+            raise errors.pop(0)
+        return connection
+
+    monkeypatch.setattr(notify.asyncpg, 'connect', connect)
+    connected = asyncio.Event()
+    pg_listener = PgListener(reconnect_delay=0.01)
+    pg_listener.add_handler('channel', lambda payload: None)
+    pg_listener.on_connect(connected.set)
+
+    await pg_listener.start()
+    try:
+        await asyncio.wait_for(connected.wait(), timeout=2)
+    finally:
+        await pg_listener.stop()
+    assert connection.channels == ['channel']
+
+
+async def test_changes_in_one_transaction_get_unique_event_ids(db):
+    connected = asyncio.Event()
+    listener.on_connect(connected.set)
+    await listener.start()
+    subscription = product_events.subscribe()
+    try:
+        await asyncio.wait_for(connected.wait(), timeout=5)
+        async with session_factory() as session:
+            dao = ProductsDAO(session)
+            product = await dao.add(title='event', article='EVT-1', price=1, description='d')
+            await dao.update(product.id, ProductCreateUpdateModelSchema(price=2))
+            await dao.delete(product.id)
+            await session.commit()
+
+        events = [await asyncio.wait_for(subscription.queue.get(), timeout=5) for _ in range(3)]
+    finally:
+        product_events.unsubscribe(subscription)
+        await listener.stop()
+        listener._connect_callbacks.remove(connected.set)
+
+    assert [data for _, data in events] == [
+        {'action': action, 'id': product.id} for action in ('create', 'update', 'delete')
+    ]
+    event_ids = [event_id for event_id, _ in events]
+    assert len(set(event_ids)) == 3
+    # id события годится как курсор ленты изменений
+    assert {decode_cursor(event_id)[1] for event_id in event_ids} == {product.id}
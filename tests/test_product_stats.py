@@ -0,0 +1,45 @@
+import math
+
+import pytest
+from sqlalchemy import select, text
+
+from src.dao.database import session_factory
+from src.products.dao import STATS_ID, STATS_REFRESH_LOCK_KEY, ProductStatsDAO
+from src.products.models import ProductPriceBucket, ProductStats
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_refresh_recomputes_stats_and_histogram(db):
+    async with session_factory() as session:
+        await session.execute(text(
+            "INSERT INTO products (title, article, price, description) "
+            "VALUES ('s', 'STATS-1', 0.5, 'd'), ('s', 'STATS-2', 3, 'd'), ('s', 'STATS-3', 1000, 'd')"
+        ))
+        assert await ProductStatsDAO(session).refresh() is True
+
+        expected = (await session.execute(text(
+            "SELECT count(*) AS count, sum(price::numeric) AS price_sum, min(price) AS min_price, "
+            "max(price) AS max_price FROM products"
+        ))).one()
+        stats = await session.scalar(select(ProductStats).where(ProductStats.id == STATS_ID))
+        assert (stats.count, stats.price_sum, stats.min_price, stats.max_price) == tuple(expected)
+
+        prices = (await session.execute(text("SELECT price FROM products"))).scalars().all()
+        expected_buckets = {}
+        for price in prices:
+            bucket = 0 if price < 1 else math.floor(math.log2(price)) + 1
+            expected_buckets[bucket] = expected_buckets.get(bucket, 0) + 1
+        buckets = (await session.execute(select(ProductPriceBucket))).scalars().all()
+        assert {bucket.bucket: bucket.count for bucket in buckets} == expected_buckets
+        await session.rollback()
+
+
+async def test_refresh_skips_while_another_worker_holds_the_lock(db):
+    async with session_factory() as holder, session_factory() as session:
+        await holder.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': STATS_REFRESH_LOCK_KEY})
+        assert await ProductStatsDAO(session).refresh() is False
+        await holder.rollback()
+        await session.rollback()
+        assert await ProductStatsDAO(session).refresh() is True
+        await session.rollback()
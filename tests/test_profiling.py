@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from src.core.profiling import ProfileStore, ProfilingMiddleware
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_streaming_response_releases_profiler_after_headers():
+    stream_closed = asyncio.Event()
+    headers_sent = asyncio.Event()
+
+    async def app(scope, receive, send):
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'text/event-stream; charset=utf-8')],
+        })
+        await send({'type': 'http.response.body', 'body': b': ping\n\n', 'more_body': True})
+        await stream_closed.wait()
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            headers_sent.set()
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    store = ProfileStore(max_entries=10)
+    middleware = ProfilingMiddleware(app, store=store, sample_rate=1.0)
+    scope = {'type': 'http', 'method': 'GET', 'path': '/products/events', 'headers': [], 'query_string': b''}
+    request = asyncio.create_task(middleware(scope, receive, send))
+    try:
+        await asyncio.wait_for(headers_sent.wait(), timeout=2)
+        # Поток еще открыт, а профиль уже сохранен и следующий запрос можно профилировать
+        assert [entry.path for entry in store.list()] == ['/products/events']
+        assert not middleware._lock.locked()
+    finally:
+        stream_closed.set()
+        await request
+    assert len(store.list()) == 1
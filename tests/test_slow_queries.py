@@ -0,0 +1,90 @@
+import random
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.core.deadlines import request_started
+from src.dao.slow_queries import RESERVOIR_SIZE, SlowQueryLog, StatementStats, is_explainable, normalize_statement
+from src.settings import settings
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize('statement, expected', [
+    ("SELECT * FROM products WHERE article = 'A-''1' AND price > 10.5",
+     'SELECT * FROM products WHERE article = ? AND price > ?'),
+    ('SELECT * FROM products WHERE id = $1::INTEGER AND created_at >= $2::TIMESTAMP WITHOUT TIME ZONE',
+     'SELECT * FROM products WHERE id = ? AND created_at >= ?'),
+    ('SELECT * FROM products WHERE id IN ($1, $2,\n  $3)', 'SELECT * FROM products WHERE id IN (?, ...)'),
+    ('SELECT * FROM users WHERE email = %(email)s LIMIT 1', 'SELECT * FROM users WHERE email = ? LIMIT ?'),
+])
+def test_normalize_statement(statement, expected):
+    assert normalize_statement(statement) == expected
+
+
+def test_p99_from_reservoir():
+    stats = StatementStats(statement='SELECT ?')
+    for duration in range(1, 101):
+        stats.observe(duration / 100, slow=False)
+    assert stats.p99 == 0.99
+
+    random.seed(1)
+    stats = StatementStats(statement='SELECT ?')
+    for duration in range(1, 10001):
+        stats.observe(duration / 10000, slow=duration > 9900)
+    assert (stats.count, stats.slow_count, stats.max_time) == (10000, 100, 1.0)
+    assert len(stats.samples) == RESERVOIR_SIZE
+    # Выборка равномерна: p99 выборки близок к p99 всех наблюдений
+    assert 0.97 <= stats.p99 <= 1.0
+
+
+@pytest.mark.parametrize('statement, expected', [
+    ('SELECT products.id FROM products WHERE products.id > $1', True),
+    ('  select count(*) from users', True),
+    ("SELECT pg_notify('cache_invalidation', $1)", False),
+    ("SELECT set_config('statement_timeout', $1, true), set_config('lock_timeout', $2, true)", False),
+    ('SELECT pg_advisory_xact_lock($1)', False),
+    ('SELECT pg_try_advisory_lock(1) FROM products', False),
+    ('SELECT products.id FROM products WHERE products.id = $1 FOR UPDATE', False),
+    ('SELECT id FROM users FOR NO KEY UPDATE SKIP LOCKED', False),
+    ("SELECT nextval('products_id_seq') FROM products", False),
+    ('UPDATE products SET price = $1', False),
+    ('WITH deleted AS (DELETE FROM products RETURNING id) SELECT id FROM deleted', False),
+])
+def test_is_explainable(statement, expected):
+    assert is_explainable(statement) is expected
+
+
+async def test_explain_captured_only_for_reads_outside_request_context(db):
+    engine = create_async_engine(settings.db_url)
+    log = SlowQueryLog(threshold=0, explain=True, explain_sample_rate=1, explain_timeout=2)
+    log.install(engine)
+    explain_queries = []
+
+    @event.listens_for(engine.sync_engine, 'before_cursor_execute')
+    def record_explain(conn, cursor, statement, parameters, context, executemany):
+        if 'statement_timeout' in statement or statement.startswith('EXPLAIN'):
+            explain_queries.append((statement, request_started.get()))
+
+    token = request_started.set(123.0)
+    try:
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT pg_notify('slow_queries_test', 'x')"))
+            await connection.execute(text("SELECT pg_advisory_xact_lock(1)"))
+            assert log._explain_task is None
+
+            await connection.execute(text("SELECT count(*) FROM products WHERE price > :price"), {'price': 1})
+            await log._explain_task
+            await connection.rollback()
+    finally:
+        request_started.reset(token)
+        await engine.dispose()
+
+    stats = {item.statement: item for item in log.snapshot()}
+    assert 'actual time' in stats['SELECT count(*) FROM products WHERE price > ?'].explain
+    assert stats["SELECT pg_notify(?, ...)"].explain is None
+    # Таймаут выставлен в транзакции EXPLAIN, контекст запроса (бюджет времени) не унаследован
+    assert [statement.split(' ', 1)[0] for statement, _ in explain_queries] == ['SELECT', 'EXPLAIN']
+    assert "'statement_timeout'" in explain_queries[0][0]
+    assert {started for _, started in explain_queries} == {None}
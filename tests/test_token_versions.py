@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+
+from src.auth import token_versions as token_versions_module
+from src.auth.dependencies import check_refresh_token, get_token_claims
+from src.auth.exceptions import NoJwtException, TokenRevokedException
+from src.auth.security import create_tokens
+from src.auth.token_versions import TokenVersions, token_versions
+from src.dao import notify
+from src.dao.database import session_factory
+from src.dao.notify import PgListener, listener
+
+from tests.test_notify import FakeConnection
+
+pytestmark = pytest.mark.anyio
+
+
+async def wait_for(condition, timeout: float = 5) -> None:
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(poll(), timeout=timeout)
+
+
+async def test_failed_on_connect_reconnects_and_reports_disconnect(monkeypatch):
+    async def connect(**kwargs):
+        return FakeConnection()
+
+    monkeypatch.setattr(notify.asyncpg, 'connect', connect)
+    attempts = []
+    disconnects = []
+    connected = asyncio.Event()
+
+    async def load():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionResetError
+        connected.set()
+
+    pg_listener = PgListener(reconnect_delay=0.01)
+    pg_listener.on_connect(load)
+    pg_listener.on_disconnect(lambda: disconnects.append(1))
+
+    await pg_listener.start()
+    try:
+        await asyncio.wait_for(connected.wait(), timeout=2)
+    finally:
+        await pg_listener.stop()
+    assert len(attempts) == 2
+    assert disconnects
+
+
+def test_notification_does_not_lower_version():
+    versions = TokenVersions()
+    versions.handle_notification('{"id": 1, "ver": 3}')
+    versions.handle_notification('{"id": 1, "ver": 2}')
+    assert not versions.is_current(1, 2)
+    assert versions.is_current(1, 3)
+
+
+async def test_claims_checked_in_db_while_listen_is_down(db, monkeypatch):
+    async with session_factory() as session:
+        user_id = (await session.execute(text(
+            "INSERT INTO users (phone_number, first_name, last_name, email, password) "
+            "VALUES ('+70000000033', 't', 'v', 'token-versions@example.com', 'x') RETURNING id"
+        ))).scalar_one()
+        await session.commit()
+    token = create_tokens({'sub': str(user_id), 'role': 'user', 'ver': 1})['access_token']
+
+    await listener.start()
+    try:
+        await wait_for(lambda: token_versions.loaded)
+        assert (await get_token_claims(token)).user_id == user_id
+
+        # После обрыва LISTEN загрузка версий не удается, уведомление о новой версии не приходит
+        def broken_session_factory():
+            raise ConnectionRefusedError
+
+        monkeypatch.setattr(token_versions_module, 'session_factory', broken_session_factory)
+        async with session_factory() as session:
+            await session.execute(text(
+                "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                "WHERE datname = current_database() AND query ILIKE 'LISTEN%'"
+            ))
+        await wait_for(lambda: not token_versions.loaded)
+        async with session_factory() as session:
+            await session.execute(
+                text("UPDATE users SET token_version = token_version + 1 WHERE id = :id"), {'id': user_id}
+            )
+            await session.commit()
+
+        with pytest.raises(type(TokenRevokedException)) as error:
+            await get_token_claims(token)
+        assert error.value is TokenRevokedException
+    finally:
+        await listener.stop()
+        async with session_factory() as session:
+            await session.execute(text("DELETE FROM users WHERE id = :id"), {'id': user_id})
+            await session.commit()
+
+
+async def test_refresh_token_is_revoked_by_version_bump(db):
+    async with session_factory() as session:
+        user_id = (await session.execute(text(
+            "INSERT INTO users (phone_number, first_name, last_name, email, password) "
+            "VALUES ('+70000000034', 't', 'v', 'refresh-versions@example.com', 'x') RETURNING id"
+        ))).scalar_one()
+        await session.commit()
+    tokens = create_tokens({'sub': str(user_id), 'role': 'user', 'ver': 1})
+    try:
+        async with session_factory() as session:
+            assert (await check_refresh_token(tokens['refresh_token'], session)).id == user_id
+            # access_token вместо refresh_token не принимается
+            with pytest.raises(type(NoJwtException)) as error:
+                await check_refresh_token(tokens['access_token'], session)
+            assert error.value is NoJwtException
+
+            await session.execute(
+                text("UPDATE users SET token_version = token_version + 1 WHERE id = :id"), {'id': user_id}
+            )
+            await session.commit()
+            with pytest.raises(type(TokenRevokedException)) as error:
+                await check_refresh_token(tokens['refresh_token'], session)
+            assert error.value is TokenRevokedException
+    finally:
+        async with session_factory() as session:
+            await session.execute(text("DELETE FROM users WHERE id = :id"), {'id': user_id})
+            await session.commit()
@@ -0,0 +1,79 @@
+import httpx
+import pytest
+from sqlalchemy import event, select, text
+
+from src.auth.dao import UsersDAO
+from src.auth.models import User
+from src.auth.schemas import UserModelUpdateSchema
+from src.dao.cache import MemoryCacheBackend, cache
+from src.dao.database import async_engine, session_factory
+from src.dao.exceptions import VersionConflictException
+from src.main import app
+from src.products.dao import ProductsDAO
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_stale_if_match_has_no_side_effects(db):
+    async with session_factory() as session:
+        user_id = (await session.execute(text(
+            "INSERT INTO users (phone_number, first_name, last_name, email, password) "
+            "VALUES ('+70000000043', 'v', 'v', 'versions@example.com', 'x') RETURNING id"
+        ))).scalar_one()
+
+        with pytest.raises(type(VersionConflictException)) as error:
+            await UsersDAO(session).update(id=user_id, values=UserModelUpdateSchema(first_name='new'), version=99)
+        assert error.value is VersionConflictException
+        # Токены пользователя не отозваны: запись не изменилась
+        assert await session.scalar(select(User.token_version).where(User.id == user_id)) == 1
+        await session.rollback()
+
+
+async def test_user_update_is_one_statement_and_bumps_tokens_only_for_credentials(db):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async with session_factory() as session:
+        user_id = (await session.execute(text(
+            "INSERT INTO users (phone_number, first_name, last_name, email, password) "
+            "VALUES ('+70000000044', 'v', 'v', 'versions-tokens@example.com', 'x') RETURNING id"
+        ))).scalar_one()
+        dao = UsersDAO(session)
+
+        event.listen(async_engine.sync_engine, 'before_cursor_execute', record)
+        try:
+            user = await dao.update(id=user_id, values=UserModelUpdateSchema(first_name='renamed'))
+        finally:
+            event.remove(async_engine.sync_engine, 'before_cursor_execute', record)
+        # Пользователь вместе с ролью - одним запросом; второй - уведомление о версиях токенов
+        assert len(statements) == 2 and statements[0].startswith('WITH updated AS')
+        assert (user.first_name, user.version, user.token_version, user.role.name) == ('renamed', 2, 1, 'user')
+
+        user = await dao.update(id=user_id, values=UserModelUpdateSchema(email='versions-new@example.com'))
+        assert (user.version, user.token_version) == (3, 2)
+        user = await dao.update(id=user_id, values=UserModelUpdateSchema(role_id=2))
+        assert (user.version, user.token_version, user.role.name) == (4, 3, 'admin')
+        await session.rollback()
+
+
+async def test_product_etag_is_not_served_from_cache(db, monkeypatch):
+    monkeypatch.setattr(cache, 'backend', MemoryCacheBackend(max_entries=100))
+    async with session_factory() as session:
+        product = await ProductsDAO(session).add(title='etag', article='ETAG-1', price=1, description='d')
+        await session.commit()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+            assert (await client.get(f'/products/{product.id}')).headers['ETag'] == '"1"'
+            # Изменение без сброса кэша (как из другого воркера до прихода уведомления)
+            async with session_factory() as session:
+                await session.execute(
+                    text("UPDATE products SET version = version + 1 WHERE id = :id"), {'id': product.id}
+                )
+                await session.commit()
+            assert (await client.get(f'/products/{product.id}')).headers['ETag'] == '"2"'
+    finally:
+        async with session_factory() as session:
+            await session.execute(text("DELETE FROM products WHERE id = :id"), {'id': product.id})
+            await session.commit()